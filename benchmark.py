@@ -0,0 +1,617 @@
+"""
+benchmark.py - QuickLauncher の性能計測スクリプト。
+
+使い方:
+    python benchmark.py            # すべて実行
+    python benchmark.py cli        # 指定したものだけ実行
+
+計測は一時ディレクトリ(QUICK_LAUNCHER_HOME)に作った合成プロファイルで行い、
+実際の設定やリンクには触れない。
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+import tempfile
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(APP_DIR, "quick_launcher.py")
+
+def make_profile(home, profile_name="(default)", groups=20, links_per_group=50):
+    """合成プロファイルを作成して、そのリンクデータを返す"""
+    data = []
+    for g in range(groups):
+        links = []
+        for i in range(links_per_group):
+            if i % 2:
+                path = f"https://example{g}-{i}.com/page/{i}"
+            else:
+                path = f"C:\\Program Files\\App{g}\\tool{i}.exe --option {i}"
+            links.append({"name": f"Link {g}-{i}", "path": path})
+        data.append({"group": f"Group {g}", "links": links})
+    profile_dir = os.path.join(home, "profiles", profile_name)
+    os.makedirs(profile_dir, exist_ok=True)
+    with open(os.path.join(profile_dir, "links.json"), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return data
+
+def report(name, samples, unit="ms"):
+    print(f"  {name:<36} median {statistics.median(samples):8.2f} {unit}  "
+          f"min {min(samples):8.2f} {unit}  max {max(samples):8.2f} {unit}")
+
+# --- コマンドラインモードの起動時間 ---
+HEAVY_MODULES = ('tkinter', 'PIL', 'requests', 'bs4', 'pystray')
+CLI_BUDGET_MS = 50  # 素のインタプリタ起動に対する上乗せ分の目安
+
+def _time_command(cmd, env, runs):
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+def bench_cli(runs=15):
+    print("[cli] quick_launcher --list の起動時間 (1,000リンク)")
+    with tempfile.TemporaryDirectory() as home:
+        make_profile(home)
+        env = dict(os.environ, QUICK_LAUNCHER_HOME=home)
+
+        # 重いモジュールを読み込んでいないことを -X importtime で確認
+        proc = subprocess.run([sys.executable, "-X", "importtime", APP_SCRIPT, "--list"],
+                              env=env, capture_output=True, text=True, encoding='utf-8')
+        imported = {line.rsplit('|', 1)[-1].strip().split('.')[0]
+                    for line in proc.stderr.splitlines() if line.startswith('import time:')}
+        heavy = sorted(imported.intersection(HEAVY_MODULES))
+        print(f"  heavy modules imported: {heavy or 'none'}")
+
+        baseline = _time_command([sys.executable, "-c", "pass"], env, runs)
+        module = _time_command([sys.executable, "-m", "launcher_cli", "--list"], dict(env, PYTHONPATH=APP_DIR), runs)
+        # スクリプト実行では quick_launcher.py 全体のコンパイルが毎回かかる（exeでは不要）
+        script = _time_command([sys.executable, APP_SCRIPT, "--list"], env, runs)
+        report("python -c pass", baseline)
+        report("python -m launcher_cli --list", module)
+        report("python quick_launcher.py --list", script)
+        overhead = statistics.median(module) - statistics.median(baseline)
+        print(f"  CLI overhead over bare interpreter: {overhead:.2f} ms (budget {CLI_BUDGET_MS} ms)")
+        return not heavy and overhead <= CLI_BUDGET_MS
+
+# --- 編集画面の検索 ---
+SEARCH_BUDGET_MS = 1.0
+SEARCH_INDEX_SLICE_MS = 8  # 編集画面(LinksEditDialog.INDEX_SLICE)と同じ
+SEARCH_SLICE_MS = 1        # 編集画面(LinksEditDialog.SEARCH_SLICE)と同じ
+
+def make_groups(groups, links_per_group):
+    """ファイルに書き出さない合成リンクデータ"""
+    data = []
+    for g in range(groups):
+        links = []
+        for i in range(links_per_group):
+            if i % 2:
+                path = f"https://example{g}-{i}.com/page/{i}"
+            else:
+                path = f"C:\\Program Files\\App{g}\\tool{i}.exe --option {i}"
+            links.append({"name": f"Link {g}-{i}", "path": path})
+        data.append({"group": f"Group {g}", "links": links})
+    return data
+
+def bench_search():
+    print("[search] 編集画面の検索インデックス (20,000リンク)")
+    sys.path.insert(0, APP_DIR)
+    from link_model import LinkModel
+
+    model = LinkModel(make_groups(100, 200))
+    t = time.perf_counter()
+    model.build_search_index()
+    print(f"  index build: {(time.perf_counter() - t) * 1000:.1f} ms")
+
+    # 編集画面では INDEX_SLICE ずつ分けて作る（その間の入力は全件の走査で検索する）
+    sliced = LinkModel(make_groups(100, 200))
+    slices = []
+    done = False
+    while not done:
+        t = time.perf_counter()
+        done = sliced.build_search_index(deadline=t + SEARCH_INDEX_SLICE_MS / 1000)
+        slices.append((time.perf_counter() - t) * 1000)
+    print(f"  index build in slices: {len(slices)} slices, longest {max(slices):.1f} ms")
+    report("scan per keystroke (before index)", _time_call(lambda: sliced._scan("tool17"), 5))
+
+    queries = ["example42-1", "tool17.exe", "link 99-19", "program files\\app7"]
+    index_samples, slice_samples, projection_samples = [], [], []
+    for query in queries:
+        # 1文字ずつ入力した場合の各キーストロークを計測
+        for n in range(1, len(query) + 1):
+            # 編集画面と同じく SEARCH_SLICE ずつ照合する（1回の after にかかる時間と、結果が出るまでの合計）
+            result, total = None, 0.0
+            while result is None:
+                t = time.perf_counter()
+                result = model._link_search.search(query[:n], deadline=t + SEARCH_SLICE_MS / 1000)
+                slice_samples.append((time.perf_counter() - t) * 1000)
+                total += slice_samples[-1]
+            index_samples.append(total)
+            t = time.perf_counter()
+            model.search(query[:n])
+            projection_samples.append((time.perf_counter() - t) * 1000)
+    report("index query per keystroke", index_samples)
+    report("index query per slice", slice_samples)
+    report("projection per keystroke", projection_samples)
+
+    # 編集後のインデックス更新
+    lid = next(iter(model.links))
+    t = time.perf_counter()
+    model.rename_link(lid, "renamed link")
+    report("index update on rename", [(time.perf_counter() - t) * 1000])
+    # 1回の after が入力の処理を止める時間も見る（GCなどの揺らぎを考えて、上限の2倍まで許す）
+    return (max(statistics.median(index_samples), statistics.median(projection_samples)) <= SEARCH_BUDGET_MS
+            and max(slice_samples) <= 2 * SEARCH_SLICE_MS and max(slices) <= 2 * SEARCH_INDEX_SLICE_MS)
+
+# --- 編集画面の元に戻す/やり直す ---
+UNDO_BYTES_PER_EDIT_BUDGET = 1024  # 1回の編集で履歴が使うメモリの目安
+
+def bench_undo(edits=10000):
+    print(f"[undo] 編集履歴のメモリと速度 (20,000リンク, {edits:,}回の編集)")
+    import random
+    import tracemalloc
+    sys.path.insert(0, APP_DIR)
+    from link_model import LinkModel
+
+    # 検索インデックスは作らずに、履歴自体のメモリを測る
+    model = LinkModel(make_groups(100, 200))
+    rng = random.Random(0)
+    lids = list(model.links)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    t = time.perf_counter()
+    for i in range(edits):
+        lid = rng.choice(lids)
+        r = rng.random()
+        if r < 0.4:
+            model.rename_link(lid, f"renamed {i}")
+        elif r < 0.7:
+            model.move_link(lid, rng.randrange(len(model.group_link_ids(model.link_group[lid]))))
+        else:
+            model.set_link_path(lid, f"https://edited{i}.example.com/")
+    edit_ms = (time.perf_counter() - t) * 1000
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # 新しい名前/パスの文字列自体の分も含む
+    print(f"  {edits:,} edits: {edit_ms:.0f} ms, memory growth {used / 1024:.0f} KiB ({used / edits:.0f} bytes/edit)")
+    undo_samples, redo_samples = [], []
+    for _ in range(1000):
+        t = time.perf_counter()
+        model.undo()
+        undo_samples.append((time.perf_counter() - t) * 1000)
+    for _ in range(1000):
+        t = time.perf_counter()
+        model.redo()
+        redo_samples.append((time.perf_counter() - t) * 1000)
+    report("undo", undo_samples)
+    report("redo", redo_samples)
+    return used / edits <= UNDO_BYTES_PER_EDIT_BUDGET
+
+# --- 保存形式 (JSON / SQLite) ---
+STORAGE_BUDGET_MS = 20  # SQLiteでポップアップを開く・グループを表示する時間の目安
+
+def _time_call(func, runs=5):
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+def bench_storage():
+    print("[storage] links.json と links.db の比較 (100,000リンク)")
+    with tempfile.TemporaryDirectory() as home:
+        sys.path.insert(0, APP_DIR)
+        import profile_store
+        import link_store
+        # プロファイルの置き場所だけを一時ディレクトリに向ける
+        profile_store.PROFILES_DIR = os.path.join(home, "profiles")
+        data = make_profile(home, groups=500, links_per_group=200)
+        profile = "(default)"
+
+        report("json: load all", _time_call(lambda: profile_store.load_links_data(profile)))
+        report("json: save all", _time_call(
+            lambda: (profile_store.save_links_data(data, profile), profile_store.flush_pending_writes())))
+
+        t = time.perf_counter()
+        link_store.migrate_to_sqlite(profile)
+        print(f"  migrate to sqlite: {(time.perf_counter() - t) * 1000:.1f} ms")
+        store = link_store.open_link_store(profile)
+        open_samples = _time_call(store.groups, runs=20)
+        hover_samples = _time_call(lambda: store.group_links("Group 250"), runs=20)
+        report("sqlite: group list (popup open)", open_samples)
+        report("sqlite: one group (hover)", hover_samples)
+        report("sqlite: load all", _time_call(store.load_all))
+
+        # 1つのグループだけを変更して保存（編集画面のOK）
+        edited = store.load_all()
+        def save_one_change():
+            edited[10]['links'][0]['name'] += "!"
+            store.save_all(edited)
+        report("sqlite: save after one edit", _time_call(save_one_change))
+
+        t = time.perf_counter()
+        link_store.export_to_json(profile, os.path.join(home, "export.json"))
+        print(f"  export to json: {(time.perf_counter() - t) * 1000:.1f} ms")
+        link_store.close_connections()  # 一時ディレクトリを削除できるように閉じる
+        return max(statistics.median(open_samples), statistics.median(hover_samples)) <= STORAGE_BUDGET_MS
+
+# --- プロファイルの切り替え ---
+def bench_switch(rounds=10):
+    print("[switch] プロファイルの切り替え (2プロファイル x 10,000リンク)")
+    with tempfile.TemporaryDirectory() as home:
+        sys.path.insert(0, APP_DIR)
+        import profile_store
+        import link_store
+        profile_store.PROFILES_DIR = os.path.join(home, "profiles")
+        for name in ("work", "play"):
+            make_profile(home, name, groups=50, links_per_group=200)
+
+        def open_popup(name):
+            # ポップアップを開くときと同じく、グループの一覧を取得する
+            link_store.open_link_store(name).groups()
+
+        cold, warm = [], []
+        for _ in range(rounds):
+            link_store._json_cache.clear()
+            for name in ("work", "play"):
+                cold.append(_time_call(lambda: open_popup(name), runs=1)[0])
+            for name in ("work", "play"):
+                warm.append(_time_call(lambda: open_popup(name), runs=1)[0])
+        report("switch to uncached profile", cold)
+        report("switch back to recent profile", warm)
+        return statistics.median(warm) < statistics.median(cold)
+
+# --- ブックマークの取り込み ---
+IMPORT_BUDGET_MS = 3000  # 10,000件の取り込みにかかる時間の目安
+
+def make_chromium_bookmarks(path, folders=100, per_folder=100):
+    """合成の Chromium Bookmarks。1割は直前のリンクと同じURL(大文字・ポート・フラグメント違い)にする"""
+    children = []
+    for f in range(folders):
+        links = []
+        for i in range(per_folder):
+            url = f"https://site{f}.example.com/page/{i}"
+            if i % 10 == 9:
+                url = f"HTTPS://SITE{f}.Example.com:443/page/{i - 1}#top"
+            links.append({"type": "url", "name": f"Page {f}-{i}", "url": url})
+        children.append({"type": "folder", "name": f"Folder {f % 10}",
+                         "children": [{"type": "folder", "name": f"Sub {f}", "children": links}]})
+    roots = {"bookmark_bar": {"type": "folder", "name": "Bookmarks bar", "children": children},
+             "other": {"type": "folder", "name": "Other", "children": []}}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"roots": roots, "version": 1}, f)
+
+def bench_import():
+    print("[import] ブラウザのブックマークの取り込み (10,000件)")
+    with tempfile.TemporaryDirectory() as home:
+        sys.path.insert(0, APP_DIR)
+        import profile_store
+        import bookmark_import
+        profile_store.PROFILES_DIR = os.path.join(home, "profiles")
+        make_profile(home, groups=5, links_per_group=20)
+        source = os.path.join(home, "Bookmarks")
+        make_chromium_bookmarks(source)
+
+        t = time.perf_counter()
+        result = bookmark_import.import_bookmarks("(default)", source)
+        elapsed = (time.perf_counter() - t) * 1000
+        print(f"  import: {elapsed:.1f} ms (added {result.added}, duplicates {result.duplicates}, "
+              f"groups {len(result.groups)})")
+        t = time.perf_counter()
+        again = bookmark_import.import_bookmarks("(default)", source)
+        print(f"  re-import (all duplicates): {(time.perf_counter() - t) * 1000:.1f} ms "
+              f"(added {again.added}, duplicates {again.duplicates})")
+        return elapsed <= IMPORT_BUDGET_MS and again.added == 0
+
+# --- 編集画面のリンク一覧の描画 ---
+EDITOR_BUDGET_MS = 16  # 1フレームの目安
+
+class FakeCanvas:
+    """Tk を使わずに描画処理を計測するための Canvas の代わり。図形の操作回数を数える"""
+
+    def __init__(self, height=600):
+        self.height = height
+        self.top = 0
+        self.items = {}
+        self.ops = 0
+        self._next_id = 1
+
+    def _create(self, *args, **kwargs):
+        self.ops += 1
+        item = self._next_id
+        self._next_id += 1
+        self.items[item] = kwargs
+        return item
+
+    create_image = create_text = create_rectangle = create_line = _create
+
+    def itemconfigure(self, item, **kwargs):
+        self.ops += 1
+        self.items[item].update(kwargs)
+
+    def coords(self, item, *args):
+        self.ops += 1
+
+    def delete(self, tag):
+        self.ops += len(self.items)
+        self.items.clear()
+
+    def tag_raise(self, item):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def canvasy(self, y):
+        return self.top + y
+
+    def winfo_height(self):
+        return self.height
+
+def _full_redraw(canvas, rows, row_content, measure, row_height, selected):
+    """以前の refresh_link_list と同じく、すべての行の図形を作り直す"""
+    canvas.delete("all")
+    y = 2
+    for i, lid in enumerate(rows):
+        icon, name, path_text, color = row_content(lid)
+        canvas.create_image(4, y + row_height // 2, image=icon)
+        if i == selected:
+            canvas.create_rectangle(0, y, 800, y + row_height)
+        canvas.create_text(21, y + row_height // 2, text=name)
+        canvas.create_text(21 + measure(name) + 25, y + row_height // 2, text=path_text, fill=color)
+        y += row_height
+
+def bench_editor(links=5000, runs=20):
+    print(f"[editor] 編集画面のリンク一覧の描画 ({links:,}リンクのグループ)")
+    sys.path.insert(0, APP_DIR)
+    from link_list_view import LinkListView
+    group = make_groups(1, links)[0]['links']
+    rows = list(range(links))
+    row_content = lambda lid: ("icon", group[lid]['name'], group[lid]['path'], "#888888")
+    measure = lambda text: len(text) * 7
+    row_height = 24
+
+    old_canvas = FakeCanvas()
+    full = _time_call(lambda: _full_redraw(old_canvas, rows, row_content, measure, row_height, 10), runs)
+    report("full redraw (previous)", full)
+    print(f"  canvas operations per redraw: {old_canvas.ops // runs:,}")
+
+    canvas = FakeCanvas()
+    view = LinkListView(canvas, row_content, measure, None, row_height, 16)
+    view.resize(800)
+    first = _time_call(lambda: view.set_rows(rows, 10), 1)
+    report("virtualized: first draw", first)
+    canvas.ops = 0
+    unchanged = _time_call(lambda: view.set_rows(rows, 10), runs)
+    report("virtualized: refresh (no change)", unchanged)
+    select = _time_call(lambda: view.set_selection(12), runs)
+    report("virtualized: selection change", select)
+    def rename():
+        group[5]['name'] += "!"
+        view.set_rows(rows, 10)
+    edit = _time_call(rename, runs)
+    report("virtualized: rename one row", edit)
+    def scroll():
+        canvas.top = (canvas.top + 24 * 10) % (links * row_height)
+        view.render()
+    scrolled = _time_call(scroll, runs)
+    report("virtualized: scroll 10 rows", scrolled)
+    print(f"  canvas items: {len(canvas.items)} (previous: {len(old_canvas.items):,})")
+    return max(statistics.median(s) for s in (unchanged, select, edit, scrolled)) <= EDITOR_BUDGET_MS
+
+# --- リンクの起動 ---
+LAUNCH_BUDGET_MS = 1.0  # クリックした側(Tkスレッド)が待つ時間の目安
+LAUNCH_STALL_MS = 200   # 応答の遅いネットワークドライブなどを想定した起動の所要時間
+
+def bench_launch(clicks=50):
+    print(f"[launch] リンクの起動 (起動に {LAUNCH_STALL_MS} ms かかる場合の、クリック側の待ち時間)")
+    sys.path.insert(0, APP_DIR)
+    import launch_service
+    with tempfile.TemporaryDirectory() as home:
+        app = os.path.join(home, "My App", "tool.exe")
+        os.makedirs(os.path.dirname(app))
+        open(app, "wb").close()
+        paths = [f'"{app}" --profile work', home, "https://example.com/", f"{app} > out.txt"]
+
+        def slow_spawn(kind, command):
+            time.sleep(LAUNCH_STALL_MS / 1000)
+
+        blocking = _time_call(lambda: slow_spawn(*launch_service.resolve_launch(paths[0])), 3)
+        report("synchronous (before)", blocking)
+        service = launch_service.LaunchService(spawn=slow_spawn)
+        done = threading.Semaphore(0)
+        samples = []
+        for i in range(clicks):
+            t = time.perf_counter()
+            service.submit(paths[i % len(paths)], lambda error: done.release())
+            samples.append((time.perf_counter() - t) * 1000)
+        report("LaunchService.submit", samples)
+        for _ in range(clicks):
+            done.acquire()
+        service.shutdown()
+        kinds = {launch_service.resolve_launch(p)[0] for p in paths}
+        print(f"  kinds: {', '.join(sorted(kinds))}")
+        print("  " + launch_service.format_latency(service.stats.snapshot()).replace("\n", "\n  "))
+        return statistics.median(samples) <= LAUNCH_BUDGET_MS
+
+# --- ホバー時の先読み ---
+HOVER_MS = 120  # LinkPopup.HOVER_PREFETCH_MS と同じ
+
+def bench_prefetch(clicks=20):
+    print("[prefetch] ホバー時の先読み (ローカルの代用サーバーと一時フォルダの実行ファイル)")
+    sys.path.insert(0, APP_DIR)
+    import launch_service
+    import urllib.request
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class StandIn(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://localhost:{server.server_address[1]}/"
+
+    def browser_spawn(kind, command):
+        # ブラウザの代わりに、最初のページを読み込むところまでを起動とみなす
+        if kind == launch_service.KIND_URL:
+            urllib.request.urlopen(command, timeout=5).read()
+
+    with tempfile.TemporaryDirectory() as home:
+        app = os.path.join(home, "Program Files", "Tool", "tool.exe")
+        os.makedirs(os.path.dirname(app))
+        with open(app, "wb") as f:
+            f.write(os.urandom(4 * 1024 * 1024))
+        targets = {"exec": f'"{app}" --project work', "url": url}
+        medians = {}
+        for label, prefetch in (("click only", False), ("hover + click", True)):
+            service = launch_service.LaunchService(spawn=browser_spawn)
+            samples = {kind: [] for kind in targets}
+            for _ in range(clicks):
+                for kind, path in targets.items():
+                    if prefetch:
+                        service.prefetch(path)
+                    time.sleep(HOVER_MS / 1000)
+                    done = threading.Event()
+                    t = time.perf_counter()
+                    service.submit(path, lambda error: done.set())
+                    done.wait()
+                    samples[kind].append((time.perf_counter() - t) * 1000)
+            for kind in targets:
+                report(f"{label}: {kind}", samples[kind])
+                medians[(label, kind)] = statistics.median(samples[kind])
+            stats = service.stats.snapshot()
+            if 'prefetch' in stats:
+                print(f"  prefetch (off the click path): median ~{stats['prefetch']['p50_ms']} ms, "
+                      f"used {stats.get('total:prefetched', {}).get('count', 0)}/{clicks * len(targets)}")
+            service.shutdown()
+    server.shutdown()
+    return all(medians[("hover + click", k)] <= medians[("click only", k)] * 1.5 + 0.05 for k in targets)
+
+# --- アイコンのキャッシュのメモリ使用量 ---
+ICON_LINKS = 2000
+ICON_SIZES = (8, 12, 16, 20, 24, 32)  # 先読みするサイズ（標準の5つと表示中のサイズ）
+ICON_DISTINCT = 300                   # 画素の異なるアイコンの数（同じアプリ・同じ種類のファイル・警告アイコンなどは共通）
+ICON_VISIBLE = 35                     # 1つのサブポップアップに表示するリンク数
+ICON_MEMORY_RATIO = 0.25              # 以前に対するメモリ増加量の目安
+
+def _rss_kb():
+    """このプロセスの常駐メモリ(KB)。取得できなければ None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                       [(name, ctypes.c_size_t) for name in (
+                           "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                           "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        counters = PROCESS_MEMORY_COUNTERS(cb=ctypes.sizeof(PROCESS_MEMORY_COUNTERS))
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize // 1024
+    return None
+
+def _synthetic_icon(seed, size):
+    """透明な背景に色付きの円を描いた RGBA の画素（実際のアイコンと同じく、同じ色が続く部分が多い）"""
+    color = bytes(((seed * 67) % 256, (seed * 131) % 256, (seed * 29) % 256, 255))
+    clear = bytes(4)
+    r = (size - 1) / 2
+    rows = []
+    for y in range(size):
+        rows.append(b"".join(color if (x - r) ** 2 + (y - r) ** 2 <= r * r else clear for x in range(size)))
+    return b"".join(rows)
+
+def _icon_memory_child(mode):
+    """別プロセスで実行する。mode のキャッシュに全リンク・全サイズのアイコンを入れて、増えたメモリを表示する"""
+    import gc
+    sys.path.insert(0, APP_DIR)
+    from icon_store import IconPixelStore
+    links = [link['path'] for group in make_groups(40, ICON_LINKS // 40) for link in group['links']]
+    pixels = {(seed, size): _synthetic_icon(seed, size) for seed in range(ICON_DISTINCT) for size in ICON_SIZES}
+    gc.collect()
+    before = _rss_kb()
+    if mode == "previous":
+        # 以前：リンクとサイズごとに展開済みの画像（PhotoImage）を1つずつ持つ
+        cache = {}
+        for i, path in enumerate(links):
+            for size in ICON_SIZES:
+                cache[(path, size)] = bytearray(pixels[(i % ICON_DISTINCT, size)])
+        shown = len(cache)
+    else:
+        # 今：圧縮した画素を重複なしで持ち、表示するサブポップアップの分だけ展開する
+        cache = IconPixelStore()
+        for i, path in enumerate(links):
+            for size in ICON_SIZES:
+                cache.put((path, size), size, size, pixels[(i % ICON_DISTINCT, size)])
+        visible = [bytearray(cache.get((path, 16))[2]) for path in links[:ICON_VISIBLE]]
+        shown = len(visible)
+    gc.collect()
+    print(json.dumps({'kb': _rss_kb() - before, 'shown': shown}))
+
+def bench_icons():
+    print(f"[icons] アイコンのキャッシュのメモリ ({ICON_LINKS:,}リンク x {len(ICON_SIZES)}サイズ、"
+          f"異なるアイコン {ICON_DISTINCT})")
+    if _rss_kb() is None:
+        print("  RSS を取得できないため、スキップします")
+        return True
+    results = {}
+    for mode in ("previous", "store"):
+        proc = subprocess.run([sys.executable, "-c", f"import benchmark; benchmark._icon_memory_child({mode!r})"],
+                              cwd=APP_DIR, check=True, capture_output=True, text=True)
+        results[mode] = json.loads(proc.stdout)
+        print(f"  {mode:<10} RSS +{results[mode]['kb'] / 1024:7.2f} MB  (展開済みの画像 {results[mode]['shown']:,})")
+
+    sys.path.insert(0, APP_DIR)
+    from icon_store import IconPixelStore
+    store = IconPixelStore()
+    for seed in range(ICON_DISTINCT):
+        store.put(seed, 16, 16, _synthetic_icon(seed, 16))
+    samples = _time_call(lambda: [store.get(seed) for seed in range(ICON_DISTINCT)], 20)
+    report("store.get per icon (16px)", [ms * 1000 / ICON_DISTINCT for ms in samples], unit="us")
+    return results["store"]['kb'] <= results["previous"]['kb'] * ICON_MEMORY_RATIO
+
+BENCHMARKS = {
+    'cli': bench_cli,
+    'search': bench_search,
+    'undo': bench_undo,
+    'storage': bench_storage,
+    'switch': bench_switch,
+    'import': bench_import,
+    'editor': bench_editor,
+    'launch': bench_launch,
+    'prefetch': bench_prefetch,
+    'icons': bench_icons,
+}
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    ok = True
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"unknown benchmark: {name} (choices: {', '.join(BENCHMARKS)})")
+            return 2
+        ok = BENCHMARKS[name]() is not False and ok
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,201 @@
+"""
+bookmark_import.py - ブラウザのブックマークをプロファイルに取り込む。
+
+    Chromium系(Chrome / Edge / Brave など): プロファイルフォルダの Bookmarks (JSON)
+    Firefox: プロファイルフォルダの places.sqlite
+
+ブックマークのフォルダごとにグループを作り(同名のグループがあれば追記する)、
+正規化したURLが既存のリンクや取り込み済みのものと同じなら追加しない。
+タイトルの取得(get_url_title)やファビコンの取得は行わず、プロファイルは最後に1回だけ保存する。
+
+Tk / PIL / requests は読み込まないので、コマンドラインモードからも使う。
+"""
+
+import os
+import json
+import sqlite3
+import logging
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit
+from urllib.request import pathname2url
+
+from profile_store import load_links_data, save_links_data, flush_pending_writes
+
+IMPORT_SCHEMES = ('http', 'https')  # spawn_link でブラウザに渡せるものだけ取り込む
+FOLDER_SEPARATOR = "/"              # 入れ子のフォルダはグループ名で「親/子」と表す
+
+CHROMIUM_ROOT_NAMES = {
+    'bookmark_bar': "ブックマーク バー",
+    'other': "その他のブックマーク",
+    'synced': "モバイルのブックマーク",
+}
+FIREFOX_ROOT_NAMES = {
+    'menu________': "ブックマークメニュー",
+    'toolbar_____': "ブックマークツールバー",
+    'unfiled_____': "その他のブックマーク",
+    'mobile______': "モバイルのブックマーク",
+}
+FIREFOX_TYPE_BOOKMARK = 1
+FIREFOX_TYPE_FOLDER = 2
+
+ImportResult = namedtuple('ImportResult', ['added', 'duplicates', 'skipped', 'groups', 'urls'])
+
+class BookmarkImportError(Exception):
+    """ブックマークファイルを読めない"""
+
+# --- ブックマークファイルの読み込み ---
+def iter_chromium_bookmarks(path):
+    """Chromium の Bookmarks から (フォルダ名のタプル, タイトル, URL) を表示順に返す"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            roots = json.load(f)['roots']
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise BookmarkImportError(f"Chromium bookmarks could not be read: {e}") from e
+    for key, root in roots.items():
+        if not isinstance(root, dict) or root.get('type') != 'folder':
+            continue  # 'sync_transaction_version' など
+        folder = (CHROMIUM_ROOT_NAMES.get(key) or root.get('name') or key,)
+        # 深いフォルダでも再帰しないよう、スタックで辿る
+        stack = [(folder, iter(root.get('children', [])))]
+        while stack:
+            folder, children = stack[-1]
+            node = next(children, None)
+            if node is None:
+                stack.pop()
+            elif node.get('type') == 'folder':
+                stack.append((folder + (node.get('name', ''),), iter(node.get('children', []))))
+            elif node.get('type') == 'url':
+                yield folder, node.get('name', ''), node.get('url', '')
+
+def iter_firefox_bookmarks(path):
+    """
+    Firefox の places.sqlite から (フォルダ名のタプル, タイトル, URL) を表示順に返す。
+    Firefox の起動中でも読めるよう読み取り専用(immutable)で開くので、直前の変更は含まれないことがある。
+    """
+    uri = f"file:{pathname2url(os.path.abspath(path))}?immutable=1"
+    try:
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT b.id, b.parent, b.type, b.title, b.guid, p.url FROM moz_bookmarks b "
+                "LEFT JOIN moz_places p ON p.id = b.fk ORDER BY b.parent, b.position").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise BookmarkImportError(f"Firefox bookmarks could not be read: {e}") from e
+
+    children = {}
+    for row in rows:
+        children.setdefault(row[1], []).append(row)
+    for root_id, _, _, title, guid, _ in children.get(1, []):  # id 1 はルート。タグ(tags________)は含めない
+        if guid not in FIREFOX_ROOT_NAMES:
+            continue
+        stack = [((FIREFOX_ROOT_NAMES[guid],), iter(children.get(root_id, [])))]
+        while stack:
+            folder, items = stack[-1]
+            row = next(items, None)
+            if row is None:
+                stack.pop()
+            elif row[2] == FIREFOX_TYPE_FOLDER:
+                stack.append((folder + (row[3] or '',), iter(children.get(row[0], []))))
+            elif row[2] == FIREFOX_TYPE_BOOKMARK and row[5]:
+                yield folder, row[3] or '', row[5]
+
+def is_firefox_places(path):
+    if os.path.basename(path).lower() == 'places.sqlite':
+        return True
+    try:
+        with open(path, 'rb') as f:
+            return f.read(16) == b'SQLite format 3\x00'
+    except OSError:
+        return False
+
+def iter_bookmarks(path):
+    """ファイルの形式を判別して (フォルダ名のタプル, タイトル, URL) を返す"""
+    if is_firefox_places(path):
+        return iter_firefox_bookmarks(path)
+    return iter_chromium_bookmarks(path)
+
+def find_bookmark_files():
+    """このPCにあるブラウザのブックマークファイルを [(ブラウザ名, パス), ...] で返す"""
+    local = os.environ.get('LOCALAPPDATA', '')
+    roaming = os.environ.get('APPDATA', '')
+    found = []
+    for label, user_data in (("Chrome", os.path.join(local, 'Google', 'Chrome', 'User Data')),
+                             ("Edge", os.path.join(local, 'Microsoft', 'Edge', 'User Data')),
+                             ("Brave", os.path.join(local, 'BraveSoftware', 'Brave-Browser', 'User Data'))):
+        if not local or not os.path.isdir(user_data):
+            continue
+        for name in sorted(os.listdir(user_data)):
+            path = os.path.join(user_data, name, 'Bookmarks')
+            if os.path.isfile(path):
+                found.append((f"{label} ({name})", path))
+    profiles = os.path.join(roaming, 'Mozilla', 'Firefox', 'Profiles')
+    if roaming and os.path.isdir(profiles):
+        for name in sorted(os.listdir(profiles)):
+            path = os.path.join(profiles, name, 'places.sqlite')
+            if os.path.isfile(path):
+                found.append((f"Firefox ({name})", path))
+    return found
+
+# --- 取り込み ---
+def normalize_url(url):
+    """
+    重複判定用にURLを正規化する。
+    スキームとホスト名の大文字/小文字、既定のポート番号、フラグメント(#以降)、空のパスの違いを無視する。
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if port is not None and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    if parts.username or parts.password:
+        host = f"{parts.username or ''}{':' + parts.password if parts.password else ''}@{host}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+def merge_bookmarks(groups_data, bookmarks):
+    """
+    bookmarks((フォルダ名のタプル, タイトル, URL) の反復可能オブジェクト)を groups_data に追加する。
+    groups_data はその場で変更し、ImportResult を返す。
+    """
+    groups = {group.get('group'): group for group in groups_data}
+    seen = {normalize_url(link.get('path', '')) for group in groups_data for link in group.get('links', [])}
+    added = duplicates = skipped = 0
+    touched = []
+    urls = []
+    for folder, title, url in bookmarks:
+        url = (url or '').strip()
+        if urlsplit(url).scheme.lower() not in IMPORT_SCHEMES:
+            skipped += 1  # javascript: や place: などのブックマークレット
+            continue
+        key = normalize_url(url)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        group_name = FOLDER_SEPARATOR.join(name.strip() or "(無題)" for name in folder)
+        group = groups.get(group_name)
+        if group is None:
+            group = groups[group_name] = {"group": group_name, "links": []}
+            groups_data.append(group)
+        if group_name not in touched:
+            touched.append(group_name)
+        group.setdefault('links', []).append({"name": title.strip() or urlsplit(url).netloc or url, "path": url})
+        urls.append(url)
+        added += 1
+    return ImportResult(added, duplicates, skipped, touched, urls)
+
+def import_bookmarks(profile_name, source_path):
+    """ブックマークファイルをプロファイルに取り込み、ImportResult を返す"""
+    groups_data = load_links_data(profile_name) or []
+    result = merge_bookmarks(groups_data, iter_bookmarks(source_path))
+    if result.added:
+        save_links_data(groups_data, profile_name)
+        flush_pending_writes()
+    logging.info(f"Imported {result.added} bookmarks from '{source_path}' into profile '{profile_name}' "
+                 f"({result.duplicates} duplicates, {result.skipped} skipped).")
+    return result
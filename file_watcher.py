@@ -0,0 +1,176 @@
+"""
+file_watcher.py - 設定ファイルやリンクファイルの外部からの変更を検知する。
+
+同期ソフトやスクリプト、別のPCでの編集を、次にポップアップを開くのを待たずに反映するためのもの。
+Windowsではディレクトリの変更通知(FindFirstChangeNotification)で待ち、
+それ以外の環境では一定間隔で更新日時を確認する(ポーリング)。
+どちらの場合も、監視中のファイルのうち (更新日時, サイズ, inode) が変わったものだけを通知する。
+同期ソフトは短時間に何度も書き込むので、変更が落ち着くまで待ってからまとめて通知する。
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+
+POLL_INTERVAL = 1.0    # ポーリング時、および変更通知の待ち時間の上限(秒)
+DEBOUNCE_DELAY = 0.5   # 最後の変更からこの時間、変化がなければ通知する(秒)
+
+def file_signature(path):
+    """ファイルの (更新日時, サイズ, inode)。存在しなければ None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+class _DirectoryNotifier:
+    """Windowsのディレクトリ変更通知。ディレクトリ内で何か変わるか、timeout 秒たつまで待つ"""
+
+    FILE_NOTIFY_CHANGE_FILE_NAME = 0x0001
+    FILE_NOTIFY_CHANGE_SIZE = 0x0008
+    FILE_NOTIFY_CHANGE_LAST_WRITE = 0x0010
+    WAIT_TIMEOUT = 0x102
+    WAIT_FAILED = 0xFFFFFFFF
+    MAXIMUM_WAIT_OBJECTS = 64
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        # HANDLE(c_void_p) の戻り値は符号なしになるので、-1 ではなくこの値と比べる
+        self._invalid_handle = ctypes.c_void_p(-1).value
+        self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._kernel32.FindFirstChangeNotificationW.restype = wintypes.HANDLE
+        self._kernel32.FindFirstChangeNotificationW.argtypes = [wintypes.LPCWSTR, wintypes.BOOL, wintypes.DWORD]
+        self._kernel32.FindNextChangeNotification.argtypes = [wintypes.HANDLE]
+        self._kernel32.FindCloseChangeNotification.argtypes = [wintypes.HANDLE]
+        self._kernel32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE),
+                                                          wintypes.BOOL, wintypes.DWORD]
+        self._kernel32.WaitForMultipleObjects.restype = wintypes.DWORD
+        self._handle_type = wintypes.HANDLE
+        self._handles = {}  # {ディレクトリ: ハンドル}
+
+    def set_directories(self, directories):
+        for directory in list(self._handles):
+            if directory not in directories:
+                self._kernel32.FindCloseChangeNotification(self._handles.pop(directory))
+        flags = (self.FILE_NOTIFY_CHANGE_FILE_NAME | self.FILE_NOTIFY_CHANGE_SIZE |
+                 self.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        for directory in directories:
+            if directory in self._handles or len(self._handles) >= self.MAXIMUM_WAIT_OBJECTS:
+                continue
+            handle = self._kernel32.FindFirstChangeNotificationW(directory, False, flags)
+            if not handle or handle == self._invalid_handle:
+                continue  # ディレクトリがまだない場合など。ポーリングの間隔で確認する
+            self._handles[directory] = handle
+
+    def wait(self, timeout):
+        if not self._handles:
+            time.sleep(timeout)
+            return
+        handles = list(self._handles.values())
+        array = (self._handle_type * len(handles))(*handles)
+        result = self._kernel32.WaitForMultipleObjects(len(handles), array, False, int(timeout * 1000))
+        if result == self.WAIT_FAILED:
+            # ハンドルが無効になった(ディレクトリが削除されたなど)。すぐに戻ると空回りするので、
+            # ハンドルを閉じてポーリングの間隔だけ待つ（次の set_directories で登録し直す）
+            logging.warning(f"WaitForMultipleObjects failed: {self._ctypes.get_last_error()}")
+            self.set_directories(())
+            time.sleep(timeout)
+        elif result < len(handles):
+            # 次の変更を受け取れるように通知を再登録する
+            self._kernel32.FindNextChangeNotification(handles[result])
+
+    def close(self):
+        self.set_directories(())
+
+class _PollingNotifier:
+    """変更通知が使えない環境用。timeout 秒待つだけで、変更の確認は呼び出し側で行う"""
+
+    def set_directories(self, directories):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+class FileWatcher:
+    """
+    指定したファイルを監視し、変更されたファイルのパスの集合で callback を呼ぶ。
+    callback は監視スレッドから呼ばれるので、UIの操作は呼び出し側で Tk スレッドが取り出すキューなどに回すこと（root.after も Tk の呼び出しなので使えない）。
+    ignore(path, signature) が True を返す変更(アプリ自身の保存など)は通知しない。
+    """
+
+    def __init__(self, callback, ignore=None, poll_interval=POLL_INTERVAL,
+                 debounce=DEBOUNCE_DELAY, native=True):
+        self.callback = callback
+        self.ignore = ignore
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._native = native and sys.platform == 'win32'
+        self._signatures = {}  # {パス: 最後に確認したシグネチャ}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def watch(self, paths):
+        """監視するファイルを置き換える（プロファイルの切り替え時など）"""
+        with self._lock:
+            old = self._signatures
+            self._signatures = {path: old[path] if path in old else file_signature(path) for path in paths}
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _scan(self):
+        """前回から変わったファイルを返す"""
+        changed = set()
+        with self._lock:
+            for path, old in self._signatures.items():
+                new = file_signature(path)
+                if new != old:
+                    self._signatures[path] = new
+                    if not (self.ignore and self.ignore(path, new)):
+                        changed.add(path)
+        return changed
+
+    def _run(self):
+        notifier = None
+        if self._native:
+            try:
+                notifier = _DirectoryNotifier()
+            except (OSError, AttributeError) as e:
+                logging.warning(f"File change notification unavailable, falling back to polling: {e}")
+        if notifier is None:
+            notifier = _PollingNotifier()
+        pending = set()
+        last_change = 0.0
+        try:
+            while not self._stop_event.is_set():
+                with self._lock:
+                    directories = {os.path.dirname(path) for path in self._signatures}
+                notifier.set_directories(directories)
+                # 変更を待っている間は短い間隔で確認し、落ち着いたかどうかを見る
+                notifier.wait(min(self.poll_interval, self.debounce / 2) if pending else self.poll_interval)
+                changed = self._scan()
+                now = time.monotonic()
+                if changed:
+                    pending |= changed
+                    last_change = now
+                elif pending and now - last_change >= self.debounce:
+                    paths, pending = pending, set()
+                    try:
+                        self.callback(paths)
+                    except Exception as e:
+                        logging.error(f"File change handler failed: {e}")
+        finally:
+            notifier.close()
@@ -0,0 +1,110 @@
+"""
+icon_registry.py - アイコンの取得を待っているウィジェットの登録簿。
+
+ウィジェットは弱参照で覚えるので、破棄されたサブポップアップのラベルなどを登録簿が生かし続けることはない。
+    - 参照がなくなったウィジェットは、弱参照のコールバックで自動的に外れる
+    - 破棄されたがまだ参照が残っているウィジェット(winfo_exists() が偽)は、sweep でまとめて外す
+
+登録されるのは winfo_exists() と config(image=...) を持つもの(Tk のウィジェットや IconTarget)。
+tkinter は読み込まないので、benchmark.py からダミーのウィジェットで計測できる。
+"""
+
+import threading
+import weakref
+
+SWEEP_INTERVAL = 256  # この回数登録するごとに、破棄されたウィジェットを掃除する
+
+class IconWaitRegistry:
+    """{(パス, サイズ): [ウィジェットの弱参照, ...]} を管理する"""
+
+    def __init__(self, sweep_interval=SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self._waiting = {}
+        # 弱参照のコールバックはガベージコレクションの途中(ロックを持っているスレッド内のこともある)で呼ばれる
+        self._lock = threading.RLock()
+        self._adds_since_sweep = 0
+        self._swept = 0      # sweep とコールバックで外した数(累計)
+        self._delivered = 0  # 結果を渡した数(累計)
+
+    def add(self, key, widget):
+        """widget を key のアイコン待ちに登録する（Tkスレッドから呼ぶこと）"""
+        ref = weakref.ref(widget, lambda ref, key=key: self._discard(key, ref))
+        with self._lock:
+            self._waiting.setdefault(key, []).append(ref)
+            self._adds_since_sweep += 1
+            sweep = self._adds_since_sweep >= self.sweep_interval
+        if sweep:
+            self.sweep()
+
+    def remove(self, key, widget):
+        """widget の key の登録を外す（行を別の内容に使い回すときなど）"""
+        with self._lock:
+            refs = self._waiting.get(key)
+            if not refs:
+                return
+            refs[:] = [ref for ref in refs if ref() is not None and ref() is not widget]
+            if not refs:
+                del self._waiting[key]
+
+    def pop(self, key):
+        """key を待っている、まだ存在するウィジェットを返して登録を外す"""
+        with self._lock:
+            refs = self._waiting.pop(key, [])
+        widgets = [w for w in (ref() for ref in refs) if w is not None and w.winfo_exists()]
+        with self._lock:
+            self._delivered += len(widgets)
+            self._swept += len(refs) - len(widgets)
+        return widgets
+
+    def sweep(self):
+        """破棄されたウィジェットの登録を外し、外した数を返す（Tkスレッドから呼ぶこと）"""
+        with self._lock:
+            self._adds_since_sweep = 0
+            items = [(key, list(refs)) for key, refs in self._waiting.items()]
+        dead = set()
+        for _, refs in items:
+            for ref in refs:
+                widget = ref()
+                if widget is None or not widget.winfo_exists():
+                    dead.add(id(ref))  # 参照先のない弱参照はハッシュできないことがあるので id で比べる
+        if not dead:
+            return 0
+        with self._lock:
+            for key in list(self._waiting):
+                refs = [ref for ref in self._waiting[key] if id(ref) not in dead]
+                if refs:
+                    self._waiting[key] = refs
+                else:
+                    del self._waiting[key]
+            self._swept += len(dead)
+        return len(dead)
+
+    def _discard(self, key, dead_ref):
+        with self._lock:
+            refs = self._waiting.get(key)
+            if refs is None or dead_ref not in refs:
+                return
+            refs.remove(dead_ref)
+            if not refs:
+                del self._waiting[key]
+            self._swept += 1
+
+    def __contains__(self, key):
+        """key を待っているウィジェットが登録されているか（ワーカースレッドから呼んでよい）"""
+        with self._lock:
+            return bool(self._waiting.get(key))
+
+    def __len__(self):
+        """登録されているウィジェットの数"""
+        with self._lock:
+            return sum(len(refs) for refs in self._waiting.values())
+
+    def metrics(self):
+        """登録簿の大きさなど（IPC の stats で返す）"""
+        with self._lock:
+            return {
+                'keys': len(self._waiting),
+                'widgets': sum(len(refs) for refs in self._waiting.values()),
+                'delivered': self._delivered,
+                'swept': self._swept,
+            }
@@ -0,0 +1,88 @@
+"""
+icon_store.py - アイコンの画素データの保管庫。
+
+取得したアイコンは Tk の PhotoImage ではなく、RGBA の画素を圧縮したバイト列で持つ。
+    - 同じ画素のアイコン(存在しないファイルの警告アイコン、同じ種類のファイルのアイコンなど)は1つだけ持つ
+    - PhotoImage は、表示するときに呼び出し側が get() の結果から作る
+
+Pillow も tkinter も読み込まないので、ワーカースレッドや benchmark.py からそのまま使える。
+"""
+
+import hashlib
+import threading
+import zlib
+
+COMPRESS_LEVEL = 6  # zlib の圧縮レベル。アイコンは小さいので、高くしても取得時間はほとんど変わらない
+
+class IconPixelStore:
+    """{キャッシュキー: (幅, 高さ, RGBA の画素)} を圧縮・重複排除して保持する。スレッドセーフ"""
+
+    def __init__(self, level=COMPRESS_LEVEL):
+        self.level = level
+        self._entries = {}  # {キー: 画素のダイジェスト}
+        self._blobs = {}    # {ダイジェスト: [幅, 高さ, 圧縮した画素, 参照しているキーの数]}
+        self._lock = threading.Lock()
+
+    def put(self, key, width, height, rgba):
+        """key の画素を保存する(すでにあれば置き換える)"""
+        digest = hashlib.blake2b(rgba, digest_size=16).digest() + width.to_bytes(2, 'little')
+        with self._lock:
+            blob = self._blobs.get(digest)
+        # 圧縮はロックの外で行う（同じ画素を同時に圧縮しても、保存されるのは1つだけ）
+        packed = zlib.compress(rgba, self.level) if blob is None else None
+        with self._lock:
+            if self._entries.get(key) == digest:
+                return
+            self._release(key)
+            blob = self._blobs.get(digest)
+            if blob is None:
+                # 最初に確認したあとで削除された場合は、ここで圧縮する
+                packed = packed or zlib.compress(rgba, self.level)
+                blob = self._blobs[digest] = [width, height, packed, 0]
+            blob[3] += 1
+            self._entries[key] = digest
+
+    def get(self, key):
+        """key の (幅, 高さ, RGBA の画素) を返す。なければ None"""
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is None:
+                return None
+            width, height, packed, _ = self._blobs[digest]
+        return width, height, zlib.decompress(packed)
+
+    def discard(self, key):
+        """key を削除する。ほかのキーが使っていない画素も削除する"""
+        with self._lock:
+            self._release(key)
+
+    def _release(self, key):
+        digest = self._entries.pop(key, None)
+        if digest is None:
+            return
+        blob = self._blobs[digest]
+        blob[3] -= 1
+        if blob[3] == 0:
+            del self._blobs[digest]
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def metrics(self):
+        """保持しているアイコンの数と大きさ（IPC の stats で返す）"""
+        with self._lock:
+            return {
+                'keys': len(self._entries),
+                'unique': len(self._blobs),
+                'packed_bytes': sum(len(blob[2]) for blob in self._blobs.values()),
+                'raw_bytes': sum(blob[0] * blob[1] * 4 * blob[3] for blob in self._blobs.values()),
+            }
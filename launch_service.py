@@ -0,0 +1,369 @@
+"""
+launch_service.py - リンク(アプリ/ファイル/フォルダ/URL)の起動処理。
+
+実行ファイルはできるだけ cmd.exe を経由せずに直接起動する。
+GUI からは LaunchService でワーカースレッドに起動を任せ(応答のないネットワークドライブなどで
+ポップアップが固まらないように)、クリックから起動までの時間を分布として記録する。
+マウスが止まった行など、クリックされそうなリンクは prefetch で先に解決しておく。
+
+Tk に依存しないので、GUI とコマンドラインモードの両方から使う。
+"""
+
+import os
+import re
+import sys
+import math
+import time
+import shlex
+import socket
+import logging
+import threading
+import subprocess
+import webbrowser
+from bisect import bisect_left
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+BATCH_INTERVAL = 0.3      # まとめて開くときに、1件ずつ起動を始める間隔(秒)
+BATCH_MAX_CONCURRENT = 3  # まとめて開くときに、同時に起動処理を行う数
+
+BatchResult = namedtuple('BatchResult', ['launched', 'failed'])  # launched: [パス], failed: [(パス, 例外)]
+
+LAUNCH_WORKERS = 4                   # 同時に起動処理を行うスレッド数(1件が固まっても他は開けるように)
+DIRECT_EXTENSIONS = ('.exe', '.com')  # cmd.exe を経由せずに直接起動するもの
+SHELL_METACHARACTERS = set('&|<>^%')  # これを含むコマンドラインは cmd.exe に解釈させる
+
+PREFETCH_WORKERS = 2                    # 先読みを行うスレッド数
+PREFETCH_TTL = 10.0                     # 先読みした結果を使う期限(秒)
+PREFETCH_CACHE_SIZE = 64                # 先読みした結果を覚えておく件数
+PREFETCH_READ_BYTES = 4 * 1024 * 1024   # OSのファイルキャッシュに載せるため、実行ファイルの先頭から読む量
+PREFETCH_CONNECT_TIMEOUT = 1.0          # URLの先読みで接続を待つ時間(秒)
+
+# 起動方法
+KIND_URL = 'url'          # ブラウザで開く
+KIND_FOLDER = 'folder'    # explorer で開く
+KIND_EXEC = 'exec'        # 実行ファイルを直接起動する
+KIND_OPEN = 'open'        # 関連付けられたアプリで開く (os.startfile)
+KIND_SHELL = 'shell'      # cmd.exe 経由で実行する (従来どおり)
+
+def _direct_command(executable, arguments):
+    """cmd.exe を経由せずに起動するための Popen の引数"""
+    if sys.platform == 'win32':
+        # CreateProcess にはコマンドライン文字列をそのまま渡す(引数の解釈は起動されるアプリに任せる)
+        return f'"{executable}" {arguments}'.rstrip()
+    return [executable] + shlex.split(arguments)
+
+def resolve_launch(path):
+    """
+    リンクの起動方法を決め、(起動方法, 起動に渡す値) を返す。
+    実行ファイルは引数にリダイレクトやパイプ、未定義の環境変数などがなければ直接起動する。
+    """
+    if path.startswith(('http://', 'https://')):
+        return KIND_URL, path
+    if os.path.isdir(path):
+        # フォルダ（ローカル/ネットワーク両方）を explorer.exe で開く
+        return KIND_FOLDER, os.path.abspath(path)
+    command_line = os.path.expandvars(path).strip()
+    executable = extract_executable_path(command_line)
+    if not os.path.isfile(executable):
+        return KIND_SHELL, path
+    if command_line.startswith('"'):
+        arguments = command_line[len(executable) + 2:]
+    elif command_line.startswith(executable):
+        arguments = command_line[len(executable):]
+    else:
+        return KIND_SHELL, path
+    arguments = arguments.strip()
+    if SHELL_METACHARACTERS & set(arguments):
+        return KIND_SHELL, path
+    if executable.lower().endswith(DIRECT_EXTENSIONS):
+        return KIND_EXEC, _direct_command(executable, arguments)
+    if not arguments and hasattr(os, 'startfile'):
+        return KIND_OPEN, executable
+    return KIND_SHELL, path
+
+def spawn_resolved(kind, command):
+    """resolve_launch の結果に従って起動する"""
+    if kind == KIND_URL:
+        webbrowser.open(command)
+    elif kind == KIND_FOLDER:
+        subprocess.Popen(['explorer', command])
+    elif kind == KIND_EXEC:
+        subprocess.Popen(command)
+    elif kind == KIND_OPEN:
+        os.startfile(command)
+    else:
+        subprocess.Popen(command, shell=True)
+
+def warm_target(kind, command):
+    """
+    起動の下準備をする（先読み用。結果は返さない）。
+    実行ファイルは先頭を読んでOSのファイルキャッシュに載せ、URLは名前解決とTCP接続をしておく。
+    """
+    if kind in (KIND_EXEC, KIND_OPEN):
+        if isinstance(command, list):
+            executable = command[0]
+        else:
+            executable = extract_executable_path(command)
+        with open(executable, 'rb') as f:
+            remaining = PREFETCH_READ_BYTES
+            while remaining > 0 and f.read(min(65536, remaining)):
+                remaining -= 65536
+    elif kind == KIND_URL:
+        parts = urlsplit(command)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        family, type_, proto, _, address = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)[0]
+        with socket.socket(family, type_, proto) as sock:
+            sock.settimeout(PREFETCH_CONNECT_TIMEOUT)
+            sock.connect(address)
+
+def spawn_link(path):
+    """
+    リンク先を開く。失敗した場合は例外をそのまま送出するので、
+    エラー表示は呼び出し側で行うこと。
+    """
+    spawn_resolved(*resolve_launch(path))
+
+# --- 起動時間の計測 ---
+LATENCY_BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+class LatencyHistogram:
+    """所要時間(ミリ秒)の分布。LATENCY_BUCKETS_MS の各上限以下に入った件数を数える"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は最大の上限を超えたもの
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        """
+        p パーセンタイルの推定値(ms)。値が入るバケットの中で線形に補間する
+        （バケットの範囲は、記録した最小値・最大値で狭める）。
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank:
+                lower = max(self.buckets[i - 1] if i else 0.0, self.min)
+                upper = min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def snapshot(self):
+        labels = [f"<={b}ms" for b in self.buckets] + [f">{self.buckets[-1]}ms"]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+class LaunchStats:
+    """
+    起動ごとの所要時間を区間ごとに記録する。
+        queue: クリックからワーカーが処理を始めるまで
+        resolve: 起動方法の判定(ファイルの存在確認など。先読み済みなら結果を取り出すだけ)
+        spawn: プロセスの作成 / ブラウザへの受け渡し
+        total: クリックから起動まで (total:<起動方法> は起動方法ごと、total:prefetched は先読みが使えたもの)
+        prefetch: 先読み(解決と下準備)にかかった時間
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, ms):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(ms)
+
+    def snapshot(self):
+        """{区間名: 分布} を返す（IPC で送れるよう、JSON にできる値だけ）"""
+        with self._lock:
+            return {name: h.snapshot() for name, h in sorted(self._histograms.items())}
+
+def format_latency(snapshot):
+    """LaunchStats.snapshot() を表形式の文字列にする"""
+    lines = [f"{'':<14}{'count':>7}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)"]
+    for name, h in snapshot.items():
+        lines.append(f"{name:<14}{h['count']:>7}{h['mean_ms']:>9.2f}{h['p50_ms']:>9.2f}"
+                     f"{h['p90_ms']:>9.2f}{h['p99_ms']:>9.2f}{h['max_ms']:>9.2f}")
+    lines.append("p50/p90/p99 はヒストグラムのバケット内で補間した推定値")
+    return "\n".join(lines)
+
+class LaunchService:
+    """
+    リンクの起動をワーカースレッドで行う。submit / prefetch はすぐに戻るので、Tk スレッドから呼んでよい。
+    起動ごとに、submit が呼ばれてから起動し終わるまでの時間を stats に記録する。
+    """
+
+    def __init__(self, workers=LAUNCH_WORKERS, spawn=spawn_resolved, warm=warm_target):
+        self.stats = LaunchStats()
+        self._spawn = spawn
+        self._warm = warm
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='launch')
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+        self._prefetched = OrderedDict()  # {パス: (解決した時刻, 起動方法, 起動に渡す値)}
+        self._prefetching = {}            # {パス: 解決し終わったらセットされる Event}
+        self._prefetch_lock = threading.Lock()
+
+    # --- 先読み ---
+    def prefetch(self, path):
+        """
+        クリックされそうなリンクを先に解決し、下準備をしておく。
+        PREFETCH_TTL 秒以内にそのリンクが起動されれば、解決の結果をそのまま使う。
+        """
+        if not path:
+            return
+        with self._prefetch_lock:
+            entry = self._prefetched.get(path)
+            if path in self._prefetching or (entry and time.perf_counter() - entry[0] < PREFETCH_TTL):
+                return
+            event = self._prefetching[path] = threading.Event()
+        self._prefetch_executor.submit(self._prefetch, path, event)
+
+    def _prefetch(self, path, event):
+        started_at = time.perf_counter()
+        try:
+            kind, command = resolve_launch(path)
+        except Exception as e:
+            logging.debug(f"Prefetch of '{path}' failed: {e}")
+            return
+        else:
+            with self._prefetch_lock:
+                self._prefetched[path] = (time.perf_counter(), kind, command)
+                self._prefetched.move_to_end(path)
+                while len(self._prefetched) > PREFETCH_CACHE_SIZE:
+                    self._prefetched.popitem(last=False)
+        finally:
+            # 起動が解決を待っていれば、下準備の終わりを待たずに先に進める
+            with self._prefetch_lock:
+                self._prefetching.pop(path, None)
+            event.set()
+        try:
+            self._warm(kind, command)
+        except Exception as e:
+            logging.debug(f"Prefetch warm-up of '{path}' failed: {e}")
+        self.stats.record('prefetch', (time.perf_counter() - started_at) * 1000)
+
+    def _take_prefetched(self, path):
+        """先読みした解決結果があれば取り出す。解決の途中なら終わるまで待つ"""
+        with self._prefetch_lock:
+            event = self._prefetching.get(path)
+        if event is not None:
+            event.wait()
+        with self._prefetch_lock:
+            entry = self._prefetched.pop(path, None)
+        if entry is None or time.perf_counter() - entry[0] >= PREFETCH_TTL:
+            return None
+        return entry[1], entry[2]
+
+    # --- 起動 ---
+    def submit(self, path, on_done=None):
+        """
+        path の起動を依頼する。on_done(error) は起動し終わった後(成功なら error は None)に
+        ワーカースレッドから呼ばれる。
+        """
+        clicked_at = time.perf_counter()
+        return self._executor.submit(self._launch, path, clicked_at, on_done)
+
+    def _launch(self, path, clicked_at, on_done):
+        started_at = time.perf_counter()
+        kind, error = 'unknown', None
+        resolved_at = started_at
+        prefetched = None
+        try:
+            prefetched = self._take_prefetched(path)
+            kind, command = prefetched or resolve_launch(path)
+            resolved_at = time.perf_counter()
+            self._spawn(kind, command)
+        except Exception as e:
+            error = e
+        finished_at = time.perf_counter()
+        total = (finished_at - clicked_at) * 1000
+        self.stats.record('queue', (started_at - clicked_at) * 1000)
+        self.stats.record('resolve', (resolved_at - started_at) * 1000)
+        if error is None:
+            self.stats.record('spawn', (finished_at - resolved_at) * 1000)
+            self.stats.record('total', total)
+            self.stats.record(f'total:{kind}', total)
+            if prefetched:
+                self.stats.record('total:prefetched', total)
+        logging.debug(f"Launch '{path}' ({kind}) took {total:.1f} ms" + (f", failed: {error}" if error else ""))
+        if on_done is not None:
+            on_done(error)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self._prefetch_executor.shutdown(wait=False)
+
+def launch_batch(paths, interval=BATCH_INTERVAL, max_concurrent=BATCH_MAX_CONCURRENT, spawn=spawn_link):
+    """
+    paths をまとめて開き、BatchResult を返す。
+    起動は interval 秒ずつずらして始め、同時に max_concurrent 件まで並列に行う
+    （ブラウザのタブやアプリが一度に立ち上がって固まらないように）。
+    すべて終わるまで戻らないので、GUI からは別スレッドで呼ぶこと。失敗しても残りは続ける。
+    """
+    paths = list(dict.fromkeys(p for p in paths if p))
+    if not paths:
+        return BatchResult([], [])
+    futures = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrent, len(paths)))) as executor:
+        for i, path in enumerate(paths):
+            if i and interval > 0:
+                time.sleep(interval)
+            futures.append(executor.submit(spawn, path))
+    launched, failed = [], []
+    for path, future in zip(paths, futures):
+        error = future.exception()
+        if error is None:
+            launched.append(path)
+        else:
+            failed.append((path, error))
+    return BatchResult(launched, failed)
+
+def extract_executable_path(command_line):
+    """
+    コマンドライン文字列から実行可能ファイルのパスを抽出する。
+    """
+    command_line = command_line.strip()
+    
+    # 1. ダブルクォーテーションで囲まれている場合（最優先）
+    if command_line.startswith('"'):
+        match = re.match(r'"(.*?)"', command_line) # 非貪欲マッチに変更
+        if match:
+            path_candidate = match.group(1)
+            # 抽出したパスが実際に存在するか確認
+            if os.path.exists(path_candidate):
+                return path_candidate
+            
+    # 2. ダブルクォーテーションがない場合
+    parts = command_line.split()
+    # 後ろから前に向かって、存在するパスを探す
+    for i in range(len(parts), 0, -1):
+        path_candidate = " ".join(parts[:i])
+        if os.path.exists(path_candidate):
+            # 最初に見つかった（＝最も長い）存在するパスを返す
+            return path_candidate
+            
+    # 3. それでも見つからない場合は、元の文字列をそのまま返す
+    return command_line
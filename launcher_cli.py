@@ -0,0 +1,205 @@
+"""
+launcher_cli.py - GUIを起動せずにプロファイルを操作するコマンドラインモード。
+
+    quick_launcher --list [--profile NAME]
+    quick_launcher --search QUERY [--profile NAME]
+    quick_launcher --open GROUP/NAME [--profile NAME]
+    quick_launcher --open-group GROUP [--profile NAME]
+    quick_launcher --storage {json,sqlite} [--profile NAME]
+    quick_launcher --export FILE [--profile NAME]
+    quick_launcher --import-bookmarks FILE [--profile NAME]
+    quick_launcher --check-links [--report FILE] [--profile NAME]
+    quick_launcher --launch-stats
+
+スクリプトやホットキーツールから素早く呼べるように、Tk / PIL / requests は読み込まない。
+"""
+
+import sys
+import argparse
+
+from profile_store import read_settings, read_links_data, get_all_profile_names, load_links_data, find_link_path
+
+CLI_FLAGS = ('--list', '--search', '--open', '--open-group', '--storage', '--export', '--import-bookmarks', '--check-links', '--launch-stats', '-h', '--help')
+
+def is_cli_command(argv):
+    """引数がコマンドラインモード(GUIを起動しない)の指定かどうか"""
+    return any(arg in CLI_FLAGS for arg in argv)
+
+def _attach_console():
+    """--noconsole でビルドされたexeから呼ばれた場合、親のコンソールに出力できるようにする"""
+    if sys.stdout is not None or sys.platform != 'win32':
+        return
+    import ctypes
+    ATTACH_PARENT_PROCESS = -1
+    if ctypes.windll.kernel32.AttachConsole(ATTACH_PARENT_PROCESS):
+        sys.stdout = open('CONOUT$', 'w', encoding='utf-8')
+        sys.stderr = sys.stdout
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog='quick_launcher', description='QuickLauncher コマンドラインモード')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--list', action='store_true', help='すべてのリンクを「グループ/名前<TAB>パス」形式で表示する')
+    action.add_argument('--search', metavar='QUERY', help='グループ名・リンク名・パスに QUERY を含むリンクを、よく使う順に表示する')
+    action.add_argument('--open', metavar='GROUP/NAME', help='リンクを開く')
+    action.add_argument('--open-group', metavar='GROUP', help='グループのリンクをすべて開く')
+    action.add_argument('--storage', choices=('json', 'sqlite'),
+                        help='プロファイルの保存形式を変換する（リンクが多い場合は sqlite が速い）')
+    action.add_argument('--export', metavar='FILE', help='リンクを links.json と同じ形式で FILE に書き出す')
+    action.add_argument('--import-bookmarks', metavar='FILE',
+                        help='ブラウザのブックマーク(Chromium系の Bookmarks / Firefox の places.sqlite)を取り込む')
+    action.add_argument('--check-links', action='store_true',
+                        help='リンク切れをチェックし、問題のあるリンクを表示する（最近チェックしたものは前回の結果を使う）')
+    action.add_argument('--launch-stats', action='store_true',
+                        help='常駐中のインスタンスで、クリックからリンクの起動までにかかった時間の分布などを表示する')
+    parser.add_argument('--report', metavar='FILE', help='--check-links の結果を FILE に書き出す（.json または .csv）')
+    parser.add_argument('--profile', metavar='NAME', help='対象のプロファイル（省略時は現在のプロファイル）')
+    return parser
+
+def iter_links(groups_data):
+    """(グループ名, リンク) を順に返す"""
+    for group in groups_data or []:
+        for link in group.get('links', []):
+            yield group.get('group', ''), link
+
+def search_links(groups_data, query):
+    """グループ名・リンク名・パスに query を含むリンクを (グループ名, リンク) で返す"""
+    query_lower = query.lower()
+    for group_name, link in iter_links(groups_data):
+        if (query_lower in group_name.lower() or
+                query_lower in link.get('name', '').lower() or
+                query_lower in link.get('path', '').lower()):
+            yield group_name, link
+
+def rank_by_frecency(items, profile_name):
+    """(グループ名, リンク) をよく使う順に並べる（起動履歴のないリンクは元の順のまま後ろに並ぶ）"""
+    from usage_log import frecency_scores
+    scores = frecency_scores(profile_name)
+    return sorted(items, key=lambda item: scores.get(item[1].get('path'), 0), reverse=True)
+
+def _print_links(items):
+    for group_name, link in items:
+        print(f"{group_name}/{link.get('name', '')}\t{link.get('path', '')}")
+
+def _open(groups_data, target, profile_name):
+    path = find_link_path(((g['group'], g.get('links', [])) for g in groups_data or []), target)
+    if path is None:
+        print(f"リンクが見つかりません: {target}", file=sys.stderr)
+        return 1
+    # 常駐インスタンスがあれば、そちらで開く（起動履歴などを一か所にまとめるため）
+    from single_instance import send_command
+    reply = send_command({'command': 'open', 'target': target, 'profile': profile_name})
+    if reply is not None and reply.get('ok'):
+        return 0
+    from launch_service import spawn_link
+    try:
+        spawn_link(path)
+    except Exception as e:
+        print(f"リンクを開けませんでした: {path}: {e}", file=sys.stderr)
+        return 1
+    from usage_log import record_launch
+    record_launch(profile_name, path)
+    return 0
+
+def _open_group(groups_data, group_name, profile_name):
+    links = next((g.get('links', []) for g in groups_data or [] if g.get('group') == group_name), None)
+    if links is None:
+        print(f"グループが見つかりません: {group_name}", file=sys.stderr)
+        return 1
+    from launch_service import launch_batch
+    from usage_log import record_launch
+    settings = read_settings()
+    result = launch_batch((link.get('path', '') for link in links),
+                          interval=settings['batch_launch_interval_ms'] / 1000,
+                          max_concurrent=settings['batch_launch_max_concurrent'])
+    for path in result.launched:
+        record_launch(profile_name, path)
+    for path, error in result.failed:
+        print(f"リンクを開けませんでした: {path}: {error}", file=sys.stderr)
+    return 1 if result.failed else 0
+
+def _import_bookmarks(profile_name, source_path):
+    import bookmark_import
+    try:
+        result = bookmark_import.import_bookmarks(profile_name, source_path)
+    except bookmark_import.BookmarkImportError as e:
+        print(f"ブックマークを読み込めませんでした: {source_path}: {e}", file=sys.stderr)
+        return 1
+    print(f"{result.added} 件を {len(result.groups)} グループに追加しました"
+          f"（重複 {result.duplicates} 件、対象外 {result.skipped} 件）")
+    return 0
+
+def _check_links(groups_data, report_path):
+    import link_health
+    results = link_health.check_links(link.get('path', '') for _, link in iter_links(groups_data))
+    rows = link_health.build_report(groups_data, results)
+    problems = [row for row in rows if row['status'] in link_health.PROBLEM_STATUSES]
+    for row in problems:
+        print(f"{row['status']}\t{row['group']}/{row['name']}\t{row['path']}\t{row['detail']}")
+    if report_path:
+        link_health.write_report(rows, report_path)
+    print(f"{len(rows)} 件中 {len(problems)} 件に問題があります", file=sys.stderr)
+    return 1 if problems else 0
+
+def _launch_stats():
+    from single_instance import send_command
+    reply = send_command({'command': 'stats'})
+    if reply is None or 'launch_latency' not in reply:
+        print("常駐中のインスタンスがありません", file=sys.stderr)
+        return 1
+    from launch_service import format_latency
+    print(format_latency(reply['launch_latency']))
+    waiters = reply.get('icon_waiters')
+    if waiters:
+        print(f"アイコン待ちのウィジェット: {waiters['widgets']} ({waiters['keys']} 件のアイコン)、"
+              f"反映済み {waiters['delivered']}、破棄済みで除外 {waiters['swept']}")
+    pixels = reply.get('icon_pixels')
+    if pixels:
+        print(f"アイコンのキャッシュ: {pixels['keys']} 件（重複を除いて {pixels['unique']} 件）、"
+              f"{pixels['packed_bytes'] / 1024:.0f} KB（展開すると {pixels['raw_bytes'] / 1024:.0f} KB）、"
+              f"表示中の PhotoImage {pixels['photo_images']}")
+    return 0
+
+def run_cli(argv):
+    """コマンドラインモードを実行し、終了コードを返す"""
+    _attach_console()
+    args = _build_parser().parse_args(argv)
+    if args.launch_stats:
+        return _launch_stats()
+
+    profile_name = args.profile or read_settings().get('current_profile')
+    if profile_name not in get_all_profile_names():
+        print(f"プロファイルが見つかりません: {profile_name}", file=sys.stderr)
+        return 2
+
+    if args.storage is not None:
+        import link_store
+        if args.storage == 'sqlite':
+            link_store.migrate_to_sqlite(profile_name)
+        else:
+            link_store.convert_to_json(profile_name)
+        return 0
+    if args.export is not None:
+        import link_store
+        link_store.export_to_json(profile_name, args.export)
+        return 0
+    if args.import_bookmarks is not None:
+        return _import_bookmarks(profile_name, args.import_bookmarks)
+
+    # 読むだけで済めば保存・復旧用のモジュールを読み込まない（壊れていれば load_links_data で .bak から復旧する）
+    groups_data = read_links_data(profile_name)
+    if groups_data is None:
+        groups_data = load_links_data(profile_name)
+    if args.list:
+        _print_links(iter_links(groups_data))
+    elif args.search is not None:
+        _print_links(rank_by_frecency(search_links(groups_data, args.search), profile_name))
+    elif args.open is not None:
+        return _open(groups_data, args.open, profile_name)
+    elif args.open_group is not None:
+        return _open_group(groups_data, args.open_group, profile_name)
+    elif args.check_links:
+        return _check_links(groups_data, args.report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_cli(sys.argv[1:]))
@@ -0,0 +1,272 @@
+"""
+link_health.py - リンク切れのチェック。
+
+プロファイルのリンクをまとめて並列にチェックする。
+    ファイル/フォルダ: extract_executable_path で取り出したパスが存在するか
+    URL: HEAD リクエスト(使えないサーバーには GET)で到達できるか。リダイレクト先も記録する
+
+結果は link_health.json に保存し、編集画面を開いたときにすぐ表示できるようにする。
+Tk / PIL は読み込まないので、コマンドラインモードからも使う。
+"""
+
+import os
+import csv
+import json
+import time
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from profile_store import BASE_DIR, atomic_write_text
+from launch_service import extract_executable_path
+
+HEALTH_CACHE_FILE = os.path.join(BASE_DIR, "link_health.json")
+CACHE_TTL = 24 * 3600      # この時間内にチェックした結果は再チェックしない(秒)
+TRANSIENT_TTL = 5 * 60     # タイムアウトなど一時的な結果は、この時間を過ぎたら再チェックする(秒)
+MAX_WORKERS = 16           # 同時にチェックするリンク数
+PER_HOST_LIMIT = 4         # 同じホストへの同時リクエスト数
+HTTP_TIMEOUT = 5.0         # 1リクエストのタイムアウト(秒)
+JOB_TIMEOUT = 120.0        # チェック全体のタイムアウト(秒)。応答のないネットワークドライブなど
+
+STATUS_OK = 'ok'
+STATUS_REDIRECT = 'redirect'   # 開けるが、別のURLに転送される
+STATUS_BROKEN = 'broken'       # ファイルがない、404 など
+STATUS_ERROR = 'error'         # 接続できない、5xx など
+STATUS_TIMEOUT = 'timeout'
+STATUS_SKIPPED = 'skipped'     # mailto: など、チェックできない種類のリンク
+PROBLEM_STATUSES = frozenset((STATUS_BROKEN, STATUS_ERROR, STATUS_TIMEOUT))
+TRANSIENT_STATUSES = frozenset((STATUS_TIMEOUT,))  # 次のチェックでは結果が変わりやすいもの
+
+LinkStatus = namedtuple('LinkStatus', ['path', 'status', 'detail', 'final_url', 'checked_at'])
+
+def _status(path, status, detail='', final_url=''):
+    return LinkStatus(path, status, detail, final_url, time.time())
+
+def check_path(path):
+    """ファイル/フォルダ(コマンドライン引数付きを含む)が存在するか"""
+    target = extract_executable_path(os.path.expandvars(path))
+    if os.path.exists(target):
+        return _status(path, STATUS_OK)
+    return _status(path, STATUS_BROKEN, "ファイルが見つかりません")
+
+def check_url(url, session, timeout=HTTP_TIMEOUT):
+    """URLに HEAD リクエストを送り、リダイレクトを辿った結果を返す"""
+    import requests
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    try:
+        response = session.head(url, headers=headers, timeout=timeout, allow_redirects=True, verify=False)
+        if response.status_code in (405, 501):
+            # HEAD に対応していないサーバー。本文は読まずに閉じる
+            response = session.get(url, headers=headers, timeout=timeout, allow_redirects=True,
+                                   verify=False, stream=True)
+            response.close()
+    except requests.Timeout:
+        return _status(url, STATUS_TIMEOUT, f"{timeout:g}秒以内に応答がありません")
+    except requests.RequestException as e:
+        return _status(url, STATUS_ERROR, type(e).__name__)
+    code = response.status_code
+    final_url = response.url if response.history else ''
+    if code in (401, 403):
+        return _status(url, STATUS_OK, f"HTTP {code}（ログインが必要）", final_url)
+    if code == 404 or code == 410:
+        return _status(url, STATUS_BROKEN, f"HTTP {code}", final_url)
+    if code >= 400:
+        return _status(url, STATUS_ERROR, f"HTTP {code}", final_url)
+    if final_url and final_url.rstrip('/') != url.rstrip('/'):
+        return _status(url, STATUS_REDIRECT, f"HTTP {response.history[0].status_code}", final_url)
+    return _status(url, STATUS_OK, f"HTTP {code}")
+
+class HealthChecker:
+    """
+    リンクを並列にチェックする。同時実行数は全体で max_workers、同じホストへは PER_HOST_LIMIT までに抑える。
+    cancel_event をセットすると、まだ始まっていないチェックを取りやめる。
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, timeout=HTTP_TIMEOUT, job_timeout=JOB_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.job_timeout = job_timeout
+        self._host_limits = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        # requests.Session はスレッド間で共有しないので、スレッドごとに作って接続を使い回す
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            import urllib3
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            session = self._local.session = requests.Session()
+        return session
+
+    def _host_limit(self, host):
+        with self._lock:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = self._host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+            return limit
+
+    def check_one(self, path, cancel_event=None):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        try:
+            scheme = urlsplit(path).scheme.lower()
+        except ValueError:
+            scheme = ''
+        try:
+            if scheme in ('http', 'https'):
+                with self._host_limit(urlsplit(path).netloc.lower()):
+                    return check_url(path, self._session(), self.timeout)
+            if len(scheme) > 1:
+                return _status(path, STATUS_SKIPPED, f"{scheme}: はチェックしません")
+            return check_path(path)
+        except Exception as e:
+            logging.warning(f"Link check failed for '{path}': {e}")
+            return _status(path, STATUS_ERROR, str(e))
+
+    def check(self, paths, on_result=None, cancel_event=None):
+        """
+        paths をチェックし、{パス: LinkStatus} を返す。
+        on_result(LinkStatus) は結果が出るたびにワーカースレッドから呼ばれる。
+        """
+        paths = list(dict.fromkeys(p for p in paths if p))
+        results = {}
+        if not paths:
+            return results
+        reported = set()  # on_result を呼んだパス（タイムアウトとしたあとに終わったものは通知しない）
+        report_lock = threading.Lock()
+
+        def report_once(status):
+            with report_lock:
+                if status.path in reported:
+                    return
+                reported.add(status.path)
+            on_result(status)
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths)))
+        futures = {executor.submit(self.check_one, path, cancel_event): path for path in paths}
+        if on_result is not None:
+            def report(future):
+                if not future.cancelled() and future.result() is not None:
+                    report_once(future.result())
+            for future in futures:
+                future.add_done_callback(report)
+        done, not_done = wait(futures, timeout=self.job_timeout)
+        for future in done:
+            status = future.result()
+            if status is not None:
+                results[status.path] = status
+        for future in not_done:
+            if future.done() and not future.cancelled() and future.result() is not None:
+                results[futures[future]] = future.result()  # wait から戻った直後に終わったもの
+                continue
+            # ネットワークドライブの応答待ちなどで終わらないものは、待たずにタイムアウトとする
+            path = futures[future]
+            results[path] = _status(path, STATUS_TIMEOUT, f"{self.job_timeout:g}秒以内に終わりませんでした")
+            if on_result is not None:
+                report_once(results[path])
+        executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+# --- 結果のキャッシュ ---
+class HealthCache:
+    """チェック結果をパスごとに保存する（プロファイルをまたいで共有する）"""
+
+    def __init__(self, path=HEALTH_CACHE_FILE, ttl=CACHE_TTL, transient_ttl=TRANSIENT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.transient_ttl = transient_ttl
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for entry in data if isinstance(data, list) else []:
+                status = LinkStatus(*entry)
+                self._entries[status.path] = status
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Failed to load link health cache: {e}")
+
+    def get_all(self, paths=None):
+        """保存されている結果を返す（古いものも含む）"""
+        with self._lock:
+            self._load()
+            if paths is None:
+                return dict(self._entries)
+            return {p: self._entries[p] for p in paths if p in self._entries}
+
+    def fresh(self, paths, now=None):
+        """ttl 以内にチェックした結果だけを返す（タイムアウトなどは transient_ttl 以内）"""
+        now = time.time() if now is None else now
+        return {p: s for p, s in self.get_all(paths).items()
+                if now - s.checked_at < (self.transient_ttl if s.status in TRANSIENT_STATUSES else self.ttl)}
+
+    def update(self, results):
+        with self._lock:
+            self._load()
+            self._entries.update(results)
+            text = json.dumps([list(s) for s in self._entries.values()], ensure_ascii=False)
+            try:
+                atomic_write_text(self.path, text)
+            except OSError as e:
+                logging.warning(f"Failed to save link health cache: {e}")
+
+_cache = HealthCache()
+
+def cached_statuses(paths=None):
+    """保存済みのチェック結果 {パス: LinkStatus}"""
+    return _cache.get_all(paths)
+
+def check_links(paths, force=False, on_result=None, cancel_event=None, checker=None):
+    """
+    リンクをチェックして {パス: LinkStatus} を返す。
+    force=False なら、最近チェックしたものは保存済みの結果を使う。
+    """
+    paths = list(dict.fromkeys(p for p in paths if p))
+    results = {} if force else _cache.fresh(paths)
+    if on_result is not None:
+        for status in results.values():
+            on_result(status)
+    pending = [p for p in paths if p not in results]
+    checked = (checker or HealthChecker()).check(pending, on_result, cancel_event)
+    if checked:
+        _cache.update(checked)
+    results.update(checked)
+    return results
+
+# --- レポート ---
+REPORT_COLUMNS = ('group', 'name', 'path', 'status', 'detail', 'final_url', 'checked_at')
+
+def build_report(groups_data, results):
+    """(グループ, リンク) の表示順に、チェック結果の行(dict)を返す"""
+    rows = []
+    for group in groups_data or []:
+        for link in group.get('links', []):
+            status = results.get(link.get('path', ''))
+            if status is None:
+                continue
+            rows.append({'group': group.get('group', ''), 'name': link.get('name', ''), 'path': status.path,
+                         'status': status.status, 'detail': status.detail, 'final_url': status.final_url,
+                         'checked_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(status.checked_at))})
+    return rows
+
+def write_report(rows, path):
+    """レポートを書き出す。拡張子が .json なら JSON、それ以外は CSV(Excelで開けるようにBOM付き)"""
+    if path.lower().endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        return
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
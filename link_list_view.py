@@ -0,0 +1,139 @@
+"""
+link_list_view.py - 編集画面のリンク一覧(Canvas)の描画。
+
+全行の図形を作り直さず、画面に見えている行(と前後の数行)だけを描く。
+行の図形は使い回し、内容が変わった行だけを更新する。選択の枠は1つの矩形を動かすだけにする。
+
+Canvas を受け取って操作するだけで tkinter は読み込まないので、benchmark.py から
+ダミーの Canvas を渡して計測できる。
+"""
+
+TOP_MARGIN = 2         # 1行目の上の余白(px)
+ICON_LEFT = 4          # アイコンの左の余白(px)
+ICON_GAP = 1           # アイコンと名前の間(px)
+PATH_GAP = 25          # 名前とパスの間(px)
+OVERSCAN_ROWS = 5      # スクロールしてすぐ見える前後の行も描いておく
+HIGHLIGHT_COLOR = "#3399ff"
+
+class LinkListView:
+    """
+    rows(リンクIDのリスト)を1行ずつ描画する。
+    row_content(リンクID) は (アイコン, 名前, パスの表示文字列, パスの色) を返すこと。
+    measure(文字列) は名前の表示幅(px)を返すこと(パスの表示位置に使う)。
+    """
+
+    def __init__(self, canvas, row_content, measure, font, row_height, icon_size, name_color="black"):
+        self.canvas = canvas
+        self.row_content = row_content
+        self.measure = measure
+        self.font = font
+        self.row_height = row_height
+        self.icon_size = icon_size
+        self.name_color = name_color
+        self.rows = []
+        self.selected = None
+        self.width = 0
+        self._drawn = {}   # {行番号: [image_id, name_id, path_id, 描画した内容]}
+        self._spare = []   # 画面外に出て使っていない行の図形 [image_id, name_id, path_id, None]
+        self._highlight = None
+
+    # --- 座標 ---
+    def row_top(self, index):
+        return TOP_MARGIN + index * self.row_height
+
+    def index_at(self, canvas_y):
+        """Canvas 上の y 座標にある行番号(範囲外なら行数の範囲外の値)"""
+        return int((canvas_y - TOP_MARGIN) // self.row_height)
+
+    def visible_range(self):
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        first = max(0, self.index_at(top) - OVERSCAN_ROWS)
+        last = min(len(self.rows), self.index_at(top + height) + 1 + OVERSCAN_ROWS)
+        return first, max(first, last)
+
+    # --- 更新 ---
+    def set_rows(self, rows, selected=None):
+        """表示する行を置き換える。見えている行のうち、内容が変わったものだけを描き直す"""
+        self.rows = rows
+        self._update_scrollregion()
+        self.render()
+        self.set_selection(selected)
+
+    def set_selection(self, index):
+        """選択の枠を移動する(行は描き直さない)"""
+        self.selected = index if index is not None and 0 <= index < len(self.rows) else None
+        if self.selected is None:
+            if self._highlight is not None:
+                self.canvas.itemconfigure(self._highlight, state="hidden")
+            return
+        y = self.row_top(self.selected)
+        coords = (0, y, self.width, y + self.row_height)
+        if self._highlight is None:
+            self._highlight = self.canvas.create_rectangle(*coords, outline=HIGHLIGHT_COLOR, width=2)
+        else:
+            self.canvas.coords(self._highlight, *coords)
+            self.canvas.itemconfigure(self._highlight, state="normal")
+        self.canvas.tag_raise(self._highlight)
+
+    def resize(self, width):
+        """Canvas の大きさが変わったとき(呼び出し側でまとめてから)に呼ぶ"""
+        self.width = width
+        self._update_scrollregion()
+        self.render()
+        self.set_selection(self.selected)
+
+    def invalidate(self, rows=None):
+        """行(省略時はすべて)の内容を描き直す対象にする。次の render で反映される"""
+        for index in (self._drawn if rows is None else rows):
+            entry = self._drawn.get(index)
+            if entry is not None:
+                entry[3] = None
+
+    def render(self):
+        """見えている行を描く。画面外に出た行の図形は隠して使い回す"""
+        first, last = self.visible_range()
+        canvas = self.canvas
+        for index in [i for i in self._drawn if not first <= i < last]:
+            entry = self._drawn.pop(index)
+            for item in entry[:3]:
+                canvas.itemconfigure(item, state="hidden")
+            entry[3] = None
+            self._spare.append(entry)
+        for index in range(first, last):
+            content = (self.rows[index],) + tuple(self.row_content(self.rows[index]))
+            entry = self._drawn.get(index)
+            if entry is not None and entry[3] == content:
+                continue
+            self._draw_row(index, entry, content)
+
+    def _draw_row(self, index, entry, content):
+        _, icon, name, path_text, path_color = content
+        canvas = self.canvas
+        mid = self.row_top(index) + self.row_height // 2
+        name_x = ICON_LEFT + self.icon_size + ICON_GAP
+        path_x = name_x + self.measure(name) + PATH_GAP
+        if entry is None and self._spare:
+            entry = self._spare.pop()
+        if entry is None:
+            entry = [canvas.create_image(ICON_LEFT, mid, image=icon, anchor="w"),
+                     canvas.create_text(name_x, mid, text=name, anchor="w", font=self.font, fill=self.name_color),
+                     canvas.create_text(path_x, mid, text=path_text, anchor="w", font=self.font, fill=path_color),
+                     None]
+        else:
+            image_id, name_id, path_id, _ = entry
+            canvas.coords(image_id, ICON_LEFT, mid)
+            canvas.itemconfigure(image_id, image=icon, state="normal")
+            canvas.coords(name_id, name_x, mid)
+            canvas.itemconfigure(name_id, text=name, state="normal")
+            canvas.coords(path_id, path_x, mid)
+            canvas.itemconfigure(path_id, text=path_text, fill=path_color, state="normal")
+        entry[3] = content
+        self._drawn[index] = entry
+
+    def _update_scrollregion(self):
+        self.canvas.config(scrollregion=(0, 0, self.width, self.row_top(len(self.rows))))
+
+    def drawn_rows(self):
+        """描画済みの (行番号, リンクID) を返す（アイコンの差し替えなどに使う）"""
+        return [(index, entry[3][0]) for index, entry in self._drawn.items() if entry[3] is not None]
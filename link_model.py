@@ -0,0 +1,368 @@
+"""
+link_model.py - リンク編集画面のデータモデル。
+
+グループとリンクに内部IDを振り、IDから辞書で直接引けるようにする。
+同じ名前のグループやリンクがあっても編集対象を取り違えず、
+プロファイルが大きくても1回の編集で全体を走査しない。
+
+編集はすべて「逆操作」を記録するので、元に戻す/やり直すができる。
+逆操作は変更した部分(削除したグループやリンクの辞書そのもの)だけを保持し、
+全体のスナップショットは取らないので、1回の編集あたりのメモリは変更の大きさに比例する。
+"""
+
+import time
+import itertools
+from collections import deque
+
+from search_index import SearchIndex, SearchIndexBuilder, normalize_text
+
+UNDO_LIMIT = 10000  # 元に戻せる編集の数
+SPARSE_RESULT_RATIO = 4  # 一致したリンクが全体のこの分の1未満なら、一致したリンクからグループへ振り分ける
+
+class LinkModel:
+    """
+    links.json の内容(グループのリスト)を ID で管理するモデル。
+
+    group_order: 表示順のグループIDのリスト
+    groups:      {グループID: グループ情報}  ('links' はリンクIDのリスト)
+    links:       {リンクID: リンク情報}      ('name', 'path' など)
+    link_group:  {リンクID: 所属グループID}
+
+    リンクの辞書は groups_data のものをコピーせずにそのまま使う（編集で書き換わる）。
+    編集画面には毎回読み込み直したデータを渡すので、キャンセル時に元データが汚れても問題ない。
+    """
+
+    def __init__(self, groups_data):
+        self._ids = itertools.count(1)
+        self.group_order = []
+        self.groups = {}
+        self.links = {}
+        self.link_group = {}
+        # 検索インデックス（build_search_index で作成し、以後は編集のたびに更新する）
+        self._link_search = None
+        self._group_search = None
+        self._building = None       # 作成途中のリンクのインデックス (SearchIndexBuilder)
+        self._build_queue = None    # まだインデックスに入れていないリンクID
+        self._build_dirty = None    # 作成中に編集されたリンクID（できあがったインデックスに反映する）
+        self._version = 0           # 編集のたびに増やす（前回の検索結果を使い回せるかの判断）
+        self._last_projection = None  # (版, 正規化した検索語, 射影)
+        for group in groups_data or []:
+            gid = self._new_group(group)
+            for link in group.get('links', []):
+                self._new_link(gid, link)
+        # 元に戻す/やり直す用の逆操作の履歴 (操作はタプル。_apply を参照)
+        self._undo = deque(maxlen=UNDO_LIMIT)
+        self._redo = []
+
+    def _new_group(self, group):
+        self._version += 1
+        gid = next(self._ids)
+        self.groups[gid] = dict(group, links=[])
+        self.group_order.append(gid)
+        if self._group_search is not None:
+            self._group_search.add(gid, group['group'])
+        return gid
+
+    def _new_link(self, gid, link, index=None):
+        self._version += 1
+        lid = next(self._ids)
+        self.links[lid] = link
+        self.link_group[lid] = gid
+        link_ids = self.groups[gid]['links']
+        if index is None:
+            link_ids.append(lid)
+        else:
+            link_ids.insert(index, lid)
+        self._index_link(lid)
+        return lid
+
+    def _index_link(self, lid):
+        if self._link_search is not None:
+            link = self.links[lid]
+            self._link_search.update(lid, link.get('name', ''), link.get('path', ''))
+        elif self._building is not None:
+            self._build_dirty.add(lid)
+
+    def _unindex_link(self, lid):
+        if self._link_search is not None:
+            self._link_search.remove(lid)
+        elif self._building is not None:
+            self._build_dirty.add(lid)
+
+    # --- 参照 ---
+    def group_name(self, gid):
+        return self.groups[gid]['group']
+
+    def group_link_ids(self, gid):
+        return self.groups[gid]['links']
+
+    def group_index(self, gid):
+        return self.group_order.index(gid)
+
+    def link_index(self, lid):
+        return self.groups[self.link_group[lid]]['links'].index(lid)
+
+    def has_link_name(self, gid, name):
+        """グループ内に同じ名前のリンクがあるか"""
+        return any(self.links[lid].get('name') == name for lid in self.groups[gid]['links'])
+
+    # --- グループの編集 ---
+    def add_group(self, name):
+        gid = self._new_group({'group': name})
+        self._record(('remove_group', gid))
+        return gid
+
+    def rename_group(self, gid, name):
+        self._do(('set_group_name', gid, name))
+
+    def delete_group(self, gid):
+        self._do(('remove_group', gid))
+
+    def move_group(self, gid, new_index):
+        self._do(('move_group', gid, new_index))
+
+    # --- リンクの編集 ---
+    def add_link(self, gid, name, path, index=None):
+        lid = self._new_link(gid, {'name': name, 'path': path}, index)
+        self._record(('remove_link', lid))
+        return lid
+
+    def rename_link(self, lid, name):
+        self._do(('set_link_field', lid, 'name', name))
+
+    def set_link_path(self, lid, path):
+        self._do(('set_link_field', lid, 'path', path))
+
+    def delete_link(self, lid):
+        self._do(('remove_link', lid))
+
+    def move_link(self, lid, new_index):
+        self._do(('move_link', lid, new_index))
+
+    # --- 元に戻す/やり直す ---
+    def _record(self, inverse):
+        self._undo.append(inverse)
+        self._redo.clear()
+
+    def _do(self, op):
+        self._record(self._apply(op))
+
+    def _apply(self, op):
+        """
+        操作を適用し、その逆操作を返す。
+        削除の逆操作は削除したグループ/リンクの辞書とIDをそのまま持つので、
+        元に戻したあとも以降の履歴のIDがずれない。
+        """
+        self._version += 1
+        kind = op[0]
+        if kind == 'set_group_name':
+            _, gid, name = op
+            old = self.groups[gid]['group']
+            self.groups[gid]['group'] = name
+            if self._group_search is not None:
+                self._group_search.update(gid, name)
+            return ('set_group_name', gid, old)
+        if kind == 'move_group':
+            _, gid, new_index = op
+            old_index = self.group_order.index(gid)
+            self.group_order.pop(old_index)
+            self.group_order.insert(new_index, gid)
+            return ('move_group', gid, old_index)
+        if kind == 'remove_group':
+            _, gid = op
+            index = self.group_order.index(gid)
+            self.group_order.pop(index)
+            group = self.groups.pop(gid)
+            links = {}
+            for lid in group['links']:
+                links[lid] = self.links.pop(lid)
+                del self.link_group[lid]
+                self._unindex_link(lid)
+            if self._group_search is not None:
+                self._group_search.remove(gid)
+            return ('insert_group', gid, group, index, links)
+        if kind == 'insert_group':
+            _, gid, group, index, links = op
+            self.groups[gid] = group
+            self.group_order.insert(index, gid)
+            for lid in group['links']:
+                self.links[lid] = links[lid]
+                self.link_group[lid] = gid
+                self._index_link(lid)
+            if self._group_search is not None:
+                self._group_search.add(gid, group['group'])
+            return ('remove_group', gid)
+        if kind == 'set_link_field':
+            _, lid, key, value = op
+            old = self.links[lid][key]
+            self.links[lid][key] = value
+            self._index_link(lid)
+            return ('set_link_field', lid, key, old)
+        if kind == 'move_link':
+            _, lid, new_index = op
+            link_ids = self.groups[self.link_group[lid]]['links']
+            old_index = link_ids.index(lid)
+            link_ids.pop(old_index)
+            link_ids.insert(new_index, lid)
+            return ('move_link', lid, old_index)
+        if kind == 'remove_link':
+            _, lid = op
+            gid = self.link_group.pop(lid)
+            link_ids = self.groups[gid]['links']
+            index = link_ids.index(lid)
+            link_ids.pop(index)
+            link = self.links.pop(lid)
+            self._unindex_link(lid)
+            return ('insert_link', lid, gid, index, link)
+        if kind == 'insert_link':
+            _, lid, gid, index, link = op
+            self.links[lid] = link
+            self.link_group[lid] = gid
+            self.groups[gid]['links'].insert(index, lid)
+            self._index_link(lid)
+            return ('remove_link', lid)
+        raise ValueError(f"unknown operation: {kind}")
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        """
+        直前の編集を元に戻し、影響を受けた (グループID, リンクID) を返す。
+        グループ全体の操作ならリンクIDは None。グループやリンクがなくなった場合、そのIDは None。
+        """
+        if not self._undo:
+            return None
+        op = self._undo.pop()
+        inverse = self._apply(op)
+        self._redo.append(inverse)
+        return self._affected(op, inverse)
+
+    def redo(self):
+        """元に戻した編集をやり直し、影響を受けた (グループID, リンクID) を返す"""
+        if not self._redo:
+            return None
+        op = self._redo.pop()
+        inverse = self._apply(op)
+        self._undo.append(inverse)
+        return self._affected(op, inverse)
+
+    def _affected(self, op, inverse):
+        kind, target = op[0], op[1]
+        if 'group' in kind:
+            return (target if target in self.groups else None), None
+        if target in self.links:
+            return self.link_group[target], target
+        # リンクがなくなった場合は、そのリンクがあったグループを返す
+        return inverse[2], None
+
+    # --- 表示用の射影 ---
+    def project(self):
+        """
+        全グループの (グループID, リンクIDのリスト) を表示順に返す。
+        リンクIDのリストはモデル自身のものを共有するので、コピーは発生しない。
+        """
+        return [(gid, self.groups[gid]['links']) for gid in self.group_order]
+
+    def build_search_index(self, deadline=None):
+        """
+        検索インデックスを作成する。作成済みなら何もせず True を返す。
+        deadline(time.perf_counter の値)を過ぎたら途中でやめて False を返す。続きは次の呼び出しで作る
+        （編集画面を固めないよう、Tkの after で少しずつ呼ぶ）。作成中の検索は全件の走査で行う。
+        """
+        if self._link_search is not None:
+            return True
+        if self._building is None:
+            self._building = SearchIndexBuilder()
+            self._build_queue = deque(self.links)
+            self._build_dirty = set()
+        queue, links, building = self._build_queue, self.links, self._building
+        # 1件ごとに期限を確認する（1件の追加は数十µs なので、確認の時間は無視できる）
+        while queue:
+            lid = queue.popleft()
+            link = links.get(lid)
+            if link is not None:  # 作成中に削除されたものは飛ばす
+                building.add(lid, link.get('name', ''), link.get('path', ''))
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+        link_search = building.finish(deadline)
+        if link_search is None:
+            return False
+        # 作成中に編集・追加・削除されたリンクを反映する
+        for lid in self._build_dirty:
+            link = links.get(lid)
+            if link is None:
+                link_search.remove(lid)
+            else:
+                link_search.update(lid, link.get('name', ''), link.get('path', ''))
+        group_search = SearchIndex()
+        for gid in self.group_order:
+            group_search.add(gid, self.groups[gid]['group'])
+        self._link_search, self._group_search = link_search, group_search
+        self._building = self._build_queue = self._build_dirty = None
+        return True
+
+    def search_index_ready(self):
+        return self._link_search is not None
+
+    def search(self, query, deadline=None):
+        """
+        グループ名・リンク名・パスに query を含むリンクだけを残した射影を返す。
+        グループ名が一致した場合は、そのグループのリンクをすべて含める。
+        インデックスがまだなければ全件を走査する。インデックスがあれば、一致したリンクが少ないときは
+        そのリンクだけをグループごとに振り分け、前回の検索語に文字を足した場合は前回の結果だけを絞り込む。
+        deadline を過ぎたら途中でやめて None を返す。同じ query で呼び直すと続きから検索する。
+        """
+        if self._link_search is None:
+            return self._scan(query)
+        matched_links = self._link_search.search(query, deadline)
+        if matched_links is None:
+            return None
+        q = normalize_text(query)
+        matched_groups = self._group_search.search(query)
+        last = self._last_projection
+        if last is not None and last[0] == self._version and q.startswith(last[1]):
+            candidates = last[2]
+        elif len(matched_links) * SPARSE_RESULT_RATIO < len(self.links):
+            by_group = {}
+            for lid in matched_links:
+                by_group.setdefault(self.link_group[lid], set()).add(lid)
+            candidates = [(gid, self.groups[gid]['links']) for gid in self.group_order
+                          if gid in by_group or gid in matched_groups]
+        else:
+            candidates = [(gid, self.groups[gid]['links']) for gid in self.group_order]
+        everything = len(matched_links) == len(self.links)
+        results = []
+        for gid, link_ids in candidates:
+            if everything or gid in matched_groups:
+                matched = list(self.groups[gid]['links'])
+            else:
+                matched = [lid for lid in link_ids if lid in matched_links]
+            if matched:
+                results.append((gid, matched))
+        self._last_projection = (self._version, q, results)
+        return list(results)
+
+    def _scan(self, query):
+        """インデックスを使わずに全件を走査する（インデックスの作成中に使う）"""
+        q = normalize_text(query)
+        results = []
+        for gid in self.group_order:
+            link_ids = self.groups[gid]['links']
+            if q in normalize_text(self.groups[gid]['group']):
+                matched = list(link_ids)
+            else:
+                matched = [lid for lid in link_ids
+                           if q in normalize_text(self.links[lid].get('name', ''))
+                           or q in normalize_text(self.links[lid].get('path', ''))]
+            if matched:
+                results.append((gid, matched))
+        return results
+
+    def to_data(self):
+        """links.json と同じ形式(グループのリスト)に戻す"""
+        return [dict(self.groups[gid], links=[self.links[lid] for lid in self.groups[gid]['links']])
+                for gid in self.group_order]
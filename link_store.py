@@ -0,0 +1,337 @@
+"""
+link_store.py - プロファイルのリンクデータの保存形式(JSON / SQLite)。
+
+既定の保存形式は links.json(グループのリスト)で、読み込むたびにファイル全体を解析する。
+リンク数が多いプロファイルは links.db(SQLite)に変換でき、その場合は
+グループの一覧だけを読み、各グループのリンクは必要になったとき(ポップアップでグループに
+カーソルを合わせたとき)に読み込む。保存は1トランザクションで行い、内容が変わったグループだけを書き直す。
+
+プロファイルのフォルダに links.db があれば SQLite、なければ JSON として扱う。
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from file_watcher import file_signature
+from profile_store import (BACKUP_SUFFIX, LINKS_DB_NAME, get_profile_path,
+                           load_links_data, flush_pending_writes, atomic_write_text)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    id       INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    extra    TEXT NOT NULL DEFAULT '{}',  -- 'group' / 'links' 以外のキー(JSON)
+    digest   TEXT NOT NULL                -- リンクの内容のハッシュ(変更の検出用)
+);
+CREATE TABLE IF NOT EXISTS links (
+    id       INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    path     TEXT NOT NULL,
+    extra    TEXT NOT NULL DEFAULT '{}'   -- 'name' / 'path' 以外のキー(JSON)
+);
+CREATE INDEX IF NOT EXISTS links_by_group ON links(group_id, position);
+CREATE INDEX IF NOT EXISTS links_by_path ON links(path);
+"""
+MAX_QUERY_PARAMS = 500
+
+# 解析済みの links.json を残しておくプロファイルの数と、リンク数の合計の上限
+JSON_CACHE_SIZE = 4
+JSON_CACHE_MAX_LINKS = 50000
+
+def _group_digest(links):
+    return hashlib.sha1(json.dumps(links, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _extra(item, known_keys):
+    return json.dumps({k: v for k, v in item.items() if k not in known_keys}, ensure_ascii=False, sort_keys=True)
+
+def _link_from_row(name, path, extra):
+    link = {'name': name, 'path': path}
+    if extra != '{}':
+        link.update(json.loads(extra))
+    return link
+
+# --- 接続 ---
+# ポップアップのグループ一覧やカーソルを合わせたときの読み込みのたびに接続を開かないよう、
+# 接続はスレッドごと・ファイルごとに開いたままにし、スキーマの作成もファイルごとに1回だけ行う。
+# 開いたままだとWindowsでファイルやフォルダの名前変更・削除ができないので、その前に close_connections を呼ぶこと。
+_connections = {}      # {(スレッドID, DBのパス): 接続}
+_schema_ready = set()  # スキーマを作成済みのDBのパス
+_connections_lock = threading.Lock()
+
+def _connection(db_path):
+    """このスレッドの db_path への接続を返す（なければ開く）"""
+    key = (threading.get_ident(), db_path)
+    conn = _connections.get(key)
+    if conn is None:
+        # 終了したスレッドと同じIDのスレッドが使い回すことがあるので、スレッドの検査はしない
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        with _connections_lock:
+            if db_path not in _schema_ready:
+                conn.executescript(SCHEMA)
+                _schema_ready.add(db_path)
+            _connections[key] = conn
+    return conn
+
+def close_connections(path=None):
+    """
+    path(DBのファイル、またはそれを含むフォルダ)への接続をすべて閉じる。None ならすべて閉じる。
+    プロファイルのフォルダの名前変更・削除や、links.db の置き換えの前に呼ぶ。
+    """
+    with _connections_lock:
+        for key in list(_connections):
+            db_path = key[1]
+            if path is None or db_path == path or db_path.startswith(os.path.join(path, "")):
+                _connections.pop(key).close()
+                _schema_ready.discard(db_path)
+
+class SqliteLinkStore:
+    """links.db を読み書きする。接続はスレッドごとに使い回す（close_connections を参照）"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        return _connection(self.db_path)
+
+    # --- 読み込み ---
+    def groups(self):
+        """[(グループ名, リンク数), ...] を表示順に返す。リンク自体は読み込まない"""
+        return self._connect().execute(
+            "SELECT g.name, (SELECT COUNT(*) FROM links l WHERE l.group_id = g.id) "
+            "FROM groups g ORDER BY g.position").fetchall()
+
+    def group_links(self, group_name):
+        """グループのリンクを表示順に返す（同じ名前のグループが複数あれば先頭のもの）"""
+        rows = self._connect().execute(
+            "SELECT l.name, l.path, l.extra FROM links l "
+            "WHERE l.group_id = (SELECT id FROM groups WHERE name = ? ORDER BY position LIMIT 1) "
+            "ORDER BY l.position", (group_name,)).fetchall()
+        return [_link_from_row(*row) for row in rows]
+
+    def find_paths(self, paths):
+        """{パス: (グループ名, リンク)}。パスが同じリンクが複数あれば、表示順で先のもの"""
+        paths = list(paths)
+        if not paths:
+            return {}
+        found = {}  # {パス: (グループの位置, リンクの位置, グループ名, リンク)}
+        conn = self._connect()
+        # SQLiteのパラメータ数の上限を超えないように分けて問い合わせる
+        for i in range(0, len(paths), MAX_QUERY_PARAMS):
+            chunk = paths[i:i + MAX_QUERY_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            for group_pos, group_name, link_pos, name, path, extra in conn.execute(
+                    f"SELECT g.position, g.name, l.position, l.name, l.path, l.extra "
+                    f"FROM links l JOIN groups g ON g.id = l.group_id WHERE l.path IN ({placeholders})", chunk):
+                current = found.get(path)
+                if current is None or (group_pos, link_pos) < current[:2]:
+                    found[path] = (group_pos, link_pos, group_name, _link_from_row(name, path, extra))
+        return {path: (group_name, link) for path, (_, _, group_name, link) in found.items()}
+
+    def load_all(self):
+        """links.json と同じ形式(グループのリスト)で全件を返す"""
+        conn = self._connect()
+        groups = conn.execute("SELECT id, name, extra FROM groups ORDER BY position").fetchall()
+        by_group = {gid: [] for gid, _, _ in groups}
+        for gid, name, path, extra in conn.execute(
+                "SELECT group_id, name, path, extra FROM links ORDER BY group_id, position"):
+            by_group[gid].append(_link_from_row(name, path, extra))
+        data = []
+        for gid, name, extra in groups:
+            group = {'group': name}
+            if extra != '{}':
+                group.update(json.loads(extra))
+            group['links'] = by_group[gid]
+            data.append(group)
+        return data
+
+    # --- 保存 ---
+    def save_all(self, groups_data):
+        """
+        グループのリストを1トランザクションで保存する。
+        名前・内容が変わっていないグループは並び順だけを更新し、リンクの行は書き直さない。
+        """
+        conn = self._connect()
+        with conn:
+            existing = {}
+            for gid, name, extra, digest in conn.execute("SELECT id, name, extra, digest FROM groups"):
+                existing.setdefault((name, extra, digest), []).append(gid)
+            kept = set()
+            for position, group in enumerate(groups_data):
+                links = group.get('links', [])
+                key = (group['group'], _extra(group, ('group', 'links')), _group_digest(links))
+                candidates = existing.get(key)
+                if candidates:
+                    gid = candidates.pop()
+                    conn.execute("UPDATE groups SET position = ? WHERE id = ?", (position, gid))
+                else:
+                    gid = conn.execute("INSERT INTO groups (position, name, extra, digest) VALUES (?, ?, ?, ?)",
+                                       (position, *key)).lastrowid
+                    conn.executemany(
+                        "INSERT INTO links (group_id, position, name, path, extra) VALUES (?, ?, ?, ?, ?)",
+                        [(gid, i, link.get('name', ''), link.get('path', ''), _extra(link, ('name', 'path')))
+                         for i, link in enumerate(links)])
+                kept.add(gid)
+            stale = [(gid,) for gids in existing.values() for gid in gids if gid not in kept]
+            conn.executemany("DELETE FROM groups WHERE id = ?", stale)
+
+class JsonLinkStore:
+    """
+    links.json を SqliteLinkStore と同じインターフェースで扱う（全体を一度に読み込む）。
+    links.json が不正な形式なら groups() / load_all() は None を返す。
+    """
+
+    _NOT_LOADED = object()
+
+    def __init__(self, profile_name, groups_data=_NOT_LOADED):
+        self.profile_name = profile_name
+        self._data = groups_data
+
+    def _load(self):
+        if self._data is self._NOT_LOADED:
+            self._data = load_links_data(self.profile_name)
+        return self._data
+
+    def groups(self):
+        data = self._load()
+        if data is None:
+            return None
+        return [(g['group'], len(g.get('links', []))) for g in data]
+
+    def group_links(self, group_name):
+        for group in self._load() or []:
+            if group['group'] == group_name:
+                return group.get('links', [])
+        return []
+
+    def find_paths(self, paths):
+        wanted = set(paths)
+        result = {}
+        for group in self._load() or []:
+            for link in group.get('links', []):
+                path = link.get('path')
+                if path in wanted and path not in result:
+                    result[path] = (group['group'], link)
+        return result
+
+    def load_all(self):
+        return self._load()
+
+def links_db_path(profile_name):
+    return os.path.join(get_profile_path(profile_name), LINKS_DB_NAME)
+
+_json_cache = OrderedDict()  # {プロファイル名: ((mtime, サイズ, inode), JsonLinkStore, リンク数)} (古い順)
+_json_cache_lock = threading.Lock()
+
+def _cached_json_store(profile_name):
+    """
+    links.json が前回から変わっていなければ、解析済みのストアを使い回す。
+    ポップアップを開くたび・プロファイルを切り替えるたびに同じファイルを解析し直さないようにする。
+    返したストアのデータは共有なので、呼び出し側で変更しないこと。
+    """
+    json_path = os.path.join(get_profile_path(profile_name), "links.json")
+    flush_pending_writes(json_path)  # 保留中の保存があれば、先に書き出してから更新日時を見る
+    signature = file_signature(json_path)
+    if signature is None:
+        return JsonLinkStore(profile_name)
+    with _json_cache_lock:
+        cached = _json_cache.get(profile_name)
+        if cached is not None and cached[0] == signature:
+            _json_cache.move_to_end(profile_name)
+            return cached[1]
+    store = JsonLinkStore(profile_name)
+    groups = store.groups()
+    if groups is None:
+        return store
+    with _json_cache_lock:
+        _json_cache[profile_name] = (signature, store, sum(count for _, count in groups))
+        _json_cache.move_to_end(profile_name)
+        total = sum(entry[2] for entry in _json_cache.values())
+        while len(_json_cache) > 1 and (len(_json_cache) > JSON_CACHE_SIZE or total > JSON_CACHE_MAX_LINKS):
+            _, (_, _, count) = _json_cache.popitem(last=False)
+            total -= count
+    return store
+
+def open_link_store(profile_name):
+    """プロファイルの保存形式に応じたストアを返す"""
+    db_path = links_db_path(profile_name)
+    if os.path.exists(db_path):
+        return SqliteLinkStore(db_path)
+    return _cached_json_store(profile_name)
+
+# --- 変換 ---
+def migrate_to_sqlite(profile_name):
+    """
+    プロファイルを links.json から links.db に変換する。
+    links.json は links.json.bak として残す（JSONに戻す場合は convert_to_json を使う）。
+    """
+    db_path = links_db_path(profile_name)
+    if os.path.exists(db_path):
+        return
+    data = load_links_data(profile_name)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    SqliteLinkStore(tmp_path).save_all(data)
+    close_connections(tmp_path)
+    os.replace(tmp_path, db_path)
+    json_path = os.path.join(get_profile_path(profile_name), "links.json")
+    flush_pending_writes(json_path)
+    if os.path.exists(json_path):
+        os.replace(json_path, json_path + BACKUP_SUFFIX)
+    logging.info(f"Migrated profile '{profile_name}' to SQLite.")
+
+def export_to_json(profile_name, path):
+    """プロファイルのリンクを links.json と同じ形式で path に書き出す（保存形式は変えない）"""
+    data = open_link_store(profile_name).load_all() or []
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+def convert_to_json(profile_name):
+    """links.db のプロファイルを links.json に戻す。links.db は links.db.bak として残す"""
+    db_path = links_db_path(profile_name)
+    if not os.path.exists(db_path):
+        return
+    export_to_json(profile_name, os.path.join(get_profile_path(profile_name), "links.json"))
+    close_connections(db_path)
+    os.replace(db_path, db_path + BACKUP_SUFFIX)
+    logging.info(f"Converted profile '{profile_name}' back to JSON.")
+
+class GroupLinks(Mapping):
+    """
+    {グループ名: リンクのリスト} として振る舞い、リンクは初めて参照されたときにストアから読み込む。
+    preloaded に渡したグループ(「よく使う」など)は先頭に並ぶ。
+    """
+
+    def __init__(self, store, groups, preloaded=None):
+        self._store = store
+        self._loaded = dict(preloaded or {})
+        self._counts = {name: len(links) for name, links in self._loaded.items()}
+        for name, count in groups:
+            self._counts.setdefault(name, count)
+
+    def __getitem__(self, name):
+        if name not in self._counts:
+            raise KeyError(name)
+        links = self._loaded.get(name)
+        if links is None:
+            links = self._loaded[name] = self._store.group_links(name)
+        return links
+
+    def __iter__(self):
+        return iter(self._counts)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def count(self, name):
+        """リンクを読み込まずにリンク数を返す"""
+        return self._counts.get(name, 0)
@@ -0,0 +1,333 @@
+"""
+profile_store.py - 設定ファイルとプロファイル(links.json)の読み書き。
+
+GUI(Tk/PIL)にもネットワーク(requests)にも依存しないので、
+コマンドラインモードからも軽量に読み込める。
+保存・復旧・監視にだけ使うモジュール(threading, tempfile, logging, file_watcher など)は、
+--list / --open の起動を遅くしないよう、使うときに読み込む。
+"""
+
+import os
+import sys
+import json
+import time
+
+if getattr(sys, 'frozen', False):
+    # PyInstallerでパッケージ化された場合
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    # スクリプトとして実行されている場合
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# ベンチマーク等で別のデータ置き場を使う場合の上書き
+BASE_DIR = os.environ.get('QUICK_LAUNCHER_HOME', BASE_DIR)
+
+SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
+LINKS_FILE = os.path.join(BASE_DIR, "links.json")
+PROFILES_DIR = os.path.join(BASE_DIR, "profiles")
+DEFAULT_PROFILE_NAME = "(default)"
+
+DEFAULT_SETTINGS = {
+    'font': 'Yu Gothic UI',
+    'size': 11,
+    'font_color': '#000000',
+    'bg': '#f0f0f0',
+    'border_color': '#666666', # デフォルトのボーダー色
+    'use_online_favicon': False,
+    'show_frequent_group': False,
+    'batch_launch_interval_ms': 300,   # グループのリンクをまとめて開くときの間隔
+    'batch_launch_max_concurrent': 3,  # 同時に起動処理を行う数
+    "current_profile": "(default)"
+}
+
+SAVE_DELAY = 0.3      # 連続した保存をまとめる待ち時間(秒)
+BACKUP_SUFFIX = ".bak"  # 直前の正常なファイルのバックアップ
+
+DEFAULT_LINKS_GROUP = "マイリンク"
+LINKS_DB_NAME = "links.db"  # これがあるプロファイルはSQLiteで保存する(link_store.py)
+
+# --- 安全なファイル書き込み ---
+_own_writes = {}  # {パス: アプリ自身が最後に書き込んだ直後のシグネチャ}
+
+def _file_signature(path):
+    from file_watcher import file_signature
+    return file_signature(path)
+
+def _remember_write(path, signature=None):
+    _own_writes[path] = _file_signature(path) if signature is None else signature
+
+_loaded_signatures = {}  # {パス: 正常に読み込めたときのシグネチャ}（.bak はこの状態のファイルからだけ作る）
+
+def is_own_write(path, signature):
+    """ファイルの変更がアプリ自身の保存によるものか（外部からの変更の検知で、自分の保存を無視するため）"""
+    return signature is not None and _own_writes.get(path) == signature
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _replace_with_retry(src, dst, retries=5):
+    """os.replace を行う。Windowsでウイルス対策や同期ソフトが一時的にファイルを掴んでいる場合に備えて再試行する"""
+    for i in range(retries):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if i == retries - 1:
+                raise
+            time.sleep(0.05 * (i + 1))
+
+def atomic_write_text(path, text, backup=True):
+    """
+    一時ファイルに書き込んで fsync した後、rename で置き換える。
+    途中でクラッシュしても、元のファイルか新しいファイルのどちらかが必ず残る。
+    backup=True なら、置き換え前に現在のファイルを .bak として残しておく。ただし正常に読み込めたときのままの
+    ファイルに限る（不正な内容の保存や外部で壊されたファイルで、正常なバックアップを上書きしない）。
+    """
+    import tempfile
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if backup:
+            _refresh_backup(path)
+        # rename では更新日時・サイズ・inode は変わらないので、置き換える前に自分の保存として記録しておく
+        # （置き換えた直後に監視スレッドが見ても、外部からの変更と誤認しない）
+        _remember_write(path, _file_signature(tmp_path))
+        _replace_with_retry(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if os.name != 'nt':
+        # rename自体を永続化するためにディレクトリも fsync する
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def _refresh_backup(path):
+    """path が正常に読み込めたときのままなら、.bak に置き換える（.bak 自体も一時ファイル経由で書き込む）"""
+    signature = _file_signature(path)
+    if signature is None or _loaded_signatures.get(path) != signature:
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    atomic_write_text(path + BACKUP_SUFFIX, text, backup=False)
+
+class DebouncedWriter:
+    """
+    短時間に続く保存要求をまとめ、ファイルごとに最後の内容だけを書き込む。
+    書き込みはタイマースレッドで行うので、呼び出し側(UIスレッド)は待たされない。
+    """
+
+    def __init__(self, delay=SAVE_DELAY):
+        import threading
+        self.delay = delay
+        self._pending = {}  # {path: text}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+
+    def schedule(self, path, text):
+        import threading
+        with self._lock:
+            self._pending[path] = text
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, path=None):
+        """保留中の書き込みを実行する。path を指定するとそのファイルだけを書き込む。"""
+        # 取り出しと書き込みを同じ _write_lock の中で行う（先に取り出した古い内容が、後から新しい内容を上書きしないように）。
+        # schedule は _lock だけを使うので、書き込み中も待たされない
+        with self._write_lock:
+            with self._lock:
+                if path is None:
+                    items = list(self._pending.items())
+                    self._pending.clear()
+                    if self._timer is not None:
+                        self._timer.cancel()
+                        self._timer = None
+                elif path in self._pending:
+                    items = [(path, self._pending.pop(path))]
+                else:
+                    items = []
+            for item_path, text in items:
+                try:
+                    atomic_write_text(item_path, text)
+                except Exception as e:
+                    import logging
+                    logging.error(f"Failed to write '{item_path}': {e}")
+
+_writers = {}  # {'pending': DebouncedWriter}。最初の保存で作る（読むだけのコマンドラインでは作らない）
+
+def _get_writer():
+    writer = _writers.get('pending')
+    if writer is None:
+        import atexit
+        new_writer = DebouncedWriter()
+        # ほかのスレッドと同時に作った場合も、使うのは先に登録された1つだけ
+        writer = _writers.setdefault('pending', new_writer)
+        if writer is new_writer:
+            atexit.register(writer.flush)
+    return writer
+
+def flush_pending_writes(path=None):
+    """保留中の保存をすぐに書き込む（終了時やプロファイルのフォルダ操作の前に呼ぶ）"""
+    writer = _writers.get('pending')
+    if writer is not None:
+        writer.flush(path)
+
+def _load_json_with_recovery(path):
+    """
+    JSONファイルを読み込む。壊れていれば .bak から復旧し、壊れたファイルは .corrupt として残す。
+    読めるものがなければ None を返す。正常に読み込めたファイルは、次の保存で .bak になる。
+    """
+    import logging
+    flush_pending_writes(path)
+    signature = _file_signature(path)
+    try:
+        data = _read_json(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Failed to load '{path}': {e}")
+    else:
+        _loaded_signatures[path] = signature
+        return data
+    try:
+        _replace_with_retry(path, path + ".corrupt")
+    except OSError:
+        pass
+    backup = path + BACKUP_SUFFIX
+    try:
+        with open(backup, 'r', encoding='utf-8') as f:
+            text = f.read()
+        data = json.loads(text)
+    except (OSError, ValueError):
+        return None
+    logging.warning(f"Recovered '{path}' from backup.")
+    # 途中で止まっても壊れたファイルが残らないよう、通常の保存と同じく一時ファイル経由で戻す
+    atomic_write_text(path, text, backup=False)
+    _loaded_signatures[path] = _file_signature(path)
+    return data
+
+# --- ユーティリティ関数 ---
+def get_profile_path(profile_name):
+    """指定されたプロファイルのディレクトリパスを返す。なければ作成する。"""
+    path = os.path.join(PROFILES_DIR, profile_name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_all_profile_names():
+    """profilesディレクトリ内のすべてのプロファイル名（ディレクトリ名）を取得する"""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    return sorted([d for d in os.listdir(PROFILES_DIR) if os.path.isdir(os.path.join(PROFILES_DIR, d))])
+
+def find_link_path(group_items, target):
+    """
+    'グループ名/リンク名' 形式の指定からリンクのパスを探す。見つからなければ None。
+    グループ名・リンク名に '/' が含まれていてもよいように、区切り位置をすべて試す。
+    group_items: (グループ名, リンクのリスト) の反復可能オブジェクト
+    """
+    groups = dict(group_items)
+    pos = target.find('/')
+    while pos != -1:
+        group_name, link_name = target[:pos], target[pos + 1:]
+        for link in groups.get(group_name, []):
+            if link.get('name') == link_name:
+                return link.get('path')
+        pos = target.find('/', pos + 1)
+    return None
+
+# --- 設定ファイル ---
+def load_settings():
+    data = _load_json_with_recovery(SETTINGS_FILE)
+    if isinstance(data, dict):
+        return {**DEFAULT_SETTINGS, **data}
+    # 読み込めない(存在しない/壊れていてバックアップもない)場合は、デフォルト設定で作成し直す
+    import logging
+    logging.info("Settings file not found or unreadable, creating a new one.")
+    save_settings(DEFAULT_SETTINGS)
+    return DEFAULT_SETTINGS.copy()
+
+def read_settings():
+    """設定ファイルを読むだけで、ファイルの作成・修復は行わない（コマンドライン用）"""
+    try:
+        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+            return {**DEFAULT_SETTINGS, **json.load(f)}
+    except (OSError, ValueError):
+        return DEFAULT_SETTINGS.copy()
+
+def merge_external_settings(settings, external, profile_names):
+    """
+    外部で変更された設定(external)を反映した新しい設定と、切り替え先のプロファイル(なければ None)を返す。
+    ファイルには書き込まないので、呼び出し側はこの設定をメモリに反映してから、保存せずにプロファイルを切り替えること
+    （メモリ上の古い設定を保存すると、外部の変更を上書きしてしまう）。
+    """
+    current = settings.get('current_profile', DEFAULT_PROFILE_NAME)
+    new_profile = external.get('current_profile', current)
+    if new_profile == current or new_profile not in profile_names:
+        new_profile = None
+    return dict(external, current_profile=new_profile or current), new_profile
+
+def save_settings(settings):
+    # 連続した保存(プロファイルの連続切り替えなど)は1回の書き込みにまとめる
+    _get_writer().schedule(SETTINGS_FILE, json.dumps(settings, ensure_ascii=False, indent=2))
+
+# --- リンクデータ ---
+def _groups_from_data(data):
+    """links.json の内容をグループのリストにする（グループのない古い形式も受け付ける）。形式が違えば None"""
+    if isinstance(data, list) and data and isinstance(data[0], dict) and 'group' in data[0]:
+        return data
+    elif isinstance(data, list):
+        return [{"group": DEFAULT_LINKS_GROUP, "links": data}]
+    return None
+
+def load_links_data(profile_name=DEFAULT_PROFILE_NAME):
+    profile_dir = get_profile_path(profile_name)
+    db_file = os.path.join(profile_dir, LINKS_DB_NAME)
+    if os.path.exists(db_file):
+        from link_store import SqliteLinkStore
+        return SqliteLinkStore(db_file).load_all()
+    links_file = os.path.join(profile_dir, "links.json")
+    data = _load_json_with_recovery(links_file)
+    if data is None:
+        # 存在しない(または壊れていてバックアップもない)場合は、デフォルトの空データで作成する
+        default_links = [{"group": DEFAULT_LINKS_GROUP, "links": []}]
+        save_links_data(default_links, profile_name)
+        return default_links
+    return _groups_from_data(data)
+
+def read_links_data(profile_name=DEFAULT_PROFILE_NAME):
+    """
+    links.json を読むだけで、ファイルの作成・修復は行わない（コマンドライン用）。
+    読めなければ None を返すので、呼び出し側は load_links_data で読み直すこと。
+    """
+    profile_dir = os.path.join(PROFILES_DIR, profile_name)
+    if os.path.exists(os.path.join(profile_dir, LINKS_DB_NAME)):
+        return load_links_data(profile_name)
+    try:
+        return _groups_from_data(_read_json(os.path.join(profile_dir, "links.json")))
+    except (OSError, ValueError):
+        return None
+
+def save_links_data(links, profile_name=DEFAULT_PROFILE_NAME):
+    profile_dir = get_profile_path(profile_name)
+    db_file = os.path.join(profile_dir, LINKS_DB_NAME)
+    if os.path.exists(db_file):
+        # SQLiteは1トランザクションで変更のあったグループだけを書き直すので、まとめずにすぐ保存する
+        from link_store import SqliteLinkStore
+        SqliteLinkStore(db_file).save_all(links)
+        _remember_write(db_file)
+        return
+    links_file = os.path.join(profile_dir, "links.json")
+    _get_writer().schedule(links_file, json.dumps(links, ensure_ascii=False, indent=2))
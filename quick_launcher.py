@@ -8,103 +8,204 @@ date: 2025-6-30
 
 import os
 import sys
+
+# --- コマンドラインモードと二重起動チェック ---
+# Tk/PIL/requests などの重いモジュールを読み込む前に、コマンドラインモードの処理や
+# 既存インスタンスへのコマンド転送を済ませて、すぐに終了する
+if __name__ == "__main__":
+    from launcher_cli import is_cli_command, run_cli
+    if is_cli_command(sys.argv[1:]):
+        sys.exit(run_cli(sys.argv[1:]))
+    from single_instance import forward_to_running_instance
+    if forward_to_running_instance(sys.argv[1:]):
+        sys.exit(0)
+
 import json
 import tkinter as tk
-from tkinter import messagebox, simpledialog, colorchooser, ttk, font as tkfont
+from tkinter import messagebox, simpledialog, colorchooser, filedialog, ttk, font as tkfont
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import io
-import webbrowser
 import threading
-import configparser
+import time
+import weakref
 import winreg
 import ctypes
 from ctypes import wintypes
 from urllib.parse import urlparse
 import requests
-import pythoncom
 from pystray import Icon, Menu, MenuItem as item
-from win32com.client import Dispatch
 import logging
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import shutil
-import subprocess
-import copy
 import re
+import math
 import queue
+import concurrent.futures
+from collections import OrderedDict
+from single_instance import InstanceServer, parse_command
+from profile_store import (BASE_DIR, DEFAULT_PROFILE_NAME, DEFAULT_SETTINGS, PROFILES_DIR, SETTINGS_FILE,
+                           LINKS_DB_NAME, get_profile_path, get_all_profile_names, find_link_path,
+                           load_settings, save_settings, merge_external_settings, load_links_data, save_links_data,
+                           flush_pending_writes, is_own_write)
+from file_watcher import FileWatcher
+from launch_service import LaunchService, launch_batch, extract_executable_path
+from link_model import LinkModel
+from search_index import FuzzyIndex
+from link_list_view import LinkListView
+from icon_registry import IconWaitRegistry
+from icon_store import IconPixelStore
+from shortcut_parser import scan_shortcuts, launch_command
+from bookmark_import import import_bookmarks, find_bookmark_files, BookmarkImportError
+from link_health import (check_links, cached_statuses, build_report, write_report,
+                         PROBLEM_STATUSES, STATUS_REDIRECT)
+from link_store import open_link_store, JsonLinkStore, GroupLinks, close_connections
+from usage_log import record_launch, frecency_scores, top_links, rename_profile_usage, forget_profile_usage
 
 _icon_request_queue = queue.Queue()
 _icon_result_queue = queue.Queue()
+_icon_background_queue = queue.Queue()  # 表示を待っていない取得(取り込んだリンクのファビコンなど)
+BACKGROUND_ICON_WAIT = 0.05  # バックグラウンドの取得の合間に、表示用の要求を待つ時間(秒)
+ICON_FLUSH_MS = 16           # 取得を待っているあいだ、結果を1フレームごとにまとめて反映する
+ICON_APPLY_BUDGET = 0.008    # 1回の反映で PhotoImage を作る時間の上限(秒)。残りは次のフレームに回す
+_ICON_WAKE = ('', 0)         # 待機中のワーカーにバックグラウンドの要求を知らせる(取得はしない)
+
+# アイコンの取得を待っているウィジェット {(path, size): [widget1, ...]}（弱参照で持つ）
+_icon_waiters = IconWaitRegistry()
+
+class IconTarget:
+    """
+    ウィジェット以外(Canvas の画像など)でアイコンの取得結果を受け取るための登録用オブジェクト。
+    _icon_waiters にウィジェットと同じように登録でき、結果が届くと callback(icon) が呼ばれる。
+    登録簿は弱参照で持つので、登録した側がこのオブジェクトへの参照を持っておくこと。
+    """
+
+    def __init__(self, owner, callback):
+        self.owner = owner
+        self.callback = callback
+
+    def winfo_exists(self):
+        return self.owner.winfo_exists()
 
-# ★★★ UI更新のための管理辞書を追加 ★★★
-# { (path, size): [widget1, widget2, ...], ... }
-_icon_update_registry = {}
-_icon_update_lock = threading.Lock() # この辞書を保護するロック
+    def config(self, image):
+        self.callback(image)
+
+def queue_background_icons(paths, size):
+    """表示用の要求がないときにだけ取得するよう、アイコンの取得を予約する"""
+    for path in paths:
+        _icon_background_queue.put((path, size))
+    _icon_request_queue.put(_ICON_WAKE)
+
+def _next_icon_request():
+    """表示用の要求を優先し、なければバックグラウンドの要求を返す。(キュー, パス, サイズ)"""
+    if _icon_background_queue.empty():
+        # 要求が来るまで眠る（アイドル時に定期的に起きない）
+        path, size = _icon_request_queue.get()
+        return _icon_request_queue, path, size
+    try:
+        path, size = _icon_request_queue.get(timeout=BACKGROUND_ICON_WAIT)
+        return _icon_request_queue, path, size
+    except queue.Empty:
+        path, size = _icon_background_queue.get_nowait()
+        return _icon_background_queue, path, size
+
+# --- 取得結果の反映 ---
+# ワーカーは結果をキューに入れるだけで、Tk には一切触れない。反映は Tk スレッドの after のループで行い、
+# ループは待っているウィジェットか届いた結果があるあいだだけ続ける（アイドル時は止まる）
+_icon_root = None        # 反映ループを回すウィンドウ（main で設定する）
+_icon_flush_after = None  # 予約済みの反映ループの after ID（Tkスレッドだけが触る）
+
+def _deliver_icon_result(path, size, ok):
+    """ワーカーの結果をTkスレッドに渡す。画像は _icon_pixels にあるので、キーと成否だけを渡す"""
+    _icon_result_queue.put((path, size, ok))
+
+def start_icon_flush(root):
+    """取得結果の反映ループを開始する（Tkスレッドで呼ぶ）。それまでに届いた結果も反映する"""
+    global _icon_root
+    _icon_root = root
+    _schedule_icon_flush()
+
+def _schedule_icon_flush():
+    """反映ループが止まっていれば再開する（Tkスレッドで呼ぶ）"""
+    global _icon_flush_after
+    if _icon_flush_after is None and _icon_root is not None:
+        _icon_flush_after = _icon_root.after(ICON_FLUSH_MS, apply_icon_results)
+
+def request_icon(path, size, widget):
+    """widget を (path, size) のアイコン待ちに登録して、取得を依頼する（Tkスレッドで呼ぶ）"""
+    # 先に登録する（ワーカーは、待っているウィジェットがない結果は通知しない）
+    _icon_waiters.add((path, size), widget)
+    _icon_request_queue.put((path, size))
+    _schedule_icon_flush()
+
+def apply_icon_results():
+    """
+    届いている取得結果をまとめて、待っているウィジェットに反映する（Tkスレッドで呼ぶ）。
+    PhotoImage は待っているウィジェットがあるときだけ作る。ICON_APPLY_BUDGET を超えたら、残りは次に回す。
+    """
+    global _icon_flush_after
+    _icon_flush_after = None
+    try:
+        deadline = time.perf_counter() + ICON_APPLY_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                path, size, ok = _icon_result_queue.get_nowait()
+            except queue.Empty:
+                break
+            # このアイコンを待っているウィジェットを取得して更新（取得できなかった場合は仮のアイコンのまま）
+            widgets = _icon_waiters.pop((path, size))
+            icon = get_cached_icon(path, size) if widgets and ok else None
+            if icon is None:
+                continue
+            for widget in widgets:
+                try:
+                    widget.config(image=icon)
+                except tk.TclError:
+                    continue  # 反映の直前に破棄されたウィジェット
+                # PhotoImageがガベージコレクションされないように参照を保持
+                widget.image = icon
+    finally:
+        # まだ待っているウィジェットか、反映しきれなかった結果があれば続ける
+        # （破棄されたウィジェットを待ち続けて空回りしないよう、結果がないときは登録を掃除してから判断する）
+        if _icon_result_queue.empty():
+            _icon_waiters.sweep()
+        if len(_icon_waiters) or not _icon_result_queue.empty():
+            _schedule_icon_flush()
 
 def icon_worker():
     """アイコン取得専用のワーカースレッド"""
     while True:
         try:
-            path, size = _icon_request_queue.get(timeout=1)
-            if path is None: break
-
-            # get_..._icon 関数がキャッシュの読み書きを管理してくれる
-            if path.startswith(('http://', 'https://')):
-                icon = get_web_icon(path, size=size)
-            else:
-                icon = get_file_icon(path, size=size)
-            
-            if icon:
-                # 結果をUIスレッドに通知
-                _icon_result_queue.put((path, size, icon))
-
+            source, path, size = _next_icon_request()
         except queue.Empty:
             continue
+        if path is None:
+            break
+        if not path:
+            source.task_done()
+            continue
+        try:
+            # get_..._icon_image 関数がキャッシュの読み書きを管理してくれる（Tk は使わない）
+            if path.startswith(('http://', 'https://')):
+                image = get_web_icon_image(path, size=size)
+            else:
+                image = get_file_icon_image(path, size=size)
         except Exception as e:
             logging.warning(f"Icon worker failed for '{path}': {e}")
+            image = None
+        try:
+            # 待っているウィジェットがあれば結果を通知する（取得できなかった場合も、登録を外すために通知する）
+            if (path, size) in _icon_waiters:
+                _deliver_icon_result(path, size, image is not None)
+        except Exception as e:
+            logging.error(f"Icon worker failed to deliver '{path}': {e}")
         finally:
-             if 'path' in locals() and path is not None:
-                _icon_request_queue.task_done()
+            source.task_done()
 
 # --- アプリケーション設定 ---
 logging.basicConfig(filename='app_errors.log', level=logging.ERROR,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-if getattr(sys, 'frozen', False):
-    # PyInstallerでパッケージ化された場合
-    BASE_DIR = os.path.dirname(sys.executable)
-else:
-    # スクリプトとして実行されている場合
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
-LINKS_FILE = os.path.join(BASE_DIR, "links.json")
-PROFILES_DIR = os.path.join(BASE_DIR, "profiles")
-DEFAULT_PROFILE_NAME = "(default)"
-
-DEFAULT_SETTINGS = {
-    'font': 'Yu Gothic UI',
-    'size': 11,
-    'font_color': '#000000',
-    'bg': '#f0f0f0',
-    'border_color': '#666666', # デフォルトのボーダー色
-    'use_online_favicon': False,
-    "current_profile": "(default)"
-}
-
-# --- ユーティリティ関数 ---
-def get_profile_path(profile_name):
-    """指定されたプロファイルのディレクトリパスを返す。なければ作成する。"""
-    path = os.path.join(PROFILES_DIR, profile_name)
-    os.makedirs(path, exist_ok=True)
-    return path
-
-def get_all_profile_names():
-    """profilesディレクトリ内のすべてのプロファイル名（ディレクトリ名）を取得する"""
-    if not os.path.isdir(PROFILES_DIR):
-        return []
-    return sorted([d for d in os.listdir(PROFILES_DIR) if os.path.isdir(os.path.join(PROFILES_DIR, d))])
-
 # --- ctypesのグローバル定義 ---
 shell32 = ctypes.windll.shell32
 user32 = ctypes.windll.user32
@@ -145,10 +246,14 @@ gdi32.DeleteObject.argtypes = [wintypes.HANDLE]
 gdi32.DeleteObject.restype = wintypes.BOOL
 
 # --- グローバルキャッシュ ---
-_icon_cache = {}
-_system_icon_cache = {}
-_default_browser_icon = {}  # サイズごとにキャッシュ
-_icon_cache_lock = threading.Lock()
+# ワーカースレッドは Pillow の画像(作成後は変更しない)だけを作り、Tk の PhotoImage は Tk スレッドで作る
+_icon_pixels = IconPixelStore()  # {キャッシュキー: 圧縮した RGBA の画素} ワーカーが書き込む（重複は1つにまとめる）
+_system_icon_images = {}      # {(種類, サイズ): PIL.Image} フォルダ・警告アイコン
+_default_browser_images = {}  # {サイズ: PIL.Image}
+_icon_cache_lock = threading.Lock()  # _system_icon_images と _default_browser_images を保護する
+# {キャッシュキー: PhotoImage} Tk スレッド専用。表示しているウィジェットがなくなった PhotoImage は消える
+_icon_cache = weakref.WeakValueDictionary()
+_system_icon_cache = {}       # {(種類, サイズ): PhotoImage} Tk スレッド専用
 
 # --- キャッシュキー生成 ---
 def generate_icon_cache_key(path, size):
@@ -163,6 +268,57 @@ def generate_icon_cache_key(path, size):
             flags = 0x100 | 0x1 # 小さいアイコン
         return (excutable_path, size, flags)
 
+# --- キャッシュの無効化 ---
+_icon_invalidation_listeners = []  # callback(matches)。matches(パス) はアイコンを無効化したリンクなら True
+
+def add_icon_invalidation_listener(callback):
+    """アイコンを無効化したときに呼ぶ関数を登録する（作成済みの画面を作り直すため）"""
+    _icon_invalidation_listeners.append(callback)
+
+def _icon_identity(key):
+    """キャッシュキーのうちサイズに依らない部分。URLは ('web', ドメイン)、ファイルは ('file', 実行ファイルのパス)"""
+    if len(key) == 2:
+        return ('web', key[0].lower())
+    return ('file', os.path.normcase(key[0]))
+
+def invalidate_icons(paths=(), executables=(), domains=(), profile=None, all_web=False):
+    """
+    アイコンのキャッシュを、すべてのサイズについて無効化する。
+        paths: リンクのパス（URLはドメインのファビコン、ファイルは実行ファイルのアイコンが対象）
+        executables / domains: 実行ファイルのパス / ドメインを直接指定する
+        profile: そのプロファイルのすべてのリンク
+        all_web: すべてのURLのファビコン（取得方法の設定を変えたときなど）
+    作成済みのサブポップアップなどは、登録されたリスナーが破棄する。Tkスレッドから呼ぶこと。
+    無効化したキャッシュの件数を返す。
+    """
+    paths = list(paths)
+    if profile is not None:
+        paths += [link.get('path', '') for group in load_links_data(profile) or [] for link in group.get('links', [])]
+    targets = {('file', os.path.normcase(e)) for e in executables if e}
+    targets |= {('web', d.lower()) for d in domains if d}
+    targets |= {_icon_identity(generate_icon_cache_key(p, 0)) for p in paths if p}
+
+    def matches_key(key):
+        identity = _icon_identity(key)
+        return identity in targets or (all_web and identity[0] == 'web')
+
+    stale = {key for key in _icon_pixels.keys() if matches_key(key)}
+    for key in stale:
+        _icon_pixels.discard(key)
+    for key in [key for key in _icon_cache if matches_key(key)]:
+        del _icon_cache[key]
+        stale.add(key)
+
+    def matches(path):
+        return bool(path) and matches_key(generate_icon_cache_key(path, 0))
+    for callback in _icon_invalidation_listeners:
+        try:
+            callback(matches)
+        except Exception as e:
+            logging.warning(f"Icon invalidation listener failed: {e}")
+    logging.info(f"Invalidated {len(stale)} cached icons.")
+    return len(stale)
+
 # --- ヘルパー関数 ---
 
 ICON_BASE64 = """\
@@ -215,83 +371,101 @@ def round_to_step(value, step=4):
     """数値を指定されたステップに丸める（例: 15をstep=4で16に）"""
     return step * round(value / step)
 
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-                return {**DEFAULT_SETTINGS, **json.load(f)}
-        except Exception as e:
-            logging.warning(f"Failed to load settings: {e}")
-            # 読み込み失敗時は、デフォルト設定でファイルを作成し直す
-            save_settings(DEFAULT_SETTINGS)
-            return DEFAULT_SETTINGS.copy()
-    else:
-        # ファイルが存在しない場合は、デフォルト設定で新規作成する
-        logging.info("Settings file not found, creating a new one.")
-        save_settings(DEFAULT_SETTINGS)
-        return DEFAULT_SETTINGS.copy()
-
-def save_settings(settings):
-    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(settings, f, ensure_ascii=False, indent=2)
-
-def load_links_data(profile_name=DEFAULT_PROFILE_NAME):
-    profile_dir = get_profile_path(profile_name)
-    links_file = os.path.join(profile_dir, "links.json")
-    if os.path.exists(links_file):
+# --- ほかのスレッドから Tk スレッドへの処理の受け渡し ---
+# Tk はほかのスレッドから呼べない(root.after も含む)ので、起動・監視・IPC のスレッドは処理をキューに入れるだけにし、
+# Tk スレッドの after のループで取り出して実行する
+TK_CALL_POLL_MS = 50  # キューを見に行く間隔
+REMOTE_COMMAND_TIMEOUT = 1.5  # IPCのコマンドの結果をTkスレッドから待つ上限(秒)。送信側の IPC_TIMEOUT より短くする
+_tk_call_queue = queue.Queue()
+
+def call_on_tk(func, *args):
+    """
+    func(*args) を Tk スレッドで実行するよう予約する（どのスレッドからでも呼べる）。
+    戻り値は Future で、結果や例外を受け取りたいスレッドは result() で待てる。
+    """
+    future = concurrent.futures.Future()
+    _tk_call_queue.put((future, func, args))
+    return future
+
+def start_tk_calls(root):
+    """call_on_tk で予約された処理を実行するループを開始する（Tkスレッドで呼ぶ）"""
+    def run_pending():
         try:
-            with open(links_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list) and data and isinstance(data[0], dict) and 'group' in data[0]:
-                    return data
-                elif isinstance(data, list):
-                    return [{"group": "マイリンク", "links": data}]
-        except Exception as e:
-            logging.warning(f"Failed to load links data file, creating a new one: {e}")
-            # 読み込み失敗時は、デフォルトの空データでファイルを作成し直す
-            default_links = [{"group": "マイリンク", "links": []}]
-            save_links_data(default_links)
-            return default_links
-    else:
-        default_links = [{"group": "マイリンク", "links": []}]
-        save_links_data(default_links)
-        return default_links
+            while True:
+                try:
+                    future, func, args = _tk_call_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    logging.exception(f"Deferred call {getattr(func, '__name__', func)!r} failed")
+                    future.set_exception(e)
+        finally:
+            root.after(TK_CALL_POLL_MS, run_pending)
+    run_pending()
 
-def save_links_data(links, profile_name=DEFAULT_PROFILE_NAME):
-    profile_dir = get_profile_path(profile_name)
-    links_file = os.path.join(profile_dir, "links.json")
-    with open(links_file, 'w', encoding='utf-8') as f:
-        json.dump(links, f, ensure_ascii=False, indent=2)
+launcher = LaunchService()  # リンクの起動はワーカースレッドで行う（起動時間の分布も記録する）
 
-def open_link(path):
-    try:
-        if path.startswith(('http://', 'https://')):
-            webbrowser.open(path)
-        else:
-            # コマンドライン引数付きの場合は subprocess で実行
-            # フォルダパスの場合は explorer.exe で開く（ネットワークパス対応）
-            if os.path.isdir(path):
-                # フォルダ（ローカル/ネットワーク両方）を explorer.exe で開く
-                subprocess.Popen(['explorer', os.path.abspath(path)])
-            else:
-                subprocess.Popen(path, shell=True)
-    except Exception as e:
-        logging.error(f"Failed to open link '{path}': {e}")
-        messagebox.showerror("リンクエラー", f"リンクを開けませんでした:\n{path}")
+def open_link(path, profile_name=None, on_launched=None):
+    """
+    リンクを開く。起動はワーカースレッドで行うので、すぐに戻る。
+    profile_name を指定すると起動履歴に記録する（よく使うリンクの並べ替えに使う）。
+    起動できたら on_launched() を、できなければエラー表示を Tk スレッドで行う。
+    """
+    def done(error):
+        if error is not None:
+            logging.error(f"Failed to open link '{path}': {error}")
+            messagebox.showerror("リンクエラー", f"リンクを開けませんでした:\n{path}")
+            return
+        if profile_name is not None:
+            record_launch(profile_name, path)
+        if on_launched is not None:
+            on_launched()
+    launcher.submit(path, lambda error: call_on_tk(done, error))
 
-def _create_fallback_icon(size=20):
+def _create_fallback_image(size=20):
     img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
     draw.ellipse((2, 2, size - 3, size - 3), outline="#888", width=1)
-    return ImageTk.PhotoImage(img)
+    return img
+
+def _create_fallback_icon(size=20):
+    return ImageTk.PhotoImage(_create_fallback_image(size))
+
+def get_cached_icon(path, size, key=None):
+    """
+    取得済みのアイコンを PhotoImage で返す（Tkスレッドから呼ぶこと）。まだ取得していなければ None。
+    PhotoImage は表示するときに保存済みの画素から作る。戻り値への参照を持っている間だけキャッシュに残るので、
+    表示に使うウィジェット(または画面)が参照を持っておくこと。
+    """
+    if key is None:
+        key = generate_icon_cache_key(path, size)
+    icon = _icon_cache.get(key)
+    if icon is None:
+        pixels = _icon_pixels.get(key)
+        if pixels is not None:
+            icon = _icon_cache[key] = ImageTk.PhotoImage(_image_from_pixels(pixels))
+    return icon
+
+_placeholder_icons = {}  # {サイズ: 取得待ちの間に表示するアイコン}
+
+def get_placeholder_icon(size):
+    """アイコンの取得待ちの間に表示する画像。サイズごとに1つを共有する（Tkスレッドから呼ぶこと）"""
+    icon = _placeholder_icons.get(size)
+    if icon is None:
+        icon = _placeholder_icons[size] = _create_fallback_icon(size)
+    return icon
 
 # --- アイコン取得ロジック ---
-def _hicon_to_photoimage(hIcon, size, destroy_after=True):
+def _hicon_to_image(hIcon, size, destroy_after=True):
     """
-    アイコンハンドル(HICON)をTkinter PhotoImageに変換する。
+    アイコンハンドル(HICON)を Pillow の RGBA 画像に変換する（ワーカースレッドから呼んでよい）。
     どんなサイズのHICONでも、要求されたsizeで正しく描画・変換する。
     """
-    tk_icon = None
+    image = None
     hdc = user32.GetDC(None)
     mem_dc = gdi32.CreateCompatibleDC(hdc)
     # ★★★修正点1: 作成するビットマップのサイズを、元のアイコンサイズではなく、
@@ -327,9 +501,8 @@ def _hicon_to_photoimage(hIcon, size, destroy_after=True):
             else:
                 new_data.append(item)
         img.putdata(new_data)
-        
-        tk_icon = ImageTk.PhotoImage(img)
-        
+        image = img
+
     finally:
         # リソースの解放
         gdi32.DeleteObject(mem_bmp)
@@ -337,17 +510,25 @@ def _hicon_to_photoimage(hIcon, size, destroy_after=True):
         user32.ReleaseDC(None, hdc)
         if destroy_after:
             user32.DestroyIcon(hIcon)
-            
-    return tk_icon
+
+    return image
 
 def get_system_folder_icon(size=16):
+    """システムの標準フォルダアイコンを PhotoImage で返す（Tkスレッドから呼ぶこと）"""
+    key = ('folder_icon_shgfi', size)
+    if key not in _system_icon_cache:
+        _system_icon_cache[key] = ImageTk.PhotoImage(get_system_folder_image(size))
+    return _system_icon_cache[key]
+
+def get_system_folder_image(size=16):
     """
     SHGetFileInfoWを使い、システムの標準フォルダアイコンを取得する。
     ヘルパー関数のバグ修正により、この方法が最も確実であると再確認された最終版。
     """
     key = ('folder_icon_shgfi', size) # キャッシュキーを明確に
-    if key in _system_icon_cache:
-        return _system_icon_cache[key]
+    with _icon_cache_lock:
+        if key in _system_icon_images:
+            return _system_icon_images[key]
 
     # --- 定義 ---
     SHGFI_ICON = 0x100
@@ -359,7 +540,7 @@ def get_system_folder_icon(size=16):
     flags = SHGFI_ICON | SHGFI_SMALLICON | SHGFI_USEFILEATTRIBUTES
     
     # まず実在するディレクトリ（C:\\Windows）で取得を試みる
-    tk_icon = None
+    image = None
     try:
         res = shell32.SHGetFileInfoW(
             r"C:\\Windows",
@@ -369,11 +550,11 @@ def get_system_folder_icon(size=16):
             flags
         )
         if res and info.hIcon:
-            tk_icon = _hicon_to_photoimage(info.hIcon, size, destroy_after=True)
+            image = _hicon_to_image(info.hIcon, size, destroy_after=True)
     except Exception:
-        tk_icon = None
+        image = None
     # 失敗時は従来通りダミー名で再試行
-    if tk_icon is None:
+    if image is None:
         try:
             res = shell32.SHGetFileInfoW(
                 "dummy_folder",
@@ -383,25 +564,26 @@ def get_system_folder_icon(size=16):
                 flags
             )
             if res and info.hIcon:
-                tk_icon = _hicon_to_photoimage(info.hIcon, size, destroy_after=True)
+                image = _hicon_to_image(info.hIcon, size, destroy_after=True)
         except Exception:
-            tk_icon = None
+            image = None
     # それでも失敗した場合はダミー
-    if tk_icon is None:
-        tk_icon = _create_fallback_icon(size)
+    if image is None:
+        image = _create_fallback_image(size)
 
-    _system_icon_cache[key] = tk_icon
-    return tk_icon
+    with _icon_cache_lock:
+        return _system_icon_images.setdefault(key, image)
 
-def get_system_warning_icon(size=16):
+def get_system_warning_image(size=16):
     """
     システムの標準的な「警告」アイコンを取得する。
     """
     key = ('warning_icon', size)
-    if key in _system_icon_cache:
-        return _system_icon_cache[key]
-    
-    tk_icon = None
+    with _icon_cache_lock:
+        if key in _system_icon_images:
+            return _system_icon_images[key]
+
+    image = None
     hIcon = 0
     try:
         # LoadIconWを使い、標準の警告アイコン(IDI_WARNING)を要求
@@ -409,62 +591,47 @@ def get_system_warning_icon(size=16):
         hIcon = user32.LoadIconW(None, 32515)
         if hIcon:
             # 標準アイコンなのでハンドルは破棄しない
-            tk_icon = _hicon_to_photoimage(hIcon, size, destroy_after=False)
+            image = _hicon_to_image(hIcon, size, destroy_after=False)
     except Exception as e:
         logging.warning(f"Failed to get system warning icon: {e}")
 
-    if tk_icon is None:
-        tk_icon = _create_fallback_icon(size) # フォールバックも統一
+    if image is None:
+        image = _create_fallback_image(size) # フォールバックも統一
 
-    _system_icon_cache[key] = tk_icon
-    return tk_icon
+    with _icon_cache_lock:
+        return _system_icon_images.setdefault(key, image)
+
+def _store_icon_image(key, image):
+    """取得結果を RGBA の画素にしてキャッシュに書き込み、その画像を返す"""
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    _icon_pixels.put(key, image.width, image.height, image.tobytes())
+    return image
 
-def extract_executable_path(command_line):
+def _image_from_pixels(pixels):
+    width, height, rgba = pixels
+    return Image.frombytes("RGBA", (width, height), rgba)
+
+def get_file_icon_image(path, size=16):
     """
-    コマンドライン文字列から実行可能ファイルのパスを抽出する。
+    ファイルパスからアイコンの画像(Pillow)を取得する。パスが存在しない場合は警告アイコンを返す。
+    Tk は使わないので、ワーカースレッドから呼んでよい。
     """
-    command_line = command_line.strip()
-    
-    # 1. ダブルクォーテーションで囲まれている場合（最優先）
-    if command_line.startswith('"'):
-        match = re.match(r'"(.*?)"', command_line) # 非貪欲マッチに変更
-        if match:
-            path_candidate = match.group(1)
-            # 抽出したパスが実際に存在するか確認
-            if os.path.exists(path_candidate):
-                return path_candidate
-            
-    # 2. ダブルクォーテーションがない場合
-    parts = command_line.split()
-    # 後ろから前に向かって、存在するパスを探す
-    for i in range(len(parts), 0, -1):
-        path_candidate = " ".join(parts[:i])
-        if os.path.exists(path_candidate):
-            # 最初に見つかった（＝最も長い）存在するパスを返す
-            return path_candidate
-            
-    # 3. それでも見つからない場合は、元の文字列をそのまま返す
-    return command_line
-
-def get_file_icon(path, size=16):
-    """ファイルパスからアイコンを取得する。パスが存在しない場合は警告アイコンを返す。"""
     key = generate_icon_cache_key(path, size)
     executable_path = extract_executable_path(path)
 
     # まず、キャッシュを確認
-    with _icon_cache_lock:
-        if key in _icon_cache:
-            return _icon_cache.get(key)
-        
-    tk_icon = None
+    pixels = _icon_pixels.get(key)
+    if pixels is not None:
+        return _image_from_pixels(pixels)
+
+    image = None
 
     # ファイル/フォルダの存在を確認
     file_exists = os.path.exists(executable_path)
     # ファイル・フォルダが存在しない場合は警告アイコンを返す
     if not file_exists:
-        tk_icon = get_system_warning_icon(size)
-        _icon_cache[key] = tk_icon
-        return tk_icon
+        return _store_icon_image(key, get_system_warning_image(size))
 
     if size > 20:
         flags = 0x100 | 0x0 # 大きいアイコン
@@ -474,7 +641,7 @@ def get_file_icon(path, size=16):
     info = SHFILEINFO()
     res = shell32.SHGetFileInfoW(executable_path, 0, ctypes.byref(info), ctypes.sizeof(info), flags)
     if res and info.hIcon:
-        tk_icon = _hicon_to_photoimage(info.hIcon, size)
+        image = _hicon_to_image(info.hIcon, size)
     else:
         # exeの場合はExtractIconExで直接抽出
         if executable_path.lower().endswith('.exe'):
@@ -488,11 +655,11 @@ def get_file_icon(path, size=16):
                 elif small.value:
                     hIcon = small.value
                 if hIcon:
-                    tk_icon = _hicon_to_photoimage(hIcon, size, destroy_after=True)
+                    image = _hicon_to_image(hIcon, size, destroy_after=True)
             except Exception as e:
-                logging.info(f"[get_file_icon] ExtractIconEx failed: {executable_path}: {e}")
+                logging.info(f"[get_file_icon_image] ExtractIconEx failed: {executable_path}: {e}")
         # 拡張子からアイコン取得（jpg, mp4, txt, pdf等）
-        if tk_icon is None:
+        if image is None:
             SHGFI_ICON = 0x100
             SHGFI_SMALLICON = 0x1
             SHGFI_USEFILEATTRIBUTES = 0x10
@@ -504,38 +671,29 @@ def get_file_icon(path, size=16):
                 info2 = SHFILEINFO()
                 res2 = shell32.SHGetFileInfoW(dummy_name, attr, ctypes.byref(info2), ctypes.sizeof(info2), flags2)
                 if res2 and info2.hIcon:
-                    tk_icon = _hicon_to_photoimage(info2.hIcon, size, destroy_after=True)
-    if tk_icon is None:
-        tk_icon = get_system_folder_icon(size)
+                    image = _hicon_to_image(info2.hIcon, size, destroy_after=True)
+    if image is None:
+        image = get_system_folder_image(size)
 
     # --- 取得結果をキャッシュに書き込む ---
-    with _icon_cache_lock:
-        # 他のスレッドが先に書き込んでいないか再チェック
-        if key not in _icon_cache:
-            _icon_cache[key] = tk_icon
-            
-    return tk_icon
+    return _store_icon_image(key, image)
 
-def get_web_icon(url, size=16):
+def get_web_icon_image(url, size=16):
     """
-    URLからファビコンを取得する。
+    URLからファビコンの画像(Pillow)を取得する。ワーカースレッドから呼んでよい。
     settingsに応じてオンライン(Google)/オフライン(直接取得)を切り替える。
     """
-    global _default_browser_icon
-
     if not url:
         # URLが無効な場合は、デフォルトブラウザアイコンを返すしかない
-        if size not in _default_browser_icon:
-            _default_browser_icon[size] = _get_or_create_default_browser_icon(size)
-        return _default_browser_icon[size]
+        return _get_default_browser_image(size)
 
     key = generate_icon_cache_key(url, size)
     domain = urlparse(url).netloc
-    with _icon_cache_lock:
-        if key in _icon_cache:
-            return _icon_cache.get(key)
+    pixels = _icon_pixels.get(key)
+    if pixels is not None:
+        return _image_from_pixels(pixels)
 
-    tk_icon = None
+    image = None
     
     # 1. オンラインモードを試す (設定がTrueの場合)
     if settings.get('use_online_favicon', True):
@@ -544,14 +702,14 @@ def get_web_icon(url, size=16):
             response.raise_for_status()
             if response.content and len(response.content) > 100: # Googleのデフォルトアイコンでないことを確認
                 img = Image.open(io.BytesIO(response.content)).convert("RGBA")
-                tk_icon = ImageTk.PhotoImage(img.resize((size, size), Image.LANCZOS))
+                image = img.resize((size, size), Image.LANCZOS)
         except requests.RequestException:
             # オンラインでの取得に失敗した場合、オフラインモードにフォールバック
             logging.info(f"Online favicon fetch failed for {domain}, falling back to offline mode.")
             pass 
     
-    # 2. オフラインモード (またはオンラインが失敗した場合) で、tk_iconがまだNoneなら実行
-    if tk_icon is None:
+    # 2. オフラインモード (またはオンラインが失敗した場合) で、imageがまだNoneなら実行
+    if image is None:
         try:
             # イントラネット向けに証明書検証を無効にするオプションも考慮
             headers = {'User-Agent': 'Mozilla/5.0'}
@@ -575,7 +733,7 @@ def get_web_icon(url, size=16):
             fav_response.raise_for_status()
             if fav_response.content:
                 img = Image.open(io.BytesIO(fav_response.content)).convert("RGBA")
-                tk_icon = ImageTk.PhotoImage(img.resize((size, size), Image.LANCZOS))
+                image = img.resize((size, size), Image.LANCZOS)
 
         except Exception as e:
             # オフライン取得でも失敗した場合
@@ -583,20 +741,22 @@ def get_web_icon(url, size=16):
             pass
 
     # 3. 最終フォールバック
-    if tk_icon is None:
-        if size not in _default_browser_icon:
-            _default_browser_icon[size] = _get_or_create_default_browser_icon(size)
-        tk_icon = _default_browser_icon[size]
+    if image is None:
+        image = _get_default_browser_image(size)
 
     # --- 取得結果をキャッシュに書き込む ---
+    return _store_icon_image(key, image)
+
+def _get_default_browser_image(size=16):
+    """デフォルトブラウザのアイコン(サイズごとにキャッシュ)"""
     with _icon_cache_lock:
-        # 他のスレッドが先に書き込んでいないか再チェック
-        if key not in _icon_cache:
-            _icon_cache[key] = tk_icon
-            
-    return tk_icon
+        if size in _default_browser_images:
+            return _default_browser_images[size]
+    image = _load_default_browser_image(size)
+    with _icon_cache_lock:
+        return _default_browser_images.setdefault(size, image)
 
-def _get_or_create_default_browser_icon(size=16):
+def _load_default_browser_image(size=16):
     """内部用のヘルパー。デフォルトブラウザアイコンを取得、失敗時は警告アイコン。"""
     try:
         with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\Shell\Associations\UrlAssociations\http\UserChoice") as key:
@@ -605,11 +765,11 @@ def _get_or_create_default_browser_icon(size=16):
             cmd_path = winreg.QueryValueEx(key, "")[0]
         browser_path = cmd_path.split('"')[1]
         if os.path.exists(browser_path):
-            return get_file_icon(browser_path, size)
+            return get_file_icon_image(browser_path, size)
         else:
-            return get_system_warning_icon(size)
+            return get_system_warning_image(size)
     except Exception:
-        return get_system_warning_icon(size)
+        return get_system_warning_image(size)
     
 # 新增函数：从URL获取网页标题
 def get_url_title(url):
@@ -711,12 +871,26 @@ class SettingsDialog(simpledialog.Dialog):
         favicon_check = tk.Checkbutton(master, text="Webサイトのアイコンをオンラインで取得する", variable=self.online_favicon_var)
         favicon_check.grid(row=5, column=0, columnspan=2, sticky="w", padx=5, pady=10)
 
+        self.frequent_group_var = tk.BooleanVar(value=self.settings.get('show_frequent_group', False))
+        frequent_check = tk.Checkbutton(master, text="「よく使う」グループを先頭に表示する", variable=self.frequent_group_var)
+        frequent_check.grid(row=6, column=0, columnspan=2, sticky="w", padx=5, pady=(0, 10))
+
+        tk.Label(master, text="「すべて開く」の間隔(ミリ秒)").grid(row=7, column=0, sticky="w", padx=5, pady=5)
+        self.batch_interval_var = tk.StringVar(value=str(self.settings['batch_launch_interval_ms']))
+        tk.Spinbox(master, from_=0, to=5000, increment=100, textvariable=self.batch_interval_var,
+                   width=6).grid(row=7, column=1, sticky="w", padx=5, pady=5)
+
+        tk.Label(master, text="「すべて開く」の同時起動数").grid(row=8, column=0, sticky="w", padx=5, pady=5)
+        self.batch_concurrent_var = tk.StringVar(value=str(self.settings['batch_launch_max_concurrent']))
+        tk.Spinbox(master, from_=1, to=16, textvariable=self.batch_concurrent_var,
+                   width=6).grid(row=8, column=1, sticky="w", padx=5, pady=5)
+
         self.default_btn = tk.Button(master, text="デフォルトに戻す", command=self.reset_default)
-        self.default_btn.grid(row=6, column=0, columnspan=2, pady=10)
+        self.default_btn.grid(row=9, column=0, columnspan=2, pady=10)
 
         # --- 作成者ラベル ---
         author_label = tk.Label(master, text="by Shinrei Chin", anchor="w", fg="#888888", font=("Yu Gothic UI", 8))
-        author_label.grid(row=7, column=0, columnspan=2, sticky="w", padx=5, pady=(0, 5))
+        author_label.grid(row=10, column=0, columnspan=2, sticky="w", padx=5, pady=(0, 5))
 
         return self.font_combo
 
@@ -742,6 +916,11 @@ class SettingsDialog(simpledialog.Dialog):
         self.settings['bg'] = self.bg_color_btn.cget('bg')
         self.settings['border_color'] = self.border_color_btn.cget('bg')
         self.settings['use_online_favicon'] = self.online_favicon_var.get()
+        self.settings['show_frequent_group'] = self.frequent_group_var.get()
+        self.settings['batch_launch_interval_ms'] = self._spin_value(
+            self.batch_interval_var, 'batch_launch_interval_ms', 0, 5000)
+        self.settings['batch_launch_max_concurrent'] = self._spin_value(
+            self.batch_concurrent_var, 'batch_launch_max_concurrent', 1, 16)
         self.result = self.settings.copy()
         save_settings(self.result)
         super().ok()
@@ -754,11 +933,28 @@ class SettingsDialog(simpledialog.Dialog):
         self.bg_color_btn.config(bg=self.settings['bg'])
         self.border_color_btn.config(bg=self.settings['border_color'])
         self.online_favicon_var.set(self.settings['use_online_favicon'])
+        self.frequent_group_var.set(self.settings['show_frequent_group'])
+        self.batch_interval_var.set(str(self.settings['batch_launch_interval_ms']))
+        self.batch_concurrent_var.set(str(self.settings['batch_launch_max_concurrent']))
+
+    def _spin_value(self, var, key, low, high):
+        """数値の入力欄の値を範囲内に収めて返す。数値でなければ今の設定値のまま"""
+        try:
+            return max(low, min(int(var.get()), high))
+        except ValueError:
+            return self.settings.get(key, DEFAULT_SETTINGS[key])
 
 # --- リンク編集画面 ---
 class LinksEditDialog(tk.Toplevel):
-
-    def __init__(self, parent, groups, settings):
+    SEARCH_DELAY_MS = 120  # 検索入力のデバウンス時間
+    RESIZE_DELAY_MS = 50   # リサイズが落ち着いたとみなすまでの時間
+    INDEX_SLICE = 0.008    # 検索インデックスを作るとき、1回に使う時間の上限(秒)。入力の処理を挟みながら作る
+    SEARCH_SLICE = 0.001   # 一致するリンクが多い検索で、1回に照合する時間の上限(秒)。残りは次の after で続ける
+    COLOR_PATH = "#888888"
+    COLOR_BROKEN = "#d9534f"    # リンク切れ
+    COLOR_REDIRECT = "#e69500"  # 転送される
+
+    def __init__(self, parent, groups, settings, profile_name):
         super().__init__(parent)
 
         # ★最重要ポイント1: transient を削除
@@ -769,19 +965,26 @@ class LinksEditDialog(tk.Toplevel):
         if 'app_icon' in globals() and app_icon:
             self.iconphoto(True, app_icon)
 
-        # 元データをディープコピーして保持
-        self.groups = [dict(g, links=[dict(l) for l in g.get('links', [])]) for g in groups]
-        self.original_groups = [dict(g, links=[dict(l) for l in g.get('links', [])]) for g in groups]
+        # 元データをコピーせずにIDで管理するモデルに取り込み、表示用にはその射影
+        # [(グループID, [リンクID, ...]), ...] を使う。検索中以外はリンクIDのリストをモデルと共有する
+        self.model = LinkModel(groups)
+        self.view_groups = self.model.project()
 
         self.settings = settings
-        self.link_row_height = 24 # デフォルト値
-        self.link_icon_size = 16 # デフォルト値
+        self.profile_name = profile_name  # 編集画面から起動したリンクも、このプロファイルの起動履歴に記録する
         self.selected_group = 0
         self.selected_link = None
-        self.icon_refs = []
         self.result = None
         self.modified = False  # 変更フラグ
         self.is_searching = False
+        self._search_after_id = None
+        self._index_after_id = None
+        # リンク切れチェックの結果 {パス: LinkStatus}。前回の結果があればすぐに表示する
+        self.link_status = cached_statuses(link['path'] for link in self.model.links.values())
+        self._check_queue = queue.Queue()
+        self._check_cancel = threading.Event()
+        self._check_after_id = None
+        self._resize_after_id = None
 
         self.drag_data = {"type": None, "start_index": -1, "widget": None}
         self.drag_indicator_id = None # ガイドラインのID
@@ -925,15 +1128,25 @@ class LinksEditDialog(tk.Toplevel):
         link_scrollbar = tk.Scrollbar(link_canvas_frame, orient="vertical")
         self.link_canvas = tk.Canvas(link_canvas_frame, bg="#ffffff", highlightthickness=0, yscrollcommand=link_scrollbar.set)
         self.link_canvas.grid(row=0, column=0, sticky="nsew")
-        link_scrollbar.config(command=self.link_canvas.yview)
+        link_scrollbar.config(command=self._on_link_scroll)
         link_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.link_canvas.bind("<Configure>", lambda e: self.refresh_link_list())
+        self.link_canvas.bind("<Configure>", self._on_link_canvas_configure)
         self.link_canvas.bind("<MouseWheel>", self._on_link_canvas_mousewheel)
         self.link_canvas.bind("<Double-Button-1>", self.on_link_canvas_double)
         self.link_canvas.bind("<ButtonPress-1>", self._on_press)
         self.link_canvas.bind("<B1-Motion>", self._on_motion)
         self.link_canvas.bind("<ButtonRelease-1>", self._on_release)
 
+        # 行の高さとアイコンの大きさはフォントから一度だけ決め、描画は LinkListView に任せる
+        self.link_font = tkfont.Font(family=self.settings['font'], size=self.settings['size'])
+        font_metrics = self.link_font.metrics()
+        self.link_row_height = font_metrics.get('linespace', 16) + 8
+        self.link_icon_size = max(12, min(round_to_step(font_metrics.get('ascent', 16), step=4), 32))
+        self._icon_keys = {}     # {パス: アイコンのキャッシュキー}
+        self._icon_targets = {}  # {パス: 取得を依頼したアイコンの受け取り先}
+        self.link_view = LinkListView(self.link_canvas, self._link_row_content, self.link_font.measure,
+                                      self.link_font, self.link_row_height, self.link_icon_size)
+
         # --- リンク操作ボタン ---
         self.link_btns_frame = tk.Frame(link_pane)
         self.link_btns_frame.grid(row=2, column=0, sticky="ew")
@@ -954,17 +1167,28 @@ class LinksEditDialog(tk.Toplevel):
         button_frame = tk.Frame(self)
         #button_frame.grid(row=1, column=0, sticky="e", padx=10, pady=(5, 10))
         button_frame.grid(row=1, column=0, pady=(5, 10))
+        self.undo_btn = tk.Button(button_frame, text="元に戻す", width=10, command=self.undo)
+        self.undo_btn.pack(side="left")
+        self.redo_btn = tk.Button(button_frame, text="やり直す", width=10, command=self.redo)
+        self.redo_btn.pack(side="left", padx=(5, 20))
+        self.check_btn = tk.Button(button_frame, text="リンク確認", width=10, command=self.check_links)
+        self.check_btn.pack(side="left", padx=(0, 20))
         tk.Button(button_frame, text="OK", width=10, command=self.ok).pack(side="left", padx=5)
         tk.Button(button_frame, text="キャンセル", width=10, command=self.cancel).pack(side="left")
 
         self.link_addr_entry.bind("<Return>", lambda e: self.save_link_addr())
         self.bind("<Escape>", self.cancel)
         self.bind("<Alt-F4>", self.cancel)
+        self.bind("<Control-z>", self.undo)
+        self.bind("<Control-y>", self.redo)
+        self.bind("<Control-Z>", self.redo)  # Ctrl+Shift+Z
 
         # --- 初期化と表示処理 ---
         self.refresh_group_list()
         self.group_listbox.focus_set()
         self._update_buttons_state() # ボタンの初期状態を設定
+        # 検索インデックスは画面を表示した後、少しずつ作成する（できるまでの検索は全件の走査で行う）
+        self._index_after_id = self.after_idle(self._build_search_index_step)
 
         # # ★★★ PanedWindowの初期分割位置を設定 ★★★
         # self.update_idletasks() # ウィジェットのサイズを計算させる
@@ -1010,8 +1234,9 @@ class LinksEditDialog(tk.Toplevel):
 
     # ok, cancel
     def ok(self, event=None):
-        # 変更：常にマスターデータである original_groups を結果として返す
-        self.result = self.original_groups
+        # 常にマスターデータであるモデルの内容を結果として返す
+        self.result = self.model.to_data()
+        self._cancel_pending_callbacks()
         self.destroy()
 
     def cancel(self, event=None):
@@ -1019,100 +1244,221 @@ class LinksEditDialog(tk.Toplevel):
             if not messagebox.askyesno("確認", "変更内容が保存されていません。破棄して閉じますか？", parent=self):
                 return
         self.result = None
+        self._cancel_pending_callbacks()
         self.destroy()
 
+    # --- リンク切れチェック ---
+    CHECK_POLL_MS = 100
+
+    def check_links(self):
+        """すべてのリンクをバックグラウンドでチェックし、結果を一覧に反映する"""
+        paths = [link['path'] for link in self.model.links.values()]
+        self.check_btn.config(state="disabled", text="確認中...")
+        self._check_cancel.clear()
+        def run():
+            try:
+                check_links(paths, force=True, on_result=self._check_queue.put, cancel_event=self._check_cancel)
+            finally:
+                self._check_queue.put(None)  # 終了の合図
+        threading.Thread(target=run, daemon=True).start()
+        self._check_after_id = self.after(self.CHECK_POLL_MS, self._poll_link_check)
+
+    def _poll_link_check(self):
+        self._check_after_id = None
+        updated = finished = False
+        while True:
+            try:
+                status = self._check_queue.get_nowait()
+            except queue.Empty:
+                break
+            if status is None:
+                finished = True
+            else:
+                self.link_status[status.path] = status
+                updated = True
+        if updated:
+            self.refresh_link_list()
+        if not finished:
+            self._check_after_id = self.after(self.CHECK_POLL_MS, self._poll_link_check)
+            return
+        self.check_btn.config(state="normal", text="リンク確認")
+        data = self.model.to_data()
+        rows = build_report(data, self.link_status)
+        problems = sum(1 for row in rows if row['status'] in PROBLEM_STATUSES)
+        if not problems:
+            messagebox.showinfo("リンク確認", f"{len(rows)} 件のリンクに問題はありませんでした。", parent=self)
+            return
+        if messagebox.askyesno("リンク確認", f"{len(rows)} 件中 {problems} 件のリンクに問題があります。\n"
+                               "結果をファイルに保存しますか？", parent=self):
+            report_path = filedialog.asksaveasfilename(
+                parent=self, title="レポートの保存", defaultextension=".csv", initialfile="link_report.csv",
+                filetypes=[("CSV", "*.csv"), ("JSON", "*.json")])
+            if report_path:
+                try:
+                    write_report(rows, report_path)
+                except OSError as e:
+                    messagebox.showerror("エラー", f"レポートを保存できませんでした:\n{e}", parent=self)
+
+    def _build_search_index_step(self):
+        self._index_after_id = None
+        if not self.model.build_search_index(deadline=time.perf_counter() + self.INDEX_SLICE):
+            self._index_after_id = self.after(1, self._build_search_index_step)
+
+    def _cancel_pending_callbacks(self):
+        self._cancel_pending_search()
+        if self._index_after_id:
+            self.after_cancel(self._index_after_id)
+            self._index_after_id = None
+        self._cancel_link_check()
+        self._forget_icon_requests()
+        if self._resize_after_id:
+            self.after_cancel(self._resize_after_id)
+            self._resize_after_id = None
+
+    def _cancel_link_check(self):
+        self._check_cancel.set()
+        if self._check_after_id:
+            self.after_cancel(self._check_after_id)
+            self._check_after_id = None
+
+    # --- 元に戻す/やり直す ---
+    def undo(self, event=None):
+        return self._step_history(self.model.undo, event)
+
+    def redo(self, event=None):
+        return self._step_history(self.model.redo, event)
+
+    def _mark_modified(self):
+        self.modified = True
+        self.undo_btn.config(state="normal")
+        self.redo_btn.config(state="disabled")  # 新しい編集をするとやり直しの履歴は消える
+
+    def _step_history(self, step, event):
+        if event is not None and isinstance(self.focus_get(), tk.Entry):
+            return None  # 検索欄やアドレス欄での入力中は、ショートカットをEntryに任せる
+        affected = step()
+        if affected is None:
+            return "break"
+        gid, lid = affected
+        # 表示用の射影を作り直し、変更のあったグループ/リンクを選択する
+        if self.is_searching:
+            self.view_groups = self.model.search(self.search_var.get().strip())
+        else:
+            self.view_groups = self.model.project()
+        self.selected_group = 0 if self.view_groups else None
+        self.selected_link = None
+        for i, (view_gid, link_ids) in enumerate(self.view_groups):
+            if view_gid == gid:
+                self.selected_group = i
+                if lid is not None and lid in link_ids:
+                    self.selected_link = link_ids.index(lid)
+                break
+        self.refresh_group_list()
+        if self.selected_group is not None:
+            self.group_listbox.see(self.selected_group)
+        self.modified = self.model.can_undo()
+        self._update_buttons_state()
+        return "break"
+
+    # --- 表示中のグループ/リンクのID ---
+    def _selected_group_id(self):
+        if not self.view_groups or self.selected_group is None or self.selected_group >= len(self.view_groups):
+            return None
+        return self.view_groups[self.selected_group][0]
+
+    def _visible_link_ids(self):
+        """選択中のグループで表示されているリンクIDのリスト"""
+        if self._selected_group_id() is None:
+            return []
+        return self.view_groups[self.selected_group][1]
+
+    def _selected_link_id(self):
+        link_ids = self._visible_link_ids()
+        if self.selected_link is None or not (0 <= self.selected_link < len(link_ids)):
+            return None
+        return link_ids[self.selected_link]
+
     def add_group(self):
         # このメソッドは検索中は呼ばれないが、念のためロジックを堅牢に
         name = simpledialog.askstring("グループ名", "新しいグループ名:", parent=self)
         if name:
-            new_group = {'group': name, 'links': []}
-            # 元データに追加
-            self.original_groups.append(copy.deepcopy(new_group))
+            gid = self.model.add_group(name)
             # 表示データにも追加
-            self.groups.append(copy.deepcopy(new_group))
+            self.view_groups.append((gid, self.model.group_link_ids(gid)))
 
-            self.selected_group = len(self.groups) - 1
+            self.selected_group = len(self.view_groups) - 1
             self.refresh_group_list()
             self.refresh_link_list()
-            self.modified = True
+            self._mark_modified()
 
     def rename_group(self):
-        if not self.groups or self.selected_group is None:
+        gid = self._selected_group_id()
+        if gid is None:
             return
-        idx = self.selected_group
-        
-        # 変更前のグループ名を取得（これが元データを探すキーになる）
-        original_name = self.groups[idx]['group']
+        original_name = self.model.group_name(gid)
         
         new_name = simpledialog.askstring("グループ名変更", "新しいグループ名:", initialvalue=original_name, parent=self)
         
         if new_name and new_name != original_name:
-            # 表示用データを更新
-            self.groups[idx]['group'] = new_name
-            
-            # 元データ(original_groups)も探し出して更新
-            for g in self.original_groups:
-                if g['group'] == original_name:
-                    g['group'] = new_name
-                    break # 見つけたら抜ける
-
+            # 表示データはIDで参照しているので、モデルを更新するだけでよい
+            self.model.rename_group(gid, new_name)
             self.refresh_group_list()
-            self.modified = True
+            self._mark_modified()
 
     def delete_group(self):
-        if not self.groups or self.selected_group is None:
+        gid = self._selected_group_id()
+        if gid is None:
             return
         
-        group_to_delete_name = self.groups[self.selected_group]['group']
+        group_to_delete_name = self.model.group_name(gid)
 
         if not messagebox.askyesno("確認", f"グループ '{group_to_delete_name}' を削除しますか？\n（中のリンクもすべて削除されます）", parent=self):
             return
 
+        self.model.delete_group(gid)
         # 表示データから削除
-        del self.groups[self.selected_group]
-        
-        # 元データ(original_groups)も探し出して削除
-        self.original_groups = [g for g in self.original_groups if g['group'] != group_to_delete_name]
+        del self.view_groups[self.selected_group]
 
         self.selected_group = max(0, self.selected_group - 1)
-        if not self.groups:
+        if not self.view_groups:
             self.selected_group = None
 
         self.refresh_group_list()
         self.refresh_link_list()
-        self.modified = True
+        self._mark_modified()
 
     def move_group_up(self):
         # 検索中は無効になっているはずだが、念のためチェック
         if self.is_searching: return
         
         idx = self.selected_group
-        if idx > 0:
-            # ★★★ original_groups を直接並べ替える ★★★
-            self.original_groups[idx-1], self.original_groups[idx] = self.original_groups[idx], self.original_groups[idx-1]
-            # 表示用データも同じように並べ替える
-            self.groups = [dict(g, links=[dict(l) for l in g.get('links', [])]) for g in self.original_groups]
+        if idx is not None and idx > 0:
+            self._move_group(idx, idx - 1)
             
             self.selected_group -= 1
             self.refresh_group_list()
-            self.modified = True
+            self._mark_modified()
 
     def move_group_down(self):
         if self.is_searching: return
         
         idx = self.selected_group
-        if idx < len(self.original_groups) - 1:
-            # ★★★ original_groups を直接並べ替える ★★★
-            self.original_groups[idx+1], self.original_groups[idx] = self.original_groups[idx], self.original_groups[idx+1]
-            # 表示用データも同じように並べ替える
-            self.groups = [dict(g, links=[dict(l) for l in g.get('links', [])]) for g in self.original_groups]
+        if idx is not None and idx < len(self.view_groups) - 1:
+            self._move_group(idx, idx + 1)
 
             self.selected_group += 1
             self.refresh_group_list()
-            self.modified = True
+            self._mark_modified()
+
+    def _move_group(self, old_index, new_index):
+        """グループを並べ替える。モデルと表示用リストの該当要素を動かすだけで、全体は作り直さない"""
+        entry = self.view_groups.pop(old_index)
+        self.view_groups.insert(new_index, entry)
+        self.model.move_group(entry[0], new_index)
 
     def add_link(self):
-        if not self.groups or self.selected_group is None:
+        gid = self._selected_group_id()
+        if gid is None:
             return
         # クリップボードからデフォルト値取得
         clipboard_text = None
@@ -1136,208 +1482,158 @@ class LinksEditDialog(tk.Toplevel):
         if not name:  # Noneまたは空文字列
             return
         # --- 重複チェック ---
-        current_group_links = self.groups[self.selected_group]['links']
-        if any(link['name'] == name for link in current_group_links):
+        if self.model.has_link_name(gid, name):
             messagebox.showerror("エラー", f"同じグループ内に同じ名前のリンクが既に存在します。", parent=self)
             return
         path = self.ask_dialog(self, "リンク先", "リンク先パスまたはURL:", initialvalue=default_path)
         if not path:  # Noneまたは空文字列
             return
-        new_link_data = {'name': name, 'path': path}
-
-        # --- ★★★ データ同期ロジック ★★★ ---
-        # 1. 表示されているグループ名を取得
-        current_group_name = self.groups[self.selected_group]['group']
-        # 2. original_groups から該当グループを探し、そこに新しいリンクを追加
-        for g in self.original_groups:
-            if g['group'] == current_group_name:
-                g['links'].append(new_link_data.copy())
-                break
-        # 3. 表示用のgroupsにも追加
-        self.groups[self.selected_group]['links'].append(new_link_data.copy())
-        self.selected_link = len(self.groups[self.selected_group]['links']) - 1
 
-        # --- 追加したリンクのアイコンを個別にキャッシュ取得 ---
-        try:
-            if path.startswith('http'):
-                get_web_icon(path, size=self.link_icon_size)
-            else:
-                get_file_icon(path, size=self.link_icon_size)
-        except Exception as e:
-            logging.info(f"[add_link] icon fetch failed: {path} : {e}")
+        lid = self.model.add_link(gid, name, path)
+        link_ids = self._visible_link_ids()
+        if self.is_searching:
+            # 検索結果のリストはモデルと別なので、表示用にも追加する
+            link_ids.append(lid)
+        self.selected_link = len(link_ids) - 1
+
+        # アイコンは行が表示されたときにバックグラウンドで取得する
         self.refresh_link_list()
         self._update_buttons_state()
-        self.modified = True
+        self._mark_modified()
 
     def rename_link(self):
-        if not self.groups or self.selected_group is None or self.selected_link is None:
+        lid = self._selected_link_id()
+        if lid is None:
             return
         
-        # --- ★★★ データ同期ロジック ★★★ ---
-        # 1. 変更対象の情報を取得
-        group_name = self.groups[self.selected_group]['group']
-        link_idx = self.selected_link
-
-        # ★重要: original_groups内の本当のオブジェクトを見つけるために、表示上のインデックスだけでなく、
-        #        表示データと内容が一致するオブジェクトを探す必要があります。
-        #        まず、表示されているリンクの情報を取得します。
-        visible_link = self.groups[self.selected_group]['links'][link_idx]
-        
-        new_name = simpledialog.askstring("名前変更", "新しい名前:", initialvalue=visible_link['name'], parent=self)
-        
-        if new_name and new_name != visible_link['name']:
-            # 2. original_groups から該当グループとリンクを探して更新
-            for g in self.original_groups:
-                if g['group'] == group_name:
-                    # g['links']の中から、表示されているリンクと内容が一致するものを探す
-                    for original_link in g['links']:
-                        if original_link['name'] == visible_link['name'] and original_link['path'] == visible_link['path']:
-                            original_link['name'] = new_name
-                            break
-                    break
-            
-            # 3. 表示用データも更新
-            visible_link['name'] = new_name
-
-            # 4. 画面を更新
+        link = self.model.links[lid]
+        new_name = simpledialog.askstring("名前変更", "新しい名前:", initialvalue=link['name'], parent=self)
+        
+        if new_name and new_name != link['name']:
+            self.model.rename_link(lid, new_name)
             self.refresh_link_list()
-            self.modified = True
+            self._mark_modified()
 
     def delete_link(self):
-        if not self.groups or self.selected_group is None or self.selected_link is None:
+        lid = self._selected_link_id()
+        if lid is None:
             return
 
-        # --- ★★★ データ同期ロジック ★★★ ---
-        # 1. 削除対象の情報を取得
-        group_name = self.groups[self.selected_group]['group']
-        link_to_delete = self.groups[self.selected_group]['links'][self.selected_link]
-        
-        # 2. original_groups から該当グループとリンクを探して削除
-        for g in self.original_groups:
-            if g['group'] == group_name:
-                g['links'] = [link for link in g['links'] if not (link['name'] == link_to_delete['name'] and link['path'] == link_to_delete['path'])]
-                break
-
-        # 3. 表示用データから削除
-        del self.groups[self.selected_group]['links'][self.selected_link]
+        self.model.delete_link(lid)
+        if self.is_searching:
+            # 検索結果のリストはモデルと別なので、表示用からも削除する
+            del self._visible_link_ids()[self.selected_link]
         self.selected_link = None
         
-        # 4. 画面を更新
         self.refresh_link_list()
         self._update_buttons_state()
-        self.modified = True
+        self._mark_modified()
 
     def move_link_up(self):
         if self.is_searching: return
-        if not self.groups or self.selected_group is None or self.selected_link is None or self.selected_link == 0:
+        lid = self._selected_link_id()
+        if lid is None or self.selected_link == 0:
             return
 
-        # ★★★ original_groups 内の該当リンクを直接並べ替える ★★★
-        group_name = self.groups[self.selected_group]['group']
-        link_idx = self.selected_link
-        
-        for g in self.original_groups:
-            if g['group'] == group_name:
-                g['links'][link_idx-1], g['links'][link_idx] = g['links'][link_idx], g['links'][link_idx-1]
-                break
-        
-        # 表示用データも更新
-        links = self.groups[self.selected_group]['links']
-        links[link_idx-1], links[link_idx] = links[link_idx], links[link_idx-1]
+        # 検索中以外は表示用リストがモデルと共有なので、モデルの更新だけでよい
+        self.model.move_link(lid, self.selected_link - 1)
         
         self.selected_link -= 1
         self.refresh_link_list()
-        self.modified = True
+        self._mark_modified()
 
     def move_link_down(self):
         if self.is_searching: return
-        if not self.groups or self.selected_group is None or self.selected_link is None:
-            return
-
-        links = self.groups[self.selected_group]['links']
-        link_idx = self.selected_link
-        if link_idx >= len(links) - 1:
+        lid = self._selected_link_id()
+        if lid is None or self.selected_link >= len(self._visible_link_ids()) - 1:
             return
 
-        # ★★★ original_groups 内の該当リンクを直接並べ替える ★★★
-        group_name = self.groups[self.selected_group]['group']
-        
-        for g in self.original_groups:
-            if g['group'] == group_name:
-                g['links'][link_idx+1], g['links'][link_idx] = g['links'][link_idx], g['links'][link_idx+1]
-                break
-
-        # 表示用データも更新
-        links[link_idx+1], links[link_idx] = links[link_idx], links[link_idx]
+        self.model.move_link(lid, self.selected_link + 1)
         
         self.selected_link += 1
         self.refresh_link_list()
-        self.modified = True
+        self._mark_modified()
 
     def refresh_link_list(self):
-        self.link_canvas.delete("all")
-        self.icon_refs.clear()
-        # self.canvas_item_map.clear()
-
-        font_name_tuple = (self.settings['font'], self.settings['size'])
-        font_path_tuple = (self.settings['font'], self.settings['size'])
-        color_path = "#888888"
-
-        name_font_obj = tkfont.Font(font=font_name_tuple)
-        font_metrics = name_font_obj.metrics()
-        font_height = font_metrics.get('linespace', font_metrics.get('height', 16))
-        padding = 8
-        self.link_row_height = font_height + padding
-
-        self.link_icon_size = font_metrics.get('ascent', 16)
-        self.link_icon_size = round_to_step(self.link_icon_size, step=4)
-        self.link_icon_size = max(12, min(self.link_icon_size, 32))
-
-        if not self.groups or self.selected_group is None or self.selected_group >= len(self.groups):
-            self.link_addr_entry.config(state="disabled")
-            self.save_addr_btn.config(state="disabled")
-            self.link_addr_var.set("")
+        """選択中のグループのリンク一覧を表示する。見えている行のうち、変わったものだけが描き直される"""
+        self.link_view.set_rows(self._visible_link_ids(), self.selected_link)
+        self._update_link_addr()
+
+    def _link_row_content(self, lid):
+        """1行分の表示内容 (アイコン, 名前, パスの表示文字列, パスの色)"""
+        link = self.model.links[lid]
+        path = link['path']
+        key = self._icon_keys.get(path)
+        if key is None:
+            # ファイルのキーはパスの存在確認を伴うので、描き直しのたびに求めない
+            key = self._icon_keys[path] = generate_icon_cache_key(path, self.link_icon_size)
+        icon = get_cached_icon(path, self.link_icon_size, key)
+        if not icon:
+            icon = get_placeholder_icon(self.link_icon_size)
+            self._request_icon(path)
+        status = self.link_status.get(path)
+        if status is not None and status.status in PROBLEM_STATUSES:
+            return icon, link['name'], f"⚠ {path}  ({status.detail})", self.COLOR_BROKEN
+        if status is not None and status.status == STATUS_REDIRECT:
+            return icon, link['name'], f"{path}  → {status.final_url}", self.COLOR_REDIRECT
+        return icon, link['name'], path, self.COLOR_PATH
+
+    def _request_icon(self, path):
+        """見えている行のアイコンをバックグラウンドで取得し、届いたらその行だけを描き直す"""
+        if path in self._icon_targets or not path:
             return
-        links = self.groups[self.selected_group]['links']
-        y = 2
-        canvas_width = self.link_canvas.winfo_width() or 360
-        for i, link in enumerate(links):
-            path = link['path']
-            key = generate_icon_cache_key(path, self.link_icon_size)
-            icon = _icon_cache.get(key)
-            if not icon:
-                icon = _create_fallback_icon(self.link_icon_size)
-            if icon:
-                self.link_canvas.create_image(4, y + self.link_row_height // 2, image=icon, anchor="w")
-                self.icon_refs.append(icon)
-            # アイコンの右側余白を1px、左側を4pxに
-            name_x_start = 4 + self.link_icon_size + 1
-            # 省略せずフルテキストで表示
-            display_name = link['name']
-            if self.selected_link == i:
-                self.link_canvas.create_rectangle(0, y, canvas_width, y+self.link_row_height, outline="#3399ff", width=2)
-            name_id = self.link_canvas.create_text(name_x_start, y + self.link_row_height // 2,
-                                                   text=display_name, anchor="w", font=font_name_tuple)
-            name_width = name_font_obj.measure(display_name)
-            path_x_start = name_x_start + name_width + 25
-            path_id = self.link_canvas.create_text(path_x_start, y + self.link_row_height // 2,
-                                                   text=link['path'], anchor="w", font=font_path_tuple, fill=color_path)
-            y += self.link_row_height
-        self.link_canvas.config(scrollregion=(0,0,canvas_width,y))
-        if self.selected_link is not None and 0 <= self.selected_link < len(links):
+        target = self._icon_targets[path] = IconTarget(self, lambda icon: self._on_icon_loaded(path))
+        request_icon(path, self.link_icon_size, target)
+
+    def _on_icon_loaded(self, path):
+        self._icon_targets.pop(path, None)
+        rows = [index for index, lid in self.link_view.drawn_rows() if self.model.links.get(lid, {}).get('path') == path]
+        if rows:
+            self.link_view.invalidate(rows)
+            self.link_view.render()
+
+    def _forget_icon_requests(self):
+        for path, target in self._icon_targets.items():
+            _icon_waiters.remove((path, self.link_icon_size), target)
+        self._icon_targets.clear()
+
+    def _select_link(self, index):
+        """選択を変える。一覧は描き直さず、枠を動かすだけ"""
+        self.selected_link = index
+        self.link_view.set_selection(index)
+        self._update_link_addr()
+        self._update_buttons_state()
+
+    def _update_link_addr(self):
+        lid = self._selected_link_id()
+        if lid is not None:
             self.link_addr_entry.config(state="normal")
             self.save_addr_btn.config(state="normal")
-            self.link_addr_var.set(links[self.selected_link]['path'])
+            self.link_addr_var.set(self.model.links[lid]['path'])
         else:
             self.link_addr_entry.config(state="disabled")
             self.save_addr_btn.config(state="disabled")
             self.link_addr_var.set("")
 
+    def _on_link_canvas_configure(self, event):
+        # ウィンドウのリサイズ中は1pxごとに届くので、落ち着いてから1回だけ反映する
+        if self._resize_after_id:
+            self.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.after(self.RESIZE_DELAY_MS, self._apply_link_canvas_resize)
+
+    def _apply_link_canvas_resize(self):
+        self._resize_after_id = None
+        self.link_view.resize(self.link_canvas.winfo_width())
+
+    def _on_link_scroll(self, *args):
+        self.link_canvas.yview(*args)
+        self.link_view.render()
+
     def refresh_group_list(self):
         self.group_listbox.delete(0, tk.END)
-        for g in self.groups:
-            self.group_listbox.insert(tk.END, " " + g['group'])  # 先頭にスペースで左余白
-        if self.groups:
+        for gid, _ in self.view_groups:
+            self.group_listbox.insert(tk.END, " " + self.model.group_name(gid))  # 先頭にスペースで左余白
+        if self.view_groups:
             self.group_listbox.select_set(self.selected_group)
         # グループリスト更新時はリンクリストを空に
         self.refresh_link_list()
@@ -1351,61 +1647,33 @@ class LinksEditDialog(tk.Toplevel):
             self.link_canvas.config(state="normal")
 
     def on_link_canvas_double(self, event):
-        if not self.groups or self.selected_group is None:
-            return
-        links = self.groups[self.selected_group]['links']
+        link_ids = self._visible_link_ids()
         
-        canvas_y = self.link_canvas.canvasy(event.y)
-        idx = int((canvas_y - 2) / self.link_row_height)
+        idx = self.link_view.index_at(self.link_canvas.canvasy(event.y))
         
-        if 0 <= idx < len(links):
-            path = links[idx]['path']
-            open_link(path)
+        if 0 <= idx < len(link_ids):
+            path = self.model.links[link_ids[idx]]['path']
+            open_link(path, self.profile_name)
 
     def save_link_addr(self):
-        if not self.groups or self.selected_group is None or self.selected_link is None:
+        lid = self._selected_link_id()
+        if lid is None:
             return
 
-        # --- ★★★ データ同期ロジック ★★★ ---
-        # 1. 変更対象の情報を取得
-        group_name = self.groups[self.selected_group]['group']
-        visible_link = self.groups[self.selected_group]['links'][self.selected_link]
-        old_path = visible_link['path']
+        old_path = self.model.links[lid]['path']
         new_path = self.link_addr_var.get().strip()
 
         if not new_path or new_path == old_path:
             return
             
-        # 2. original_groups から該当グループとリンクを探して更新
-        for g in self.original_groups:
-            if g['group'] == group_name:
-                # 名前と古いパスでユニークに特定
-                for original_link in g['links']:
-                    if original_link['name'] == visible_link['name'] and original_link['path'] == old_path:
-                        original_link['path'] = new_path
-                        break
-                break
+        self.model.set_link_path(lid, new_path)
 
-        # 3. 表示用データも更新
-        visible_link['path'] = new_path
-
-        # キャッシュクリア（旧パス・新パス両方）
-        for p in (old_path, new_path):
-            key = (p, self.link_icon_size)
-            if key in _icon_cache:
-                del _icon_cache[key]
-        # 新しいパスのアイコンを取得
-        try:
-            if new_path.startswith('http'):
-                get_web_icon(new_path, size=self.link_icon_size)
-            else:
-                get_file_icon(new_path, size=self.link_icon_size)
-        except Exception as e:
-            logging.info(f"[save_link_addr] icon fetch failed: {new_path} ({self.link_icon_size}px): {e}")
+        # 旧パス・新パスのアイコンを、すべてのサイズと作成済みのサブポップアップから消す
+        invalidate_icons(paths=(old_path, new_path))
 
-        # 4. 画面を更新
+        # 画面を更新（新しいパスのアイコンはバックグラウンドで取得する）
         self.refresh_link_list()
-        self.modified = True
+        self._mark_modified()
 
     def on_link_addr_focus(self, event):
         self.link_addr_entry.icursor(tk.END)
@@ -1423,17 +1691,32 @@ class LinksEditDialog(tk.Toplevel):
             delta = -1 * (event.delta // 120)
         
         self.link_canvas.yview_scroll(delta, "units")
+        self.link_view.render()
 
     def _on_search_change(self, *args):
+        # キー入力のたびに検索せず、入力が落ち着いてからまとめて検索する
+        self._cancel_pending_search()
+        self._search_after_id = self.after(self.SEARCH_DELAY_MS, self._apply_search)
+
+    def _cancel_pending_search(self):
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+
+    def _apply_search(self):
+        self._search_after_id = None
         query = self.search_var.get().strip()
         if query:
+            if not self._perform_search(query):
+                # 照合が終わっていなければ、表示はそのままで続きを次に回す（入力が変われば新しい検索になる）
+                self._search_after_id = self.after(1, self._apply_search)
+                return
             self.is_searching = True
-            self._perform_search(query)
         else:
             self.is_searching = False
             # 元のリストに戻す
-            self.groups = [dict(g, links=[dict(l) for l in g.get('links', [])]) for g in self.original_groups]
-            self.selected_group = 0 if self.groups else None
+            self.view_groups = self.model.project()
+            self.selected_group = 0 if self.view_groups else None
             
             self.no_results_label.lower() # ラベルを背面に
             
@@ -1441,32 +1724,22 @@ class LinksEditDialog(tk.Toplevel):
         self._update_buttons_state()
 
     def _perform_search(self, query):
-        """実際に検索処理を実行し、表示用データを生成する"""
-        query_lower = query.lower()
-        search_results = []
-        
-        for group_data in self.original_groups:
-            matched_links = []
-            group_name_match = query_lower in group_data['group'].lower()
-            
-            for link_data in group_data.get('links', []):
-                if group_name_match:
-                    matched_links.append(link_data.copy())
-                    continue
-                
-                if query_lower in link_data['name'].lower() or query_lower in link_data['path'].lower():
-                    matched_links.append(link_data.copy())
-            
-            if matched_links:
-                search_results.append({'group': group_data['group'], 'links': matched_links})
-
-        self.groups = search_results
-        self.selected_group = 0 if self.groups else None
-
-        if not self.groups:
+        """
+        実際に検索処理を実行し、表示用データ（モデルの絞り込み射影）を生成する。
+        モデルの検索インデックスを使うので、文字を追加した場合は前回の結果を絞り込むだけで済む。
+        SEARCH_SLICE のうちに終わらなければ、何も変えずに False を返す。
+        """
+        view_groups = self.model.search(query, deadline=time.perf_counter() + self.SEARCH_SLICE)
+        if view_groups is None:
+            return False
+        self.view_groups = view_groups
+        self.selected_group = 0 if self.view_groups else None
+
+        if not self.view_groups:
             self.no_results_label.lift() # ラベルを前面に
         else:
             self.no_results_label.lower() # ラベルを背面に
+        return True
 
     def _update_buttons_state(self):
         """現在の状態に応じて、すべてのボタンの有効/無効を切り替える"""
@@ -1475,7 +1748,7 @@ class LinksEditDialog(tk.Toplevel):
         # 検索中か？
         is_searching = self.is_searching
         # グループリストに表示項目があるか？
-        has_groups = bool(self.groups)
+        has_groups = bool(self.view_groups)
         # 何かグループが選択されているか？
         group_selected = self.selected_group is not None and has_groups
         # 何かリンクが選択されているか？
@@ -1510,6 +1783,10 @@ class LinksEditDialog(tk.Toplevel):
         self.rename_link_btn.config(state=link_dependent_state)
         self.delete_link_btn.config(state=link_dependent_state)
 
+        # --- 元に戻す/やり直す ---
+        self.undo_btn.config(state="normal" if self.model.can_undo() else "disabled")
+        self.redo_btn.config(state="normal" if self.model.can_redo() else "disabled")
+
     # 入力ダイアログをカスタムしてEntry幅を指定
     @staticmethod
     def ask_dialog(parent, title, prompt, initialvalue=""):
@@ -1581,9 +1858,8 @@ class LinksEditDialog(tk.Toplevel):
                 self.drag_data["start_index"] = index
         
         elif widget == self.link_canvas:
-            canvas_y = widget.canvasy(event.y)
-            index = int((canvas_y - 2) / self.link_row_height)
-            if 0 <= index < len(self.groups[self.selected_group]['links']):
+            index = self.link_view.index_at(widget.canvasy(event.y))
+            if 0 <= index < len(self._visible_link_ids()):
                 self.drag_data["type"] = "link"
                 self.drag_data["start_index"] = index
 
@@ -1652,16 +1928,10 @@ class LinksEditDialog(tk.Toplevel):
             pass
         elif drag_type == "link":
             if index != -1:
-                if self.selected_link == index:
-                    self.selected_link = None # 再クリックで選択解除
-                else:
-                    self.selected_link = index
-                self.refresh_link_list()
-                self._update_buttons_state()
+                # 再クリックで選択解除
+                self._select_link(None if self.selected_link == index else index)
             else: # 空白部分のクリック
-                self.selected_link = None
-                self.refresh_link_list()
-                self._update_buttons_state()
+                self._select_link(None)
     
     def _handle_drop(self, event):
         """ドロップ操作による並べ替えを処理する"""
@@ -1672,12 +1942,10 @@ class LinksEditDialog(tk.Toplevel):
         if drag_type == "group":
             end_index = widget.nearest(event.y)
             if end_index != -1 and start_index != end_index:
-                item = self.original_groups.pop(start_index)
                 if end_index > start_index: end_index -= 1
-                self.original_groups.insert(end_index, item)
-                self.groups = copy.deepcopy(self.original_groups)
+                self._move_group(start_index, end_index)
                 self.selected_group = end_index
-                self.modified = True
+                self._mark_modified()
                 self.refresh_group_list()
             # 選択状態を再設定
             if self.selected_group is not None:
@@ -1687,11 +1955,10 @@ class LinksEditDialog(tk.Toplevel):
             canvas_y = widget.canvasy(event.y)
             end_index = int((canvas_y + self.link_row_height / 2) / self.link_row_height)
             
-            group_name = self.groups[self.selected_group]['group']
-            target_group = next((g for g in self.original_groups if g['group'] == group_name), None)
+            gid = self._selected_group_id()
             
-            if target_group and end_index != -1:
-                links = target_group['links']
+            if gid is not None and end_index != -1:
+                links = self.model.group_link_ids(gid)
                 end_index = max(0, min(end_index, len(links)))
                 
                 # pop, insertする前にend_indexを調整
@@ -1700,18 +1967,23 @@ class LinksEditDialog(tk.Toplevel):
                     effective_end_index -= 1
 
                 if start_index != effective_end_index:
-                    item = links.pop(start_index)
-                    links.insert(end_index, item)
+                    # 表示用リストはモデルと共有なので、1件動かすだけでよい
+                    self.model.move_link(links[start_index], end_index)
                     
-                    self.groups = copy.deepcopy(self.original_groups)
                     self.selected_link = end_index if end_index <= len(links) else len(links) -1
-                    self.modified = True
+                    self._mark_modified()
                     self.refresh_link_list()
 
 class LinkPopup(tk.Toplevel):
     # --- レイアウト定数 ---
     # ICON_COLUMN_WIDTH = 24  # ←固定値を廃止
     TEXT_LEFT_PADDING = 0   # アイコンとテキストの間の隙間
+    FREQUENT_GROUP_NAME = "★ よく使う"  # 起動履歴から作る先頭のグループ
+    FREQUENT_LINKS = 8
+    PREBUILD_GROUPS = 3  # よく使うグループのサブポップアップを事前に作っておく数
+    PROFILE_CACHE_SIZE = 3          # 切り替え後もサブポップアップを残しておくプロファイルの数
+    PROFILE_CACHE_MAX_ROWS = 3000   # 残しておくサブポップアップのリンク行数の合計の上限
+    HOVER_PREFETCH_MS = 120         # マウスが行の上でこの時間止まったら、リンク先を先読みする
     
     def __init__(self, master, settings, profile_name):
         super().__init__(master)
@@ -1732,14 +2004,19 @@ class LinkPopup(tk.Toplevel):
         
         self.group_map = []
         self.link_items = {}
+        self.link_store = None
         self.hover_group = None
         self.link_popup = None
         self._leave_after_id = None
+        self._prefetch_after_id = None
         #self.folder_icon = get_system_folder_icon(size=16)
         self.folder_icon = None
         self.arrow_icon = None
 
         self._popup_cache = {}  # {group_name: Toplevel_widget}
+        # 直近に使ったプロファイルのサブポップアップ {プロファイル名: _popup_cache} (古い順)
+        self._warm_profiles = OrderedDict()
+        add_icon_invalidation_listener(self.drop_popups_using)
 
         #self.apply_settings(self.settings)
         self.reload_profile(profile_name)
@@ -1764,6 +2041,7 @@ class LinkPopup(tk.Toplevel):
         # フォルダアイコンを必ず取得
         self.folder_icon = get_system_folder_icon(size=self.icon_size)
         self.clear_cache()  # 設定変更時はキャッシュをクリア
+        self.clear_warm_profiles()
         self.draw_list()
         LinkPopup.current_icon_size = self.icon_size
 
@@ -1775,44 +2053,150 @@ class LinkPopup(tk.Toplevel):
         self.reload_links() # 新しいプロファイルのlinks.jsonを読み込む
         self.apply_settings(self.settings) # 見た目を更新
 
-    def clear_cache(self):
-        """保持しているサブポップアップのキャッシュをすべて破棄する"""
-        for widget in self._popup_cache.values():
+    def switch_profile(self, profile_name):
+        """
+        プロファイルを切り替える。現在のプロファイルのサブポップアップは破棄せずに残し、
+        最近使ったプロファイルに戻る場合は残しておいたものをそのまま使う。
+        """
+        if profile_name == self.profile_name:
+            return
+        if self._popup_cache:
+            self._warm_profiles[self.profile_name] = self._popup_cache
+        self._popup_cache = self._warm_profiles.pop(profile_name, {})
+        self._trim_warm_profiles()
+        self.profile_name = profile_name
+        self.hover_group = None
+        self.reload_links()
+        # 残しておいた間にリンクが外部で変更されていれば、そのグループだけ作り直す
+        self._validate_popup_cache()
+        self.draw_list()
+
+    def refresh_changed_groups(self):
+        """
+        リンクファイルが外部で変更されたときに呼ぶ。内容が変わったグループのサブポップアップだけを破棄し、
+        新しく増えたリンクのアイコンを先に取得しておく。変わったグループ名の集合を返す。
+        """
+        self.reload_links()
+        changed = self._validate_popup_cache()
+        self.draw_list()
+        return changed
+
+    def _validate_popup_cache(self):
+        changed = set()
+        added = []
+        for group_name, widget in list(self._popup_cache.items()):
+            old_links = getattr(widget, 'source_links', None)
+            new_links = self.link_items.get(group_name)
+            if new_links == old_links:
+                continue
+            changed.add(group_name)
+            del self._popup_cache[group_name]
+            if widget is self.link_popup:
+                self.link_popup = None
+            if widget.winfo_exists():
+                widget.destroy()
+            old_paths = {link.get('path') for link in old_links or []}
+            added += [link.get('path') for link in new_links or []
+                      if link.get('path') and link.get('path') not in old_paths]
+        # 外部で書き換えられたリンク先は、以前に「見つからない」アイコンを覚えていることがあるので取り直す
+        files = [path for path in added if not path.startswith(('http://', 'https://'))]
+        if files:
+            invalidate_icons(paths=files)
+        for path in added:
+            _icon_request_queue.put((path, self.icon_size))
+        return changed
+
+    def drop_popups_using(self, matches):
+        """アイコンを無効化したリンクを含むサブポップアップを破棄する（次に開くときに作り直す）"""
+        for popups in (self._popup_cache, *self._warm_profiles.values()):
+            for group_name, widget in list(popups.items()):
+                if not any(matches(link.get('path', '')) for link in getattr(widget, 'source_links', None) or []):
+                    continue
+                del popups[group_name]
+                if widget is self.link_popup:
+                    self.link_popup = None
+                if widget.winfo_exists():
+                    widget.destroy()
+
+    @staticmethod
+    def _destroy_popups(popups):
+        for widget in popups.values():
             if widget and widget.winfo_exists():
                 widget.destroy()
+        # 破棄したサブポップアップのラベルが、アイコン待ちの登録に残らないようにする
+        _icon_waiters.sweep()
+
+    def _trim_warm_profiles(self):
+        """件数とリンク行数の上限を超えた分を、古いプロファイルから破棄する"""
+        def rows(popups):
+            return sum(getattr(w, 'row_count', 0) for w in popups.values())
+        total = sum(rows(popups) for popups in self._warm_profiles.values())
+        while self._warm_profiles and (len(self._warm_profiles) > self.PROFILE_CACHE_SIZE or
+                                       total > self.PROFILE_CACHE_MAX_ROWS):
+            _, popups = self._warm_profiles.popitem(last=False)
+            total -= rows(popups)
+            self._destroy_popups(popups)
+
+    def clear_warm_profiles(self):
+        """残しておいた他のプロファイルのサブポップアップをすべて破棄する"""
+        for popups in self._warm_profiles.values():
+            self._destroy_popups(popups)
+        self._warm_profiles.clear()
+
+    def clear_cache(self):
+        """保持しているサブポップアップのキャッシュをすべて破棄する"""
+        self._destroy_popups(self._popup_cache)
         self._popup_cache.clear()
 
     def reload_links(self):
-        self.link_items.clear()
-        self.group_map.clear()
-        groups_data = load_links_data(self.profile_name)
-        if groups_data is None:
+        # グループの一覧だけを読み込み、各グループのリンクは初めて表示するときに読み込む
+        store = open_link_store(self.profile_name)
+        groups = store.groups()
+        if groups is None:
             links_os = self._load_os_links()
             groups_data = [{"group": "マイリンク", "links": [{"name": n, "path": p} for n, p in links_os.items()]}]
-            save_links_data(groups_data)
-        for group in groups_data:
-            self.link_items[group['group']] = group['links']
-            self.group_map.append(group['group'])
+            save_links_data(groups_data, self.profile_name)
+            store = JsonLinkStore(self.profile_name, groups_data)
+            groups = store.groups()
+        preloaded = {}
+        if self.settings.get('show_frequent_group'):
+            frequent = self._frequent_links(store)
+            if frequent:
+                preloaded[self.FREQUENT_GROUP_NAME] = frequent
+        self.link_store = store
+        self.link_items = GroupLinks(store, groups, preloaded)  # 「よく使う」と同じ名前のグループは表示しない
+        self.group_map = list(self.link_items)
+
+    def _frequent_links(self, store):
+        """起動履歴のスコアが高いリンクを、現在のプロファイルに残っているものだけ返す"""
+        paths = top_links(self.profile_name, self.FREQUENT_LINKS * 2)
+        found = store.find_paths(paths)
+        return [found[p][1] for p in paths if p in found][:self.FREQUENT_LINKS]
+
+    def prebuild_popups(self):
+        """よく使うグループのサブポップアップを、アイドル時に先に作っておく"""
+        scores = frecency_scores(self.profile_name)
+        if not scores:
+            return
+        group_scores = dict.fromkeys(self.group_map, 0)
+        if self.FREQUENT_GROUP_NAME in group_scores:
+            group_scores[self.FREQUENT_GROUP_NAME] = float('inf')
+        for path, (group_name, link) in self.link_store.find_paths(scores).items():
+            if group_name in group_scores:
+                group_scores[group_name] += scores[path]
+        ranked = sorted((g for g in group_scores if group_scores[g] > 0), key=group_scores.get, reverse=True)
+        for group_name in ranked[:self.PREBUILD_GROUPS]:
+            cached = self._popup_cache.get(group_name)
+            if self.link_items.count(group_name) and not (cached and cached.winfo_exists()):
+                self._popup_cache[group_name] = self.create_link_popup_content(self.link_items[group_name], group_name)
 
     def _load_os_links(self):
-        pythoncom.CoInitialize()
+        links_folder = os.path.join(os.environ.get('USERPROFILE', ''), 'Links')
         links = {}
-        links_folder = os.path.join(os.environ['USERPROFILE'], 'Links')
-        if not os.path.isdir(links_folder): return {}
-        for filename in os.listdir(links_folder):
-            filepath = os.path.join(links_folder, filename)
-            name, ext = os.path.splitext(filename)
-            target = None
-            try:
-                if ext == '.url':
-                    config = configparser.ConfigParser(); config.read(filepath, encoding='utf-8-sig')
-                    target = config.get('InternetShortcut', 'URL')
-                elif ext == '.lnk':
-                    shell = Dispatch("WScript.Shell"); shortcut = shell.CreateShortCut(filepath)
-                    target = shortcut.TargetPath
-            except Exception as e: logging.warning(f"OS link parse error: {e}")
-            if target: links[name] = target
-        return dict(sorted(links.items()))
+        for name, _, info in scan_shortcuts(links_folder):
+            if info['target']:
+                links[name] = launch_command(info)
+        return links
 
     def show(self):
         self.reload_links()
@@ -1852,6 +2236,7 @@ class LinkPopup(tk.Toplevel):
         self.deiconify()
         self.lift()
         self.focus_force()
+        self.after_idle(self.prebuild_popups)
 
     def draw_list(self):
         self.canvas.delete("all")
@@ -1893,7 +2278,7 @@ class LinkPopup(tk.Toplevel):
                 font=font_main, 
                 fill=main_font_color
             )
-            if self.link_items.get(group):
+            if self.link_items.count(group):
                 arrow_x = canvas_w - (ARROW_AREA_WIDTH // 2)
                 self.canvas.create_text(
                     arrow_x, 
@@ -1931,8 +2316,8 @@ class LinkPopup(tk.Toplevel):
             self.draw_list()
         self._leave_after_id = None
 
-    def create_link_popup_content(self, links):
-        """ サブポップアップのウィジェットを作成して返す"""
+    def create_link_popup_content(self, links, group_name=None):
+        """ サブポップアップのウィジェットを作成して返す。group_name を渡すと「すべて開く」の行を付ける"""
         popup = tk.Toplevel(self)
         popup.overrideredirect(True)
         popup.attributes("-topmost", True)
@@ -1963,9 +2348,8 @@ class LinkPopup(tk.Toplevel):
 
             key = generate_icon_cache_key(path, size)
             
-            # 2. キャッシュからアイコンを読み込む（ロックで保護）
-            with _icon_cache_lock:
-                icon = _icon_cache.get(key)
+            # 2. キャッシュからアイコンを読み込む
+            icon = get_cached_icon(path, size, key)
             
             # 3. icon_label を一度だけ作成
             icon_label = tk.Label(row, bg=self.settings['bg'])
@@ -1978,19 +2362,11 @@ class LinkPopup(tk.Toplevel):
                 popup.icon_refs.append(icon)
             else:
                 # キャッシュになかった場合：ダミーを表示し、取得リクエスト
-                dummy_icon = _create_fallback_icon(size)
+                dummy_icon = get_placeholder_icon(size)
                 icon_label.config(image=dummy_icon)
-                popup.icon_refs.append(dummy_icon)
 
-                # このアイコン取得リクエストをキューに入れる
-                _icon_request_queue.put((path, size))
-                
-                # このラベルを「更新待ち」として登録
-                update_key = (path, size)
-                with _icon_update_lock:
-                    if update_key not in _icon_update_registry:
-                        _icon_update_registry[update_key] = []
-                    _icon_update_registry[update_key].append(icon_label)
+                # このラベルを「更新待ち」として登録し、取得を依頼する
+                request_icon(path, size, icon_label)
             
             # --- ▲▲▲ アイコン処理ここまで ▲▲▲ ---
 
@@ -2001,16 +2377,33 @@ class LinkPopup(tk.Toplevel):
             row.grid_columnconfigure(0, minsize=self.ICON_COLUMN_WIDTH)
             row.grid_columnconfigure(1, weight=1)
 
-            def on_enter(e, lbl=text_label): lbl.config(font=font_underline)
-            def on_leave(e, lbl=text_label): lbl.config(font=font_link)
+            def on_enter(e, lbl=text_label, p=path):
+                lbl.config(font=font_underline)
+                self._schedule_prefetch(p)
+            def on_leave(e, lbl=text_label):
+                lbl.config(font=font_link)
+                self._cancel_prefetch()
             def on_click(e, p=path): self.open_and_close(p)
             
             for w in [row, icon_label, text_label]:
                 w.bind("<Enter>", on_enter)
                 w.bind("<Leave>", on_leave)
                 w.bind("<Button-1>", on_click)
-                
+
+        if group_name is not None and group_name != self.FREQUENT_GROUP_NAME and len(links) > 1:
+            separator = tk.Frame(frame, height=1, bg=self.settings.get('border_color', DEFAULT_SETTINGS['border_color']))
+            separator.grid(row=len(links), column=0, sticky="ew", pady=(2, 0))
+            open_all = tk.Label(frame, text=f"すべて開く ({len(links)})", anchor="w", bg=self.settings['bg'],
+                                font=font_link, fg=self.settings['font_color'])
+            open_all.grid(row=len(links) + 1, column=0, sticky="ew",
+                          padx=(self.ICON_COLUMN_WIDTH + self.TEXT_LEFT_PADDING, 0))
+            open_all.bind("<Enter>", lambda e: open_all.config(font=font_underline))
+            open_all.bind("<Leave>", lambda e: open_all.config(font=font_link))
+            open_all.bind("<Button-1>", lambda e: self.open_group(group_name, links))
+
         popup.bind("<Leave>", lambda e: self._on_link_popup_leave())
+        popup.row_count = len(links)  # 保持するキャッシュの量の目安
+        popup.source_links = links     # 外部での変更を検知したときの比較用
         popup.withdraw() 
         return popup
 
@@ -2039,7 +2432,7 @@ class LinkPopup(tk.Toplevel):
         else:
             # なければ、新しいメソッドを呼び出して新規作成
             # print(f"Cache MISS for '{group_name}'. Creating new popup.") # デバッグ用
-            popup = self.create_link_popup_content(links)
+            popup = self.create_link_popup_content(links, group_name)
             # 作成したウィジェットをキャッシュに保存
             self._popup_cache[group_name] = popup
 
@@ -2084,22 +2477,276 @@ class LinkPopup(tk.Toplevel):
             self.draw_list()
         self._leave_after_id = None
 
+    def _schedule_prefetch(self, path):
+        """マウスが行の上でしばらく止まったら、クリックに備えてリンク先を先読みする"""
+        self._cancel_prefetch()
+        self._prefetch_after_id = self.after(self.HOVER_PREFETCH_MS, lambda: launcher.prefetch(path))
+
+    def _cancel_prefetch(self):
+        if self._prefetch_after_id:
+            self.after_cancel(self._prefetch_after_id)
+            self._prefetch_after_id = None
+
     def open_and_close(self, path):
-        open_link(path)
-        
-        # 表示されているサブポップアップとメインポップアップの両方を非表示にする
+        open_link(path, self.profile_name, on_launched=self._forget_frequent_popup)
+        self._hide_all()
+
+    def open_group(self, group_name, links):
+        """
+        グループのリンクをすべて開く。起動は別スレッドで間隔をあけて並列に行い、
+        開けなかったリンクは最後にまとめて1回だけ表示する。
+        """
+        paths = [link.get('path', '') for link in links]
+        profile_name = self.profile_name
+        interval = self.settings.get('batch_launch_interval_ms', DEFAULT_SETTINGS['batch_launch_interval_ms']) / 1000
+        max_concurrent = self.settings.get('batch_launch_max_concurrent', DEFAULT_SETTINGS['batch_launch_max_concurrent'])
+        self._hide_all()
+
+        def run():
+            result = launch_batch(paths, interval, max_concurrent)
+            call_on_tk(self._on_group_opened, group_name, profile_name, result)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_group_opened(self, group_name, profile_name, result):
+        for path in result.launched:
+            record_launch(profile_name, path)
+        if result.launched:
+            self._forget_frequent_popup()
+        logging.info(f"Opened group '{group_name}': {len(result.launched)} launched, {len(result.failed)} failed.")
+        if not result.failed:
+            return
+        for path, error in result.failed:
+            logging.error(f"Failed to open link '{path}': {error}")
+        shown = [path for path, _ in result.failed[:10]]
+        if len(result.failed) > len(shown):
+            shown.append(f"ほか {len(result.failed) - len(shown)} 件")
+        messagebox.showerror("リンクエラー", f"「{group_name}」の {len(result.failed)} 件のリンクを開けませんでした:\n"
+                             + "\n".join(shown))
+
+    def _hide_all(self):
+        """表示されているサブポップアップとメインポップアップの両方を非表示にする"""
         if self.link_popup and self.link_popup.winfo_exists():
             self.link_popup.withdraw()
             self.link_popup = None
-            
         self.withdraw()
 
+    def _forget_frequent_popup(self):
+        # 「よく使う」の内容が変わるので、そのサブポップアップは次回作り直す
+        # (クリックされたウィジェット自身の可能性があるので、イベント処理の後で破棄する)
+        cached = self._popup_cache.pop(self.FREQUENT_GROUP_NAME, None)
+        if cached and cached.winfo_exists():
+            self.after_idle(cached.destroy)
+
     def _point_in_window(self, x, y, win):
         try:
             return (win.winfo_rootx() <= x < win.winfo_rootx() + win.winfo_width() and
                     win.winfo_rooty() <= y < win.winfo_rooty() + win.winfo_height())
         except tk.TclError: return False
 
+class QuickSearchWindow(tk.Toplevel):
+    """
+    キーボードで検索してリンクを起動するクイック検索ウィンドウ。
+    ↑↓で選択、Enterで起動、Tabで「現在のプロファイル」と「全プロファイル」を切り替え、Escで閉じる。
+    """
+    MAX_RESULTS = 10
+    SELECTED_BG = "#eaf6ff"
+    FRECENCY_WEIGHT = 10  # よく使うリンクほど上位に来るように、log(1+スコア) にこの重みを掛けて加点する
+
+    def __init__(self, master, settings, profile_name):
+        super().__init__(master)
+        if 'app_icon' in globals() and app_icon:
+            self.iconphoto(True, app_icon)
+        self.settings = settings.copy()
+        self.profile_name = profile_name
+        self.all_profiles = False
+        # {プロファイル名 (全プロファイルは None): (FuzzyIndex, エントリ)}。直近のプロファイルの分は切り替え後も残す
+        self._indexes = OrderedDict()
+        self.results = []    # 表示中の結果(エントリのリスト)
+        self.selected = 0
+        self._frecency = {}  # {プロファイル名: {パス: スコア}} (表示のたびに読み直す)
+
+        self.overrideredirect(True)
+        self.withdraw()
+        self.attributes("-topmost", True)
+        self.bind("<FocusOut>", lambda e: self.hide())
+
+        border_color = self.settings.get('border_color', DEFAULT_SETTINGS['border_color'])
+        bg = self.settings.get('bg', DEFAULT_SETTINGS['bg'])
+        self.config(bg=border_color)
+        frame = tk.Frame(self, bg=bg)
+        frame.pack(expand=True, fill="both", padx=1, pady=1)
+
+        font_main = (self.settings['font'], self.settings['size'])
+        font_detail = (self.settings['font'], max(8, self.settings['size'] - 2))
+        font_metrics = tkfont.Font(font=font_main).metrics()
+        self.icon_size = max(12, min(round_to_step(font_metrics.get('ascent', 16), step=4), 32))
+
+        self.query_var = tk.StringVar()
+        self.entry = tk.Entry(frame, textvariable=self.query_var, font=font_main, relief=tk.FLAT, width=48)
+        self.entry.pack(fill="x", padx=6, pady=6)
+        self.scope_label = tk.Label(frame, anchor="e", bg=bg, fg="#888888", font=font_detail)
+        self.scope_label.pack(fill="x", padx=6)
+
+        # 結果の行はあらかじめ作っておき、入力のたびに中身だけを差し替える
+        self.rows = []
+        for i in range(self.MAX_RESULTS):
+            row = tk.Frame(frame, bg=bg)
+            icon_label = tk.Label(row, bg=bg)
+            icon_label.pack(side="left", padx=(6, 4))
+            name_label = tk.Label(row, anchor="w", bg=bg, font=font_main, fg=self.settings['font_color'])
+            name_label.pack(side="left")
+            detail_label = tk.Label(row, anchor="w", bg=bg, font=font_detail, fg="#888888")
+            detail_label.pack(side="left", padx=(10, 6), fill="x", expand=True)
+            for w in (row, icon_label, name_label, detail_label):
+                w.bind("<Button-1>", lambda e, idx=i: self.open_selected(idx))
+            self.rows.append((row, icon_label, name_label, detail_label))
+
+        self.query_var.trace_add("write", lambda *args: self.update_results())
+        self.entry.bind("<Down>", lambda e: self.move_selection(1))
+        self.entry.bind("<Up>", lambda e: self.move_selection(-1))
+        self.entry.bind("<Return>", lambda e: self.open_selected())
+        self.entry.bind("<Escape>", lambda e: self.hide())
+        self.entry.bind("<Tab>", self.toggle_scope)
+        self._update_scope_label()
+
+    # --- インデックス ---
+    def prepare(self):
+        """現在のプロファイルのインデックスを事前に作成しておく"""
+        self._get_index(False)
+
+    def set_profile(self, profile_name):
+        """プロファイルを切り替える。以前に作ったインデックスが残っていればそのまま使う"""
+        self.profile_name = profile_name
+        self._update_scope_label()
+
+    def invalidate(self, profile_name=None):
+        """リンクが変わったときに呼ぶ。インデックスは次回の検索時に作り直す"""
+        if profile_name is not None:
+            self.set_profile(profile_name)
+        self._indexes.clear()
+
+    def _get_index(self, all_profiles):
+        scope = None if all_profiles else self.profile_name
+        if scope in self._indexes:
+            self._indexes.move_to_end(scope)
+        else:
+            index = FuzzyIndex()
+            entries = {}
+            profiles = get_all_profile_names() if all_profiles else [self.profile_name]
+            for profile in profiles:
+                for group in load_links_data(profile) or []:
+                    for link in group.get('links', []):
+                        path = link.get('path', '')
+                        if not path:
+                            continue
+                        key = len(entries)
+                        entries[key] = {'profile': profile, 'group': group['group'],
+                                        'name': link.get('name', ''), 'path': path}
+                        index.add(key, entries[key]['name'], group['group'], path)
+            self._indexes[scope] = (index, entries)
+            while len(self._indexes) > LinkPopup.PROFILE_CACHE_SIZE + 1:
+                self._indexes.popitem(last=False)
+        return self._indexes[scope]
+
+    # --- 表示 ---
+    def _boost(self, entries):
+        def boost(key):
+            entry = entries[key]
+            scores = self._frecency.get(entry['profile'])
+            if scores is None:
+                scores = self._frecency[entry['profile']] = frecency_scores(entry['profile'])
+            return self.FRECENCY_WEIGHT * math.log1p(scores.get(entry['path'], 0))
+        return boost
+
+    def show(self):
+        self._frecency.clear()
+        self.query_var.set("")
+        self.update_idletasks()
+        wa_left, wa_top, wa_right, wa_bottom = get_work_area()
+        win_w = self.winfo_reqwidth()
+        x = wa_left + (wa_right - wa_left - win_w) // 2
+        y = wa_top + (wa_bottom - wa_top) // 4
+        self.geometry(f"+{x}+{y}")
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+        self.entry.focus_set()
+
+    def hide(self):
+        self.withdraw()
+
+    def toggle_scope(self, event=None):
+        self.all_profiles = not self.all_profiles
+        self._update_scope_label()
+        self.update_results()
+        return "break"
+
+    def _update_scope_label(self):
+        scope = "全プロファイル" if self.all_profiles else self.profile_name
+        self.scope_label.config(text=f"{scope}  (Tabで切り替え)")
+
+    def update_results(self):
+        index, entries = self._get_index(self.all_profiles)
+        keys = index.search(self.query_var.get(), limit=self.MAX_RESULTS, boost=self._boost(entries))
+        self.results = [entries[k] for k in keys]
+        self.selected = 0
+        for i, (row, icon_label, name_label, detail_label) in enumerate(self.rows):
+            if i < len(self.results):
+                self._show_row(i, self.results[i])
+                row.pack(fill="x")
+            else:
+                row.pack_forget()
+
+    def _show_row(self, i, entry):
+        row, icon_label, name_label, detail_label = self.rows[i]
+        bg = self.SELECTED_BG if i == self.selected else self.settings['bg']
+        for w in (row, icon_label, name_label, detail_label):
+            w.config(bg=bg)
+        name_label.config(text=entry['name'])
+        detail = f"{entry['group']} — {entry['path']}"
+        if self.all_profiles:
+            detail = f"[{entry['profile']}] {detail}"
+        detail_label.config(text=detail)
+
+        # アイコンはキャッシュにあればすぐ表示し、なければ取得を依頼する
+        path, size = entry['path'], self.icon_size
+        icon = get_cached_icon(path, size)
+        self._forget_icon_request(icon_label)
+        if icon is None:
+            icon = get_placeholder_icon(size)
+            request_icon(path, size, icon_label)
+            icon_label.pending_icon_key = (path, size)
+        icon_label.config(image=icon)
+        icon_label.image = icon
+
+    @staticmethod
+    def _forget_icon_request(icon_label):
+        """行を別の結果に使い回す前に、前の結果のアイコン待ち登録を外す"""
+        key = getattr(icon_label, 'pending_icon_key', None)
+        if key is None:
+            return
+        icon_label.pending_icon_key = None
+        _icon_waiters.remove(key, icon_label)
+
+    def move_selection(self, delta):
+        if not self.results:
+            return "break"
+        old = self.selected
+        self.selected = (self.selected + delta) % len(self.results)
+        self._show_row(old, self.results[old])
+        self._show_row(self.selected, self.results[self.selected])
+        return "break"
+
+    def open_selected(self, idx=None):
+        if idx is not None:
+            self.selected = idx
+        if not (0 <= self.selected < len(self.results)):
+            return "break"
+        entry = self.results[self.selected]
+        self.hide()
+        open_link(entry['path'], entry['profile'])
+        return "break"
+
 class ProfileManagerDialog(tk.Toplevel): # LinksEditDialogと同じくToplevelを継承
     def __init__(self, parent, current_profile):
         super().__init__(parent)
@@ -2239,7 +2886,11 @@ class ProfileManagerDialog(tk.Toplevel): # LinksEditDialogと同じくToplevel
         old_path = get_profile_path(selected)
         new_path = os.path.join(PROFILES_DIR, new_name)
         try:
+            # 保留中の保存が古いフォルダに書き込まれないよう、先に書き出しておく
+            flush_pending_writes()
+            close_connections(old_path)  # links.db を開いたままだとWindowsでは名前を変更できない
             os.rename(old_path, new_path)
+            rename_profile_usage(selected, new_name)
             if self.current_profile == selected:
                 self.current_profile = new_name
                 # ここでメインのsettingsを直接変更するのではなく、結果を返す
@@ -2260,8 +2911,11 @@ class ProfileManagerDialog(tk.Toplevel): # LinksEditDialogと同じくToplevel
             
         if messagebox.askyesno("確認", f"プロファイル '{selected}' を削除しますか？\nこの操作は元に戻せません。", parent=self):
             try:
+                flush_pending_writes()
                 path_to_delete = get_profile_path(selected)
+                close_connections(path_to_delete)
                 shutil.rmtree(path_to_delete)
+                forget_profile_usage(selected)
                 if self.current_profile == selected:
                     self.current_profile = DEFAULT_PROFILE_NAME
                     if self.result is None: self.result = {}
@@ -2297,7 +2951,7 @@ def main():
         except (AttributeError, OSError):
             logging.warning("Failed to set DPI awareness.")
 
-    global root, popup, settings, app_icon, is_dialog_open
+    global root, popup, quick_search, settings, app_icon, is_dialog_open
 
     # --- アプリケーション起動時の処理 ---
     # 1. 設定ファイルを読み込む
@@ -2341,7 +2995,9 @@ def main():
 
         # --- 2. メニュー項目のアクション定義 ---
         def show_popup_action(icon=None): root.after(0, popup.show)
+        def quick_search_action(icon=None): root.after(0, quick_search.show)
         def edit_links_action(icon=None): root.after(0, open_links_editor)
+        def import_action(icon=None): root.after(0, open_bookmark_import)
         def profile_action(icon=None): root.after(0, open_profile_manager)
         def settings_action(icon=None): root.after(0, open_settings_dialog)
         def exit_action(icon, item):
@@ -2351,7 +3007,9 @@ def main():
         # --- 3. メニューとアイコンの作成・実行 ---
         try:
             menu = Menu(item('リンクを表示', show_popup_action, default=True), 
+                        item('クイック検索', quick_search_action),
                         item('リンク編集', edit_links_action),
+                        item('ブックマーク取り込み', import_action),
                         item('プロファイル管理', profile_action),
                         item('設定', settings_action), 
                         Menu.SEPARATOR, 
@@ -2372,12 +3030,43 @@ def main():
             is_dialog_open = True
             
             links_data = load_links_data(current_profile_name)
-            dialog = LinksEditDialog(root, links_data, settings)
+            dialog = LinksEditDialog(root, links_data, settings, current_profile_name)
             if dialog.result is not None:
                 save_links_data(dialog.result, current_profile_name)
                 if popup:
                     popup.clear_cache()
                     popup.reload_profile(current_profile_name)
+                if quick_search:
+                    quick_search.invalidate()
+        finally:
+            is_dialog_open = False
+
+    def open_bookmark_import():
+        global is_dialog_open
+        if is_dialog_open: return
+        try:
+            is_dialog_open = True
+            found = find_bookmark_files()
+            source = filedialog.askopenfilename(
+                parent=root, title="取り込むブックマークファイルを選択",
+                initialdir=os.path.dirname(found[0][1]) if found else None,
+                filetypes=[("ブックマーク", "Bookmarks places.sqlite"), ("すべてのファイル", "*")])
+            if not source: return
+            try:
+                result = import_bookmarks(current_profile_name, source)
+            except BookmarkImportError as e:
+                messagebox.showerror("エラー", f"ブックマークを読み込めませんでした:\n{e}", parent=root)
+                return
+            if result.added:
+                if popup:
+                    popup.refresh_changed_groups()
+                if quick_search:
+                    quick_search.invalidate()
+                # ファビコンは表示中のアイコンの取得を妨げないよう、空いているときに取得する
+                queue_background_icons(result.urls, getattr(LinkPopup, 'current_icon_size', 16))
+            messagebox.showinfo("ブックマーク取り込み",
+                                f"{result.added} 件を {len(result.groups)} グループに追加しました。\n"
+                                f"（重複 {result.duplicates} 件、対象外 {result.skipped} 件）", parent=root)
         finally:
             is_dialog_open = False
 
@@ -2388,14 +3077,26 @@ def main():
             is_dialog_open = True
             dialog = SettingsDialog(root, settings)
             if dialog.result is not None:
-                settings.clear()
-                settings.update(dialog.result)
-                if popup: 
-                    popup.clear_cache()
-                    popup.apply_settings(settings)
+                apply_settings_change(dialog.result)
         finally:
             is_dialog_open = False
 
+    def apply_settings_change(new_settings):
+        global quick_search
+        favicon_mode_changed = new_settings.get('use_online_favicon', True) != settings.get('use_online_favicon', True)
+        settings.clear()
+        settings.update(new_settings)
+        if favicon_mode_changed:
+            # ファビコンの取得方法が変わったので、取得済みのものは使わない
+            invalidate_icons(all_web=True)
+        if popup: 
+            popup.clear_cache()
+            popup.apply_settings(settings)
+        if quick_search:
+            # フォントや色が変わるので作り直す
+            quick_search.destroy()
+            quick_search = QuickSearchWindow(root, settings, current_profile_name)
+
     def open_profile_manager():
         nonlocal current_profile_name
         global is_dialog_open
@@ -2418,20 +3119,108 @@ def main():
                     new_profile = DEFAULT_PROFILE_NAME
                 
                 if new_profile != current_profile_name:
-                    current_profile_name = new_profile
-                    settings['current_profile'] = current_profile_name
-                    save_settings(settings)
-                    reload_application_state(current_profile_name)
+                    switch_profile(new_profile)
         finally:
             is_dialog_open = False  
 
+    def switch_profile(new_profile, save=True):
+        nonlocal current_profile_name
+        current_profile_name = new_profile
+        settings['current_profile'] = current_profile_name
+        if save:
+            save_settings(settings)
+        reload_application_state(current_profile_name)
+
+    def handle_remote_command(message):
+        """
+        2つ目のプロセスからIPCで届いたコマンドを処理する（IPCスレッドから呼ばれる）。
+        プロファイルやリンクはTkスレッドのものなので、コマンドはそのままTkスレッドに渡して実行し、その結果を応答にする。
+        """
+        try:
+            return call_on_tk(run_remote_command, message).result(timeout=REMOTE_COMMAND_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            # Tkスレッドが忙しくても、コマンドは予約済みなので後で実行される
+            logging.warning(f"Remote command '{message.get('command')}' is still queued on the UI thread.")
+            return {'ok': True}
+
+    def run_remote_command(message):
+        """IPCで届いたコマンドを実行し、応答を返す（Tkスレッドで呼ぶ）"""
+        command = message.get('command')
+        if command == 'show':
+            popup.show()
+        elif command == 'quick_search':
+            quick_search.show()
+        elif command == 'reload':
+            reload_application_state(current_profile_name)
+        elif command == 'profile':
+            new_profile = message.get('profile', '')
+            if new_profile not in get_all_profile_names():
+                return {'ok': False, 'error': f"プロファイルが見つかりません: {new_profile}"}
+            if new_profile != current_profile_name:
+                switch_profile(new_profile)
+        elif command == 'open':
+            target = message.get('target', '')
+            profile_name = message.get('profile') or current_profile_name
+            if profile_name not in get_all_profile_names():
+                return {'ok': False, 'error': f"プロファイルが見つかりません: {profile_name}"}
+            if profile_name == current_profile_name:
+                group_items = popup.link_items.items()
+            else:
+                group_items = ((g['group'], g.get('links', [])) for g in load_links_data(profile_name) or [])
+            path = find_link_path(group_items, target)
+            if path is None:
+                return {'ok': False, 'error': f"リンクが見つかりません: {target}"}
+            open_link(path, profile_name)
+        elif command == 'stats':
+            return {'ok': True, 'launch_latency': launcher.stats.snapshot(), 'icon_waiters': _icon_waiters.metrics(),
+                    'icon_pixels': dict(_icon_pixels.metrics(), photo_images=len(_icon_cache))}
+        return {'ok': True}
+
+    preloaded_profiles = set()  # アイコンの事前キャッシュを済ませたプロファイル
+
+    def watched_files(profile_name):
+        profile_dir = get_profile_path(profile_name)
+        return [SETTINGS_FILE, os.path.join(profile_dir, "links.json"), os.path.join(profile_dir, LINKS_DB_NAME)]
+
+    def apply_external_changes(paths):
+        """外部で変更されたファイルだけを読み直す（Tkスレッドで呼ぶ）"""
+        if SETTINGS_FILE in paths:
+            # 外部の変更をメモリに反映してから、保存せずに切り替える（古い設定で上書きしないように）
+            new_settings, new_profile = merge_external_settings(settings, load_settings(), get_all_profile_names())
+            if new_settings != settings:
+                apply_settings_change(new_settings)
+            if new_profile:
+                switch_profile(new_profile, save=False)
+            logging.info("Reloaded settings changed outside the app.")
+        if paths - {SETTINGS_FILE} and popup:
+            changed = popup.refresh_changed_groups()
+            if quick_search:
+                quick_search.invalidate()
+            logging.info(f"Reloaded links changed outside the app (groups: {sorted(changed)}).")
+
     def reload_application_state(profile_name):
-        # LinkPopupに、新しいプロファイル名で再読み込みさせる
-        if popup:
-            popup.reload_profile(profile_name)
-        
-        # 事前キャッシュを再実行
-        threading.Thread(target=lambda: preload_all_link_icons(profile_name), daemon=True).start()
+        switching = popup is not None and popup.profile_name != profile_name
+        if switching:
+            # 最近使ったプロファイルなら、残しておいたサブポップアップと検索インデックスをそのまま使う
+            popup.switch_profile(profile_name)
+            if quick_search:
+                quick_search.set_profile(profile_name)
+        else:
+            # 同じプロファイルの再読み込みは、リンクが変わった可能性があるのですべて作り直す
+            invalidate_icons(profile=profile_name)
+            if popup:
+                popup.clear_warm_profiles()
+                popup.reload_profile(profile_name)
+            if quick_search:
+                quick_search.invalidate(profile_name)
+            preloaded_profiles.discard(profile_name)
+        
+        file_watcher.watch(watched_files(profile_name))
+        
+        # 事前キャッシュを再実行（アイコンはプロファイルをまたいで共有しているので、一度済ませれば不要）
+        if profile_name not in preloaded_profiles:
+            preloaded_profiles.add(profile_name)
+            threading.Thread(target=lambda: preload_all_link_icons(profile_name), daemon=True).start()
         print(f"Switched to profile: {profile_name}")
 
 
@@ -2456,26 +3245,30 @@ def main():
             standard_sizes = {8, 12, 16, 24, 32} # 一般的なサイズ
             preload_sizes = sorted(list({current_size} | standard_sizes))
 
-            for group in links_data:
-                for link in group.get('links', []):
-                    path = link.get('path', '')
-                    if not path: continue
-                    
-                    for size in preload_sizes:
-                        # ★ここでのアイコン取得はキャッシュ目的（UIには影響しない）
-                        if path.startswith(('http://', 'https://')):
-                            try:
-                                get_web_icon(path, size=size)
-                            except Exception: # ここでのエラーはログ不要（キャッシュ試行なので）
-                                pass
-                        else:
-                            try:
-                                get_file_icon(path, size=size)
-                            except Exception:
-                                pass
+            # 3. よく使うリンクから順に取得する
+            paths = [link.get('path', '') for group in links_data for link in group.get('links', [])]
+            scores = frecency_scores(profile_name)
+            paths.sort(key=lambda p: scores.get(p, 0), reverse=True)
+
+            for path in paths:
+                if not path: continue
+                
+                for size in preload_sizes:
+                    # ★ここでのアイコン取得はキャッシュ目的（UIには影響しない）
+                    if path.startswith(('http://', 'https://')):
+                        try:
+                            get_web_icon_image(path, size=size)
+                        except Exception: # ここでのエラーはログ不要（キャッシュ試行なので）
+                            pass
+                    else:
+                        try:
+                            get_file_icon_image(path, size=size)
+                        except Exception:
+                            pass
         except Exception as e:
             logging.warning(f"[preload] Preload thread failed: {e}")
 
+    preloaded_profiles.add(current_profile_name)
     threading.Thread(target=lambda: preload_all_link_icons(current_profile_name), daemon=True).start()
 
     threading.Thread(target=icon_worker, daemon=True).start()
@@ -2508,35 +3301,35 @@ def main():
         
     # 3. アイコンを読み込んだ後で、それを利用するウィジェットを作成する
     popup = LinkPopup(root, settings, current_profile_name)
+    quick_search = QuickSearchWindow(root, settings, current_profile_name)
+    # クイック検索のインデックスはアイドル時に事前に作っておく
+    root.after_idle(quick_search.prepare)
     
-    def check_icon_results():
-        try:
-            while not _icon_result_queue.empty():
-                path, size, icon = _icon_result_queue.get_nowait()
-                
-                # このアイコンを待っているウィジェットリストを取得して更新
-                key = (path, size)
-                with _icon_update_lock:
-                    if key in _icon_update_registry:
-                        widgets_to_update = _icon_update_registry[key]
-                        for widget in widgets_to_update:
-                            if widget.winfo_exists():
-                                widget.config(image=icon)
-                                # PhotoImageがガベージコレクションされないように参照を保持
-                                widget.image = icon 
-                        # 更新が終わったらリストをクリア
-                        del _icon_update_registry[key]
-        finally:
-            # 100ms後に再度この関数を呼び出す
-            root.after(100, check_icon_results)
-
-    # mainloopの前に開始
-    root.after(100, check_icon_results)
+    # アイコンの取得結果は、取得を待っているウィジェットがあるあいだだけTkスレッドで反映する
+    start_icon_flush(root)
+    # ほかのスレッド(リンクの起動など)の処理の完了は、Tkスレッドでキューから取り出して処理する
+    start_tk_calls(root)
+
+    # 2つ目のプロセスからのコマンドを待ち受ける
+    instance_server = InstanceServer(handle_remote_command)
+    instance_server.start()
+    # 設定ファイル・リンクファイルの外部での変更を監視する（監視スレッドはキューに入れるだけで、Tkスレッドで処理）
+    file_watcher = FileWatcher(lambda paths: call_on_tk(apply_external_changes, paths), ignore=is_own_write)
+    file_watcher.watch(watched_files(current_profile_name))
+    file_watcher.start()
+    # 初回起動時に引数が指定されていれば、それも同じ経路で処理する
+    if sys.argv[1:]:
+        root.after(0, lambda: run_remote_command(parse_command(sys.argv[1:])))
 
     # 4. メインループを開始
     try:
         root.mainloop()
     finally:
+        instance_server.stop()
+        file_watcher.stop()
+        launcher.shutdown()
+        # 保留中の設定・リンクの保存を書き出す
+        flush_pending_writes()
         # --- すべてのFileHandlerを明示的にclose & remove ---
         logger = logging.getLogger()
         handlers = logger.handlers[:]
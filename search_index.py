@@ -0,0 +1,306 @@
+"""
+search_index.py - リンク検索用のインクリメンタルなインデックス。
+
+文字列を正規化(NFKC+小文字化)して保持し、転置リストで候補を絞る。
+入力のたびに全件を走査せず、文字が追加された場合は前回の検索結果を絞り込むだけで済ませる。
+
+SearchIndex: 部分一致（編集画面の検索）
+FuzzyIndex:  あいまい一致とスコア順の並べ替え（クイック検索）
+"""
+
+import time
+import heapq
+import unicodedata
+from itertools import islice
+
+NGRAM_MAX = 3
+FIELD_SEPARATOR = "\x00"  # フィールドをまたいで一致しないように、連結時に挟む文字
+INTERSECT_THRESHOLD = 256  # 候補がこの件数以下になれば、積集合を取らずに直接照合する
+VERIFY_CHUNK = 256         # 期限を指定した検索で、この件数の候補を照合するごとに期限を確認する
+
+def normalize_text(text):
+    """検索用に文字列を正規化する（全角/半角の違いと大文字/小文字の違いを無視する）"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+def _ngrams(texts):
+    return {text[i:i + n] for text in texts
+            for n in range(1, NGRAM_MAX + 1) for i in range(len(text) - n + 1)}
+
+class SearchIndex:
+    """
+    キー(リンクIDなど)ごとに複数のフィールド(名前・パスなど)を登録し、
+    いずれかのフィールドに検索語を含むキーの集合を返す。
+    """
+
+    def __init__(self):
+        self._texts = {}      # {キー: 正規化済みフィールドを FIELD_SEPARATOR で連結した文字列}
+        self._postings = {}   # {n-gram: {キー, ...}}
+        self._last_query = None
+        self._last_result = None
+        self._pending = None  # 期限で中断した照合 (検索語, 候補, 残りの候補, 一致しなかったキー)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, key):
+        return key in self._texts
+
+    def add(self, key, *fields):
+        if key in self._texts:
+            self.remove(key)
+        texts = [normalize_text(f) for f in fields]
+        self._texts[key] = FIELD_SEPARATOR.join(texts)
+        postings = self._postings
+        for gram in _ngrams(texts):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {key}
+            else:
+                posting.add(key)
+        self._last_query = self._pending = None
+
+    def update(self, key, *fields):
+        self.add(key, *fields)
+
+    def remove(self, key):
+        joined = self._texts.pop(key, None)
+        if joined is None:
+            return
+        for gram in _ngrams(joined.split(FIELD_SEPARATOR)):
+            posting = self._postings[gram]
+            posting.discard(key)
+            if not posting:
+                del self._postings[gram]
+        self._last_query = self._pending = None
+
+    def search(self, query, deadline=None):
+        """
+        query を含むキーの集合を返す。空の検索語ならすべてのキーを返す。
+        返した集合はインデックス内部のものを共有することがあるので、呼び出し側で変更しないこと。
+        deadline(time.perf_counter の値)を過ぎたら、候補の照合を途中でやめて None を返す。
+        同じ検索語で呼び直すと続きから照合する（一致するリンクが多い検索で、入力の処理を止めないように）。
+        """
+        q = normalize_text(query).replace(FIELD_SEPARATOR, "")
+        if not q:
+            return set(self._texts)
+        if q == self._last_query:
+            return self._last_result
+        if self._pending is not None and self._pending[0] == q:
+            return self._verify(q, deadline)
+
+        if len(q) <= NGRAM_MAX:
+            # n-gram そのものが検索語なので、転置リストがそのまま答えになる
+            self._pending = None
+            self._last_query = q
+            self._last_result = self._postings.get(q, frozenset())
+            return self._last_result
+
+        # 3-gramの転置リストを件数の少ない順に積集合を取り、候補を十分に絞り込む
+        postings = [self._postings.get(q[i:i + NGRAM_MAX]) for i in range(len(q) - NGRAM_MAX + 1)]
+        if not all(postings):
+            candidates = frozenset()
+        else:
+            postings.sort(key=len)
+            candidates, rest = postings[0], postings[1:]
+            # 前回の検索語を含む入力（文字の追加）なら、前回の結果の方が少なければそれを絞り込む
+            if (self._last_query is not None and self._last_query in q and
+                    len(self._last_result) < len(candidates)):
+                candidates, rest = self._last_result, postings
+            for posting in rest:
+                if len(candidates) <= INTERSECT_THRESHOLD or len(posting) == len(self._texts):
+                    break  # 十分に絞り込めた（または、残りはすべてのキーが持つ n-gram で絞り込めない）
+                narrowed = candidates & posting
+                if len(narrowed) == len(candidates):
+                    break  # 絞り込めない(どの候補も持つ n-gram ばかりの)場合は、残りの積集合も取らずに照合する
+                candidates = narrowed
+        self._pending = (q, candidates, iter(list(candidates)), [])
+        return self._verify(q, deadline)
+
+    def _verify(self, q, deadline):
+        """
+        中断した照合の続きを行う。終われば結果を、期限を過ぎたら None を返す。
+        一致しなかったキーを集めて最後に候補から除く（一致するキーが多い場合に、大きな集合を1件ずつ作らない）。
+        """
+        _, candidates, remaining, rejected = self._pending
+        texts = self._texts
+        while True:
+            chunk = list(islice(remaining, VERIFY_CHUNK))
+            rejected.extend([key for key in chunk if q not in texts[key]])
+            if len(chunk) < VERIFY_CHUNK:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+        result = candidates.difference(rejected) if rejected else candidates
+        self._pending = None
+        self._last_query = q
+        self._last_result = result
+        return result
+
+class SearchIndexBuilder:
+    """
+    SearchIndex を少しずつ作る（Tk の after で分割して呼ぶ）。
+    1件ずつ集合に入れると、ほとんどのキーが持つ n-gram の集合が同じ件数で一斉に拡張され、
+    その1件の追加だけが数十ms かかる。作成中はキーをリストに溜め、最後に n-gram ごとに集合にする。
+    """
+
+    def __init__(self):
+        self._texts = {}
+        self._lists = {}   # {n-gram: [キー, ...]}
+        self._postings = {}
+        self._grams = None  # 集合にしていない n-gram（finish の途中）
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, key, *fields):
+        """キーを追加する。同じキーを2回追加しないこと（作成中の変更は、できあがった SearchIndex に反映する）"""
+        texts = [normalize_text(f) for f in fields]
+        self._texts[key] = FIELD_SEPARATOR.join(texts)
+        lists = self._lists
+        for gram in _ngrams(texts):
+            keys = lists.get(gram)
+            if keys is None:
+                lists[gram] = [key]
+            else:
+                keys.append(key)
+
+    def finish(self, deadline=None):
+        """
+        溜めたキーを集合にして SearchIndex を返す。
+        deadline(time.perf_counter の値)を過ぎたら途中でやめて None を返す。続きは次の呼び出しで行う
+        """
+        if self._grams is None:
+            self._grams = list(self._lists)
+        grams, lists, postings = self._grams, self._lists, self._postings
+        while grams:
+            gram = grams.pop()
+            postings[gram] = set(lists.pop(gram))
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+        index = SearchIndex()
+        index._texts, index._postings = self._texts, postings
+        return index
+
+# --- あいまい検索（クイック検索用） ---
+WORD_SEPARATORS = frozenset(" /\\-_.:?&=#()[]")
+
+def fuzzy_score(query, text):
+    """
+    query の文字が text に順番通りに含まれていればスコアを、含まれていなければ None を返す。
+    連続した一致、単語の先頭での一致、部分文字列・前方一致を高く評価する。
+    query, text はどちらも normalize_text 済みであること。
+    """
+    pos = text.find(query)
+    if pos != -1:
+        # 部分文字列として含まれる場合は、位置が前ほど高い
+        score = 100.0 + len(query) * 4 - min(pos, 50) * 0.5
+        if pos == 0:
+            score += 50
+        elif text[pos - 1] in WORD_SEPARATORS:
+            score += 25
+        return score
+
+    score = 0.0
+    prev = -1
+    for ch in query:
+        pos = text.find(ch, prev + 1)
+        if pos == -1:
+            return None
+        if pos == prev + 1:
+            score += 5          # 連続した一致
+        elif pos == 0 or text[pos - 1] in WORD_SEPARATORS:
+            score += 4          # 単語の先頭での一致
+        else:
+            score += 1
+            score -= min(pos - prev - 1, 20) * 0.2  # 間が空くほど減点
+        prev = pos
+    return score
+
+def _is_subsequence(short, long):
+    pos = -1
+    for ch in short:
+        pos = long.find(ch, pos + 1)
+        if pos == -1:
+            return False
+    return True
+
+class FuzzyIndex:
+    """
+    キーごとに「名前」と補助フィールド(グループ名・パスなど)を登録し、
+    あいまい一致のスコア順に上位のキーを返す。
+
+    文字ごとの転置リストで候補を絞り、前回の検索語の文字をすべて順番通りに含む入力
+    (1文字追加など)であれば、前回一致したキーだけを採点し直す。
+    """
+
+    EXTRA_FIELD_WEIGHT = 0.6  # 補助フィールドでの一致は名前での一致より低く評価する
+
+    def __init__(self):
+        self._fields = {}        # {キー: (正規化した名前, 補助フィールド...)}
+        self._char_postings = {}  # {文字: {キー, ...}}
+        self._last_query = None
+        self._last_matches = None  # {キー: スコア}
+
+    def __len__(self):
+        return len(self._fields)
+
+    def add(self, key, name, *extra_fields):
+        if key in self._fields:
+            self.remove(key)
+        fields = tuple(normalize_text(f) for f in (name, *extra_fields))
+        self._fields[key] = fields
+        for ch in set("".join(fields)):
+            self._char_postings.setdefault(ch, set()).add(key)
+        self._last_query = None
+
+    def remove(self, key):
+        fields = self._fields.pop(key, None)
+        if fields is None:
+            return
+        for ch in set("".join(fields)):
+            posting = self._char_postings[ch]
+            posting.discard(key)
+            if not posting:
+                del self._char_postings[ch]
+        self._last_query = None
+
+    def _score(self, q, fields):
+        best = fuzzy_score(q, fields[0])
+        for text in fields[1:]:
+            score = fuzzy_score(q, text)
+            if score is not None:
+                score *= self.EXTRA_FIELD_WEIGHT
+                if best is None or score > best:
+                    best = score
+        return best
+
+    def search(self, query, limit=10, boost=None):
+        """
+        スコアの高い順に最大 limit 件のキーを返す。
+        boost を指定すると、boost(キー) の値をスコアに加算する(利用頻度による並べ替えなど)。
+        """
+        q = normalize_text(query)
+        if not q:
+            return []
+        if self._last_query is not None and q == self._last_query:
+            matches = self._last_matches
+        else:
+            if self._last_query is not None and _is_subsequence(self._last_query, q):
+                candidates = self._last_matches.keys()
+            else:
+                postings = [self._char_postings.get(ch) for ch in set(q)]
+                if not all(postings):
+                    candidates = ()
+                else:
+                    candidates = min(postings, key=len)
+            fields = self._fields
+            matches = {}
+            for key in candidates:
+                score = self._score(q, fields[key])
+                if score is not None:
+                    matches[key] = score
+            self._last_query = q
+            self._last_matches = matches
+        if boost is None:
+            return heapq.nlargest(limit, matches, key=matches.__getitem__)
+        return heapq.nlargest(limit, matches, key=lambda k: matches[k] + boost(k))
@@ -0,0 +1,264 @@
+"""
+shortcut_parser.py - Windowsのショートカット(.lnk / .url)を読む。
+
+COM(WScript.Shell)を使わずにファイルを直接解析するので、pywin32 が不要で、1件あたりも速い。
+    .lnk: MS-SHLLINK 形式(バイナリ)
+    .url: InternetShortcut 形式(INI)
+
+フォルダ(「リンク」やスタートメニュー)をまとめて読む scan_shortcuts は、
+ファイルの読み込みを並列に行い、結果を更新日時ごとにキャッシュする。
+"""
+
+import os
+import sys
+import ntpath
+import struct
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from file_watcher import file_signature
+
+SHORTCUT_EXTENSIONS = ('.lnk', '.url')
+SCAN_WORKERS = 8
+ANSI_ENCODING = 'mbcs' if sys.platform == 'win32' else 'cp1252'  # 非Unicodeの .lnk の文字列
+
+class ShortcutError(ValueError):
+    """ショートカットファイルの形式が不正"""
+
+# --- .lnk (MS-SHLLINK) ---
+LNK_HEADER_SIZE = 0x4C
+LNK_CLSID = bytes.fromhex('0114020000000000c000000000000046')
+
+HAS_LINK_TARGET_ID_LIST = 0x0001
+HAS_LINK_INFO = 0x0002
+HAS_NAME = 0x0004
+HAS_RELATIVE_PATH = 0x0008
+HAS_WORKING_DIR = 0x0010
+HAS_ARGUMENTS = 0x0020
+HAS_ICON_LOCATION = 0x0040
+IS_UNICODE = 0x0080
+HAS_EXP_STRING = 0x0200
+
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x0001
+COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX = 0x0002
+
+ENVIRONMENT_VARIABLE_DATA_BLOCK = 0xA0000001
+
+def _c_string(data, offset, unicode=False):
+    """offset から NUL 終端の文字列を読む"""
+    if offset <= 0 or offset >= len(data):
+        return ''
+    if unicode:
+        end = offset
+        while end + 1 < len(data) and data[end:end + 2] != b'\0\0':
+            end += 2
+        return data[offset:end].decode('utf-16-le', errors='replace')
+    end = data.find(b'\0', offset)
+    if end == -1:
+        end = len(data)
+    return data[offset:end].decode(ANSI_ENCODING, errors='replace')
+
+def _fixed_string(data, unicode=False):
+    """固定長の領域から、最初の NUL までの文字列を読む"""
+    if unicode:
+        end = next((i for i in range(0, len(data) - 1, 2) if data[i:i + 2] == b'\0\0'), len(data) & ~1)
+        return data[:end].decode('utf-16-le', errors='replace')
+    return data.split(b'\0', 1)[0].decode(ANSI_ENCODING, errors='replace')
+
+def _parse_link_info(info):
+    """LinkInfo 構造体からリンク先のパスを組み立てる"""
+    if len(info) < 0x1C:
+        raise ShortcutError("LinkInfo is truncated")
+    (header_size, flags, _volume_id_offset, local_base_path_offset,
+     network_link_offset, common_path_suffix_offset) = struct.unpack_from('<6I', info, 4)
+    local_base_path_unicode = common_path_suffix_unicode = 0
+    if header_size >= 0x24 and len(info) >= 0x24:
+        local_base_path_unicode, common_path_suffix_unicode = struct.unpack_from('<2I', info, 0x1C)
+
+    if common_path_suffix_unicode:
+        suffix = _c_string(info, common_path_suffix_unicode, unicode=True)
+    else:
+        suffix = _c_string(info, common_path_suffix_offset)
+
+    if flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+        if local_base_path_unicode:
+            base = _c_string(info, local_base_path_unicode, unicode=True)
+        else:
+            base = _c_string(info, local_base_path_offset)
+        return base + suffix
+    if flags & COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX and network_link_offset:
+        net = info[network_link_offset:]
+        if len(net) < 0x14:
+            raise ShortcutError("CommonNetworkRelativeLink is truncated")
+        net_name_offset = struct.unpack_from('<I', net, 8)[0]
+        if net_name_offset > 0x14 and len(net) >= 0x1C:
+            net_name = _c_string(net, struct.unpack_from('<I', net, 0x14)[0], unicode=True)
+        else:
+            net_name = _c_string(net, net_name_offset)
+        return ntpath.join(net_name, suffix) if suffix else net_name
+    return ''
+
+def parse_lnk_bytes(data):
+    """
+    .lnk の内容を解析して辞書で返す。
+    {'target', 'arguments', 'working_dir', 'icon_location', 'icon_index', 'description', 'relative_path'}
+    """
+    if len(data) < LNK_HEADER_SIZE or struct.unpack_from('<I', data, 0)[0] != LNK_HEADER_SIZE \
+            or data[4:20] != LNK_CLSID:
+        raise ShortcutError("not a shell link")
+    flags = struct.unpack_from('<I', data, 20)[0]
+    icon_index = struct.unpack_from('<i', data, 56)[0]
+    pos = LNK_HEADER_SIZE
+
+    if flags & HAS_LINK_TARGET_ID_LIST:
+        pos += 2 + struct.unpack_from('<H', data, pos)[0]
+
+    target = ''
+    if flags & HAS_LINK_INFO:
+        info_size = struct.unpack_from('<I', data, pos)[0]
+        target = _parse_link_info(data[pos:pos + info_size])
+        pos += info_size
+
+    # StringData: 決まった順に、あるものだけが並ぶ (文字数 2バイト + 文字列)
+    strings = {}
+    unicode = bool(flags & IS_UNICODE)
+    for flag, key in ((HAS_NAME, 'description'), (HAS_RELATIVE_PATH, 'relative_path'),
+                      (HAS_WORKING_DIR, 'working_dir'), (HAS_ARGUMENTS, 'arguments'),
+                      (HAS_ICON_LOCATION, 'icon_location')):
+        if not flags & flag:
+            continue
+        if pos + 2 > len(data):
+            raise ShortcutError("StringData is truncated")
+        count = struct.unpack_from('<H', data, pos)[0]
+        pos += 2
+        size = count * 2 if unicode else count
+        raw = data[pos:pos + size]
+        strings[key] = raw.decode('utf-16-le' if unicode else ANSI_ENCODING, errors='replace')
+        pos += size
+
+    # ExtraData: 環境変数を含むリンク先 (%ProgramFiles% など) はここにある
+    if flags & HAS_EXP_STRING:
+        while pos + 8 <= len(data):
+            block_size, signature = struct.unpack_from('<II', data, pos)
+            if block_size < 8:
+                break
+            if signature == ENVIRONMENT_VARIABLE_DATA_BLOCK and block_size >= 0x314:
+                expanded = _fixed_string(data[pos + 0x10C:pos + 0x314], unicode=True) \
+                    or _fixed_string(data[pos + 8:pos + 0x10C])
+                if expanded:
+                    target = ntpath.expandvars(expanded)
+                break
+            pos += block_size
+
+    return {
+        'target': target,
+        'arguments': strings.get('arguments', ''),
+        'working_dir': strings.get('working_dir', ''),
+        'icon_location': ntpath.expandvars(strings.get('icon_location', '')),
+        'icon_index': icon_index,
+        'description': strings.get('description', ''),
+        'relative_path': strings.get('relative_path', ''),
+    }
+
+def parse_lnk(path):
+    with open(path, 'rb') as f:
+        info = parse_lnk_bytes(f.read())
+    if not info['target'] and info['relative_path']:
+        # LinkInfo がない(別のPCで作られたなど)場合は、相対パスから求める
+        info['target'] = ntpath.normpath(ntpath.join(ntpath.dirname(path), info['relative_path']))
+    return info
+
+# --- .url (InternetShortcut) ---
+def parse_url_text(text):
+    """
+    .url の内容を解析して辞書で返す。
+    ConfigParser と違い、キーの重複やセクション外の行があってもエラーにしない。
+    """
+    values = {}
+    in_section = False
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('['):
+            in_section = line.lower() == '[internetshortcut]'
+        elif in_section and '=' in line:
+            key, value = line.split('=', 1)
+            values.setdefault(key.strip().lower(), value.strip())
+    if 'url' not in values:
+        raise ShortcutError("InternetShortcut has no URL")
+    try:
+        icon_index = int(values.get('iconindex', 0))
+    except ValueError:
+        icon_index = 0
+    return {
+        'target': values['url'],
+        'arguments': '',
+        'working_dir': values.get('workingdirectory', ''),
+        'icon_location': values.get('iconfile', ''),
+        'icon_index': icon_index,
+        'description': '',
+        'relative_path': '',
+    }
+
+def parse_url(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode(ANSI_ENCODING, errors='replace')
+    return parse_url_text(text)
+
+def parse_shortcut(path):
+    """拡張子に応じて .lnk / .url を解析する"""
+    if path.lower().endswith('.lnk'):
+        return parse_lnk(path)
+    return parse_url(path)
+
+# --- フォルダの一括読み込み ---
+_cache = {}  # {ショートカットのパス: (シグネチャ, 解析結果)}
+_cache_lock = threading.Lock()
+
+def _parse_cached(path):
+    signature = file_signature(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        info = parse_shortcut(path)
+    except (OSError, ShortcutError, struct.error) as e:
+        logging.warning(f"Shortcut parse error '{path}': {e}")
+        info = None
+    with _cache_lock:
+        _cache[path] = (signature, info)
+    return info
+
+def scan_shortcuts(folder, recursive=False, workers=SCAN_WORKERS):
+    """
+    フォルダ内の .lnk / .url を読み、[(名前, ファイルのパス, 解析結果), ...] を名前順に返す。
+    前回から変わっていないファイルはキャッシュを使い、それ以外は並列に読む。解析できないものは含めない。
+    """
+    paths = []
+    if recursive:
+        for directory, _, filenames in os.walk(folder):
+            paths.extend(os.path.join(directory, f) for f in filenames if f.lower().endswith(SHORTCUT_EXTENSIONS))
+    elif os.path.isdir(folder):
+        paths = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(SHORTCUT_EXTENSIONS)]
+    if len(paths) > 1 and workers > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+            results = list(executor.map(_parse_cached, paths))
+    else:
+        results = [_parse_cached(p) for p in paths]
+    shortcuts = [(os.path.splitext(os.path.basename(p))[0], p, info)
+                 for p, info in zip(paths, results) if info is not None]
+    return sorted(shortcuts, key=lambda s: s[0])
+
+def launch_command(info):
+    """解析結果から、spawn_link に渡せるコマンド文字列を作る（引数があれば付ける）"""
+    target = info['target']
+    if not info['arguments']:
+        return target
+    if ' ' in target and not target.startswith('"'):
+        target = f'"{target}"'
+    return f"{target} {info['arguments']}"
@@ -0,0 +1,210 @@
+"""
+single_instance.py - QuickLauncher の二重起動防止とインスタンス間通信(IPC)。
+
+2つ目に起動されたプロセスは Tk / PIL などを読み込む前にコマンドを既存インスタンスへ
+転送し、すぐに終了する。アイコンキャッシュなどの温まった状態は常駐プロセスに残る。
+通信路は Windows では名前付きパイプ、それ以外(テスト用)ではUNIXドメインソケット。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import tempfile
+from multiprocessing.connection import Listener, Client
+
+# --- 通信路の定義 ---
+def _instance_suffix():
+    """ユーザーごとに一意なインスタンス名の接尾辞を返す"""
+    user = os.environ.get('USERNAME') or os.environ.get('USER') or 'user'
+    return "".join(c if c.isalnum() else "_" for c in user)
+
+if sys.platform == 'win32':
+    IPC_FAMILY = 'AF_PIPE'
+    IPC_ADDRESS = r'\\.\pipe\QuickLauncher-' + _instance_suffix()
+    MUTEX_NAME = 'Local\\QuickLauncher-' + _instance_suffix()
+    LOCK_FILE = None
+else:
+    IPC_FAMILY = 'AF_UNIX'
+    IPC_ADDRESS = os.path.join(tempfile.gettempdir(), f"quick_launcher-{_instance_suffix()}.sock")
+    MUTEX_NAME = None
+    LOCK_FILE = IPC_ADDRESS + ".lock"
+
+IPC_TIMEOUT = 2.0  # 応答待ちの上限(秒)
+COMMANDS = ('show', 'quick_search', 'profile', 'open', 'reload', 'stats')
+
+_lock_handle = None  # プロセス終了まで保持するロック(ミューテックス/ファイル)
+
+# --- コマンドライン解析 ---
+def parse_command(argv):
+    """
+    コマンドライン引数を IPC メッセージ(dict)に変換する。
+    引数なしは「ポップアップ表示」として扱う。
+    (--open はコマンドラインモード側で 'open' メッセージを組み立てて送る)
+    """
+    message = {'command': 'show'}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        value = argv[i + 1] if i + 1 < len(argv) else None
+        if arg == '--show':
+            message = {'command': 'show'}
+        elif arg == '--quick-search':
+            message = {'command': 'quick_search'}
+        elif arg == '--reload':
+            message = {'command': 'reload'}
+        elif arg == '--profile' and value is not None:
+            message = {'command': 'profile', 'profile': value}
+            i += 1
+        else:
+            logging.warning(f"Unknown command line argument: {arg}")
+        i += 1
+    return message
+
+# --- 二重起動ロック ---
+def acquire_instance_lock():
+    """
+    インスタンスロックを取得する。取得できれば True、既に他のインスタンスが
+    保持していれば False を返す。
+    """
+    global _lock_handle
+    if _lock_handle is not None:
+        return True
+    if MUTEX_NAME:
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.CreateMutexW(None, False, MUTEX_NAME)
+        ERROR_ALREADY_EXISTS = 183
+        if not handle:
+            # ミューテックスを作れない環境では単独起動として扱う
+            return True
+        if ctypes.get_last_error() == ERROR_ALREADY_EXISTS:
+            kernel32.CloseHandle(handle)
+            return False
+        _lock_handle = handle
+        return True
+    else:
+        import fcntl
+        f = open(LOCK_FILE, 'a')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        _lock_handle = f
+        return True
+
+# --- クライアント側 ---
+def send_command(message, timeout=IPC_TIMEOUT):
+    """
+    既存インスタンスへメッセージを送り、応答(dict)を返す。
+    接続できなかった場合は None を返す。
+    """
+    try:
+        conn = Client(IPC_ADDRESS, IPC_FAMILY)
+    except (OSError, EOFError):
+        return None
+    try:
+        conn.send_bytes(json.dumps(message, ensure_ascii=False).encode('utf-8'))
+        if not conn.poll(timeout):
+            return None
+        return json.loads(conn.recv_bytes().decode('utf-8'))
+    except (OSError, EOFError, ValueError):
+        return None
+    finally:
+        conn.close()
+
+def forward_to_running_instance(argv, wait=3.0):
+    """
+    二重起動チェックを行う。既存インスタンスがあればコマンドを転送して True を返す
+    (呼び出し側はそのまま終了する)。自分が最初のインスタンスなら False を返す。
+    """
+    if acquire_instance_lock():
+        return False
+    message = parse_command(argv)
+    # 既存インスタンスが起動途中でまだ待ち受けていない場合に備えて少し再試行する
+    deadline = time.monotonic() + wait
+    while True:
+        reply = send_command(message)
+        if reply is not None:
+            if not reply.get('ok'):
+                print(reply.get('error', 'command failed'), file=sys.stderr)
+            return True
+        if time.monotonic() >= deadline:
+            logging.warning("Another instance holds the lock but did not respond.")
+            return True
+        time.sleep(0.05)
+
+# --- サーバー側 ---
+class InstanceServer:
+    """
+    既存インスタンス側で IPC を待ち受けるサーバー。
+    受信したメッセージ(dict)を handler に渡し、その戻り値(dict)を応答として返す。
+    handler はワーカースレッドから呼ばれるので、UIのデータの参照や操作はTkスレッドに渡して行うこと（root.after もTkの呼び出しなので使えない）。
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._listener = None
+        self._thread = None
+
+    def start(self):
+        if IPC_FAMILY == 'AF_UNIX' and os.path.exists(IPC_ADDRESS):
+            # ロックを保持しているので、残っているソケットは前回の残骸
+            try:
+                os.unlink(IPC_ADDRESS)
+            except OSError:
+                pass
+        try:
+            self._listener = Listener(IPC_ADDRESS, IPC_FAMILY)
+        except OSError as e:
+            logging.error(f"Failed to start IPC listener: {e}")
+            return False
+        if IPC_FAMILY == 'AF_UNIX':
+            os.chmod(IPC_ADDRESS, 0o600)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener:
+            try:
+                listener.close()
+            except OSError:
+                pass
+
+    def _serve(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._listener is None:
+                    break
+                continue
+            try:
+                self._handle_connection(conn)
+            finally:
+                conn.close()
+
+    def _handle_connection(self, conn):
+        try:
+            if not conn.poll(IPC_TIMEOUT):
+                return
+            message = json.loads(conn.recv_bytes().decode('utf-8'))
+            if not isinstance(message, dict) or message.get('command') not in COMMANDS:
+                reply = {'ok': False, 'error': 'unknown command'}
+            else:
+                reply = self.handler(message) or {'ok': True}
+        except (OSError, EOFError, ValueError) as e:
+            logging.warning(f"IPC receive failed: {e}")
+            return
+        except Exception as e:
+            logging.error(f"IPC handler failed: {e}")
+            reply = {'ok': False, 'error': str(e)}
+        try:
+            conn.send_bytes(json.dumps(reply, ensure_ascii=False).encode('utf-8'))
+        except OSError:
+            pass
@@ -0,0 +1,125 @@
+import json
+import sqlite3
+
+import pytest
+
+from bookmark_import import (BookmarkImportError, iter_bookmarks, iter_chromium_bookmarks, merge_bookmarks,
+                             normalize_url)
+
+def _url(name, url):
+    return {"type": "url", "name": name, "url": url}
+
+def _folder(name, children):
+    return {"type": "folder", "name": name, "children": children}
+
+@pytest.fixture
+def chromium_file(tmp_path):
+    roots = {
+        "bookmark_bar": _folder("Bookmarks bar", [
+            _url("Example", "https://example.com/"),
+            _folder("Work", [
+                _url("Docs", "https://docs.example.com/guide"),
+                _folder("Deep", [_url("Wiki", "http://wiki.example.com/")]),
+            ]),
+            _url("Bookmarklet", "javascript:alert(1)"),
+        ]),
+        "other": _folder("Other", [_url("News", "https://news.example.com/")]),
+        "sync_transaction_version": "1",
+    }
+    path = tmp_path / "Bookmarks"
+    path.write_text(json.dumps({"roots": roots, "version": 1}), encoding='utf-8')
+    return str(path)
+
+@pytest.fixture
+def firefox_file(tmp_path):
+    path = tmp_path / "places.sqlite"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE moz_places (id INTEGER PRIMARY KEY, url TEXT);
+        CREATE TABLE moz_bookmarks (id INTEGER PRIMARY KEY, type INTEGER, fk INTEGER, parent INTEGER,
+                                    position INTEGER, title TEXT, guid TEXT);
+    """)
+    conn.executemany("INSERT INTO moz_places VALUES (?, ?)", [
+        (1, "https://example.com/"), (2, "https://docs.example.com/guide"), (3, "place:sort=8"),
+        (4, "https://tagged.example.com/"),
+    ])
+    conn.executemany("INSERT INTO moz_bookmarks VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (1, 2, None, 0, 0, "", "root________"),
+        (2, 2, None, 1, 0, "menu", "menu________"),
+        (3, 2, None, 1, 1, "toolbar", "toolbar_____"),
+        (4, 2, None, 1, 2, "tags", "tags________"),
+        # 表示順(position)と行の順番を逆にしておく
+        (11, 2, None, 3, 1, "Work", "f1"),
+        (10, 1, 1, 3, 0, "Example", "b1"),
+        (12, 1, 2, 11, 0, "Docs", "b2"),
+        (13, 1, 3, 2, 0, "Recent", "b3"),
+        (14, 2, None, 4, 0, "tag", "t1"),
+        (15, 1, 4, 14, 0, "Tagged", "b4"),
+    ])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+def test_chromium_bookmarks_follow_folders(chromium_file):
+    assert list(iter_bookmarks(chromium_file)) == [
+        (("ブックマーク バー",), "Example", "https://example.com/"),
+        (("ブックマーク バー", "Work"), "Docs", "https://docs.example.com/guide"),
+        (("ブックマーク バー", "Work", "Deep"), "Wiki", "http://wiki.example.com/"),
+        (("ブックマーク バー",), "Bookmarklet", "javascript:alert(1)"),
+        (("その他のブックマーク",), "News", "https://news.example.com/"),
+    ]
+
+def test_firefox_bookmarks_follow_folders(firefox_file):
+    assert list(iter_bookmarks(firefox_file)) == [
+        (("ブックマークメニュー",), "Recent", "place:sort=8"),
+        (("ブックマークツールバー",), "Example", "https://example.com/"),
+        (("ブックマークツールバー", "Work"), "Docs", "https://docs.example.com/guide"),
+    ]
+
+def test_broken_chromium_file_raises(tmp_path):
+    path = tmp_path / "Bookmarks"
+    path.write_text("{", encoding='utf-8')
+    with pytest.raises(BookmarkImportError):
+        list(iter_chromium_bookmarks(str(path)))
+
+def test_merge_maps_folders_to_groups(chromium_file):
+    groups_data = [{"group": "ブックマーク バー/Work", "links": [{"name": "Old", "path": "C:\\Tools\\app.exe"}]}]
+    result = merge_bookmarks(groups_data, iter_bookmarks(chromium_file))
+
+    assert result.added == 4
+    assert result.skipped == 1
+    assert result.groups == ["ブックマーク バー", "ブックマーク バー/Work", "ブックマーク バー/Work/Deep",
+                             "その他のブックマーク"]
+    # 同名のグループには追記し、ないグループは末尾に作る
+    assert [g['group'] for g in groups_data] == ["ブックマーク バー/Work", "ブックマーク バー",
+                                                 "ブックマーク バー/Work/Deep", "その他のブックマーク"]
+    assert [link['name'] for link in groups_data[0]['links']] == ["Old", "Docs"]
+
+@pytest.mark.parametrize("url", [
+    "HTTPS://EXAMPLE.com/page",
+    "https://example.com:443/page",
+    "https://example.com/page#section",
+    "https://example.com./page",
+])
+def test_normalize_url_ignores_insignificant_differences(url):
+    assert normalize_url(url) == normalize_url("https://example.com/page")
+
+def test_normalize_url_keeps_significant_differences():
+    assert normalize_url("https://example.com") == normalize_url("https://example.com/")
+    assert normalize_url("http://example.com:80/") == normalize_url("http://example.com/")
+    assert normalize_url("https://example.com:8443/") != normalize_url("https://example.com/")
+    assert normalize_url("http://example.com/") != normalize_url("https://example.com/")
+    assert normalize_url("https://example.com/Page") != normalize_url("https://example.com/page")
+    assert normalize_url("https://example.com/?q=1") != normalize_url("https://example.com/")
+
+def test_merge_skips_duplicates():
+    groups_data = [{"group": "既存", "links": [{"name": "Example", "path": "https://example.com"}]}]
+    bookmarks = [
+        (("A",), "Same", "HTTPS://Example.COM:443/#top"),
+        (("A",), "Page", "https://example.com/page"),
+        (("B",), "Page again", "https://EXAMPLE.com/page#intro"),
+    ]
+    result = merge_bookmarks(groups_data, bookmarks)
+    assert (result.added, result.duplicates) == (1, 2)
+    assert result.urls == ["https://example.com/page"]
+    assert [g['group'] for g in groups_data] == ["既存", "A"]
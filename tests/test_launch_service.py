@@ -0,0 +1,26 @@
+import pytest
+
+from launch_service import LatencyHistogram, format_latency
+
+def test_percentile_is_interpolated_within_bucket():
+    h = LatencyHistogram(buckets=(1, 10, 100))
+    for ms in (0.2, 0.3, 0.4, 0.5):
+        h.record(ms)
+    # 上限の 1ms ではなく、記録した値の範囲内の推定値になる
+    assert 0.2 <= h.percentile(50) <= 0.5
+    assert h.percentile(100) == pytest.approx(0.5)
+
+def test_percentile_spans_buckets():
+    h = LatencyHistogram(buckets=(1, 10, 100))
+    for ms in [0.5] * 50 + [50] * 50:
+        h.record(ms)
+    assert h.percentile(50) <= 1
+    assert 10 < h.percentile(90) <= 50
+    assert h.percentile(99) <= h.max
+
+def test_format_latency_labels_estimates():
+    h = LatencyHistogram()
+    h.record(0.3)
+    text = format_latency({'total': h.snapshot()})
+    assert "0.30" in text
+    assert "推定値" in text
@@ -0,0 +1,195 @@
+import csv
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import link_health
+from link_health import (HealthCache, HealthChecker, LinkStatus, STATUS_BROKEN, STATUS_ERROR, STATUS_OK,
+                         STATUS_REDIRECT, STATUS_TIMEOUT, build_report, check_links, write_report)
+
+SLOW_DELAY = 1.0  # /slow が応答するまでの時間(秒)
+
+class _Handler(BaseHTTPRequestHandler):
+    """パスごとに決まった応答を返す。受け取ったリクエストは server.requests に (メソッド, パス) で記録する"""
+
+    def _respond(self):
+        self.server.requests.append((self.command, self.path))
+        if self.path == '/no-head' and self.command == 'HEAD':
+            status = 405  # HEAD に対応していないサーバー
+        elif self.path == '/moved':
+            self.send_response(301)
+            self.send_header('Location', '/ok')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        elif self.path == '/slow':
+            time.sleep(SLOW_DELAY)
+            status = 200
+        else:
+            status = {'/ok': 200, '/no-head': 200, '/missing': 404, '/login': 403, '/fail': 500}.get(self.path, 404)
+        body = b"hello"
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET = _respond
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    """127.0.0.1 で応答するテスト用のHTTPサーバー。ベースURLを返す"""
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.block_on_close = False
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield base, httpd.requests
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_url_statuses(server):
+    pytest.importorskip('requests')
+    base, _ = server
+    results = HealthChecker(timeout=0.3).check(
+        [f"{base}/ok", f"{base}/missing", f"{base}/login", f"{base}/fail", f"{base}/moved"])
+    assert results[f"{base}/ok"].status == STATUS_OK
+    assert results[f"{base}/missing"].status == STATUS_BROKEN
+    assert results[f"{base}/missing"].detail == "HTTP 404"
+    assert results[f"{base}/login"].status == STATUS_OK
+    assert results[f"{base}/fail"].status == STATUS_ERROR
+    moved = results[f"{base}/moved"]
+    assert (moved.status, moved.detail, moved.final_url) == (STATUS_REDIRECT, "HTTP 301", f"{base}/ok")
+
+def test_head_not_allowed_falls_back_to_get(server):
+    requests = pytest.importorskip('requests')
+    base, seen = server
+    status = link_health.check_url(f"{base}/no-head", requests.Session(), timeout=1.0)
+    assert status.status == STATUS_OK
+    assert seen == [('HEAD', '/no-head'), ('GET', '/no-head')]
+
+def test_slow_server_times_out(server):
+    requests = pytest.importorskip('requests')
+    base, _ = server
+    started = time.perf_counter()
+    status = link_health.check_url(f"{base}/slow", requests.Session(), timeout=0.2)
+    assert status.status == STATUS_TIMEOUT
+    assert time.perf_counter() - started < SLOW_DELAY
+
+def test_unreachable_host_is_an_error(server):
+    requests = pytest.importorskip('requests')
+    base, _ = server
+    # サーバーを止めたあとのポートには接続できない
+    with ThreadingHTTPServer(('127.0.0.1', 0), _Handler) as closed:
+        url = f"http://127.0.0.1:{closed.server_address[1]}/ok"
+    assert link_health.check_url(url, requests.Session(), timeout=1.0).status == STATUS_ERROR
+
+@pytest.fixture
+def probe(tmp_path, monkeypatch, server):
+    """ファイル/URL のチェックを記録する（URLはテスト用のサーバーに実際に問い合わせる）"""
+    pytest.importorskip('requests')
+    calls = []
+    check_url = link_health.check_url
+
+    def fake_check_path(path):
+        calls.append(path)
+        status = STATUS_BROKEN if 'missing' in path else STATUS_OK
+        return LinkStatus(path, status, '', '', time.time())
+
+    def recording_check_url(url, *args):
+        calls.append(url)
+        return check_url(url, *args)
+
+    monkeypatch.setattr(link_health, 'check_path', fake_check_path)
+    monkeypatch.setattr(link_health, 'check_url', recording_check_url)
+    monkeypatch.setattr(link_health, '_cache', HealthCache(str(tmp_path / "link_health.json")))
+    return calls
+
+def test_cache_hit_skips_probe(probe, server):
+    base, requests_seen = server
+    paths = ["/apps/tool.exe", f"{base}/ok", "/apps/missing.exe"]
+    first = check_links(paths)
+    assert sorted(probe) == sorted(paths)
+    assert first["/apps/missing.exe"].status == STATUS_BROKEN
+    assert first[f"{base}/ok"].status == STATUS_OK
+    assert requests_seen == [('HEAD', '/ok')]
+
+    probe.clear()
+    reported = []
+    second = check_links(paths, on_result=reported.append)
+    assert probe == []
+    assert requests_seen == [('HEAD', '/ok')]
+    assert second == first
+    assert len(reported) == len(paths)
+
+def test_force_and_expiry_recheck(probe):
+    check_links(["/apps/tool.exe", "/apps/old.exe"])
+    # 1件だけ期限切れにする
+    old = link_health._cache.get_all(["/apps/old.exe"])["/apps/old.exe"]
+    link_health._cache.update({old.path: old._replace(checked_at=time.time() - link_health.CACHE_TTL - 1)})
+    probe.clear()
+    check_links(["/apps/tool.exe", "/apps/old.exe"])
+    assert probe == ["/apps/old.exe"]
+    probe.clear()
+    check_links(["/apps/tool.exe"], force=True)
+    assert probe == ["/apps/tool.exe"]
+
+def test_timeout_results_use_short_ttl(tmp_path):
+    cache = HealthCache(str(tmp_path / "link_health.json"), ttl=3600, transient_ttl=60)
+    now = time.time()
+    cache.update({
+        "/a": LinkStatus("/a", STATUS_TIMEOUT, '', '', now - 120),
+        "/b": LinkStatus("/b", STATUS_OK, '', '', now - 120),
+    })
+    assert set(cache.fresh(["/a", "/b"], now=now)) == {"/b"}
+    assert set(cache.fresh(["/a", "/b"], now=now - 100)) == {"/a", "/b"}
+
+def test_job_timeout_reports_each_path_once(monkeypatch):
+    release = threading.Event()
+
+    def slow_check(path):
+        if path == "/slow":
+            release.wait(5)
+        return LinkStatus(path, STATUS_OK, '', '', time.time())
+
+    monkeypatch.setattr(link_health, 'check_path', slow_check)
+    reported = []
+    results = HealthChecker(max_workers=2, job_timeout=0.2).check(["/fast", "/slow"], on_result=reported.append)
+    assert results["/slow"].status == STATUS_TIMEOUT
+    assert results["/fast"].status == STATUS_OK
+
+    release.set()
+    time.sleep(0.1)  # 遅れて終わったチェックの完了コールバック
+    assert sorted(s.path for s in reported) == ["/fast", "/slow"]
+    assert [s.status for s in reported if s.path == "/slow"] == [STATUS_TIMEOUT]
+
+def _report_rows():
+    groups = [{'group': "仕事", 'links': [{'name': "ツール", 'path': "/apps/tool.exe"},
+                                           {'name': "未チェック", 'path': "/apps/other.exe"}]}]
+    results = {"/apps/tool.exe": LinkStatus("/apps/tool.exe", STATUS_BROKEN, "ファイルが見つかりません", '', 0)}
+    return build_report(groups, results)
+
+def test_report_csv(tmp_path):
+    path = tmp_path / "report.csv"
+    write_report(_report_rows(), str(path))
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1
+    assert rows[0]['group'] == "仕事"
+    assert rows[0]['status'] == STATUS_BROKEN
+    assert list(rows[0]) == list(link_health.REPORT_COLUMNS)
+
+def test_report_json(tmp_path):
+    path = tmp_path / "report.json"
+    write_report(_report_rows(), str(path))
+    rows = json.loads(path.read_text(encoding='utf-8'))
+    assert [(r['name'], r['detail']) for r in rows] == [("ツール", "ファイルが見つかりません")]
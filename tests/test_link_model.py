@@ -0,0 +1,116 @@
+import time
+
+from link_model import UNDO_LIMIT, LinkModel
+
+def _groups():
+    return [{'group': f"Group {g}", 'links': [{'name': f"Link {g}-{i}", 'path': f"C:\\Apps\\tool{g}{i}.exe"}
+                                              for i in range(40)]}
+            for g in range(10)]
+
+def _ids(projection):
+    return [(gid, list(link_ids)) for gid, link_ids in projection]
+
+def test_search_before_index_uses_scan():
+    model = LinkModel(_groups())
+    assert not model.search_index_ready()
+    result = model.search("tool37")
+    assert _ids(result) == _ids(model._scan("tool37"))
+    assert [model.links[lid]['name'] for _, ids in result for lid in ids] == ["Link 3-7"]
+
+def test_sliced_build_with_edits_matches_scan():
+    model = LinkModel(_groups())
+    lids = list(model.links)
+    steps = 0
+    while not model.build_search_index(deadline=time.perf_counter()):
+        steps += 1
+        if steps == 1:
+            model.rename_link(lids[-1], "Renamed")  # まだインデックスに入っていないリンク
+            model.delete_link(lids[-2])
+    assert steps > 0
+    for query in ("renamed", "link 9-3", "group 1", "tool9"):
+        assert _ids(model.search(query)) == _ids(model._scan(query))
+
+def test_incremental_queries_follow_edits():
+    model = LinkModel(_groups())
+    model.build_search_index()
+    query = "link 2-1"
+    for n in range(1, len(query) + 1):
+        assert _ids(model.search(query[:n])) == _ids(model._scan(query[:n]))
+    lid = next(iter(model.links))
+    model.rename_link(lid, "link 2-1 copy")
+    assert _ids(model.search(query + " ")) == _ids(model._scan(query + " "))
+    assert _ids(model.search(query)) == _ids(model._scan(query))
+
+def _undo_all(model):
+    while model.can_undo():
+        model.undo()
+
+def test_undo_and_redo_restore_link_edits():
+    data = _groups()
+    model = LinkModel(_groups())
+    first, second = model.group_order[:2]
+    lids = list(model.group_link_ids(first))
+    model.move_link(lids[0], 5)
+    model.delete_link(lids[1])
+    added = model.add_link(second, "New", "C:\\Apps\\new.exe", index=0)
+    model.rename_link(lids[2], "Renamed")
+    edited = model.to_data()
+
+    _undo_all(model)
+    assert model.to_data() == data
+    assert model.group_link_ids(first) == lids
+    assert not model.can_undo()
+
+    while model.can_redo():
+        model.redo()
+    assert model.to_data() == edited
+    assert model.group_link_ids(second)[0] == added
+
+def test_undo_and_redo_restore_group_edits():
+    data = _groups()
+    model = LinkModel(_groups())
+    order = list(model.group_order)
+    deleted_links = list(model.group_link_ids(order[3]))
+    model.move_group(order[0], 9)
+    model.delete_group(order[3])
+    added = model.add_group("New group")
+    model.rename_group(order[1], "Renamed group")
+    edited = model.to_data()
+
+    assert model.undo() == (order[1], None)
+    assert model.undo() == (None, None)  # 追加したグループはなくなる
+    assert model.undo() == (order[3], None)
+    # 削除を元に戻すと、同じIDのグループとリンクが戻る
+    assert model.group_link_ids(order[3]) == deleted_links
+    assert all(model.link_group[lid] == order[3] for lid in deleted_links)
+    model.undo()
+    assert model.group_order == order
+    assert model.to_data() == data
+
+    while model.can_redo():
+        model.redo()
+    assert model.to_data() == edited
+    assert added in model.group_order
+
+def test_new_edit_clears_redo():
+    model = LinkModel(_groups())
+    lid = model.group_link_ids(model.group_order[0])[0]
+    model.rename_link(lid, "First")
+    model.undo()
+    assert model.can_redo()
+    model.rename_link(lid, "Second")
+    assert not model.can_redo()
+    assert model.redo() is None
+
+def test_undo_history_is_limited():
+    model = LinkModel(_groups())
+    lid = model.group_link_ids(model.group_order[0])[0]
+    for i in range(UNDO_LIMIT + 5):
+        model.rename_link(lid, f"Name {i}")
+    undone = 0
+    while model.can_undo():
+        model.undo()
+        undone += 1
+    assert undone == UNDO_LIMIT
+    # 古い5件は履歴から落ちているので、元の名前には戻らない
+    assert model.links[lid]['name'] == "Name 4"
@@ -0,0 +1,90 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+import link_store
+import profile_store
+from link_store import SqliteLinkStore, convert_to_json, export_to_json, migrate_to_sqlite, open_link_store
+
+PROFILE = "仕事"
+
+def _groups():
+    return [{'group': f"Group {g}", 'links': [{'name': f"Link {g}-{i}", 'path': f"C:\\Apps\\tool{g}{i}.exe"}
+                                              for i in range(5)]}
+            for g in range(3)]
+
+@pytest.fixture
+def profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_store, 'PROFILES_DIR', str(tmp_path / "profiles"))
+    link_store._json_cache.clear()
+    profile_dir = tmp_path / "profiles" / PROFILE
+    os.makedirs(profile_dir)
+    (profile_dir / "links.json").write_text(json.dumps(_groups(), ensure_ascii=False), encoding='utf-8')
+    yield profile_dir
+    link_store.close_connections()
+
+def _link_ids(db_path):
+    """{グループ名: [リンクの行ID, ...]}"""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT g.name, l.id FROM links l JOIN groups g ON g.id = l.group_id "
+                            "ORDER BY g.position, l.position").fetchall()
+    ids = {}
+    for name, lid in rows:
+        ids.setdefault(name, []).append(lid)
+    return ids
+
+def test_save_all_rewrites_only_changed_groups(tmp_path):
+    db_path = str(tmp_path / "links.db")
+    store = SqliteLinkStore(db_path)
+    data = _groups()
+    store.save_all(data)
+    before = _link_ids(db_path)
+
+    data[1]['links'][0]['name'] = "Renamed"
+    data.reverse()  # 並び順だけが変わったグループは書き直さない
+    store.save_all(data)
+    after = _link_ids(db_path)
+
+    assert after["Group 0"] == before["Group 0"]
+    assert after["Group 2"] == before["Group 2"]
+    assert not set(after["Group 1"]) & set(before["Group 1"])
+    assert store.load_all() == data
+    assert [name for name, _ in store.groups()] == ["Group 2", "Group 1", "Group 0"]
+
+def test_migrate_and_convert_round_trip(profile):
+    migrate_to_sqlite(PROFILE)
+    assert (profile / "links.db").exists()
+    assert (profile / "links.json.bak").exists()
+    assert not (profile / "links.json").exists()
+    store = open_link_store(PROFILE)
+    assert isinstance(store, SqliteLinkStore)
+    assert store.load_all() == _groups()
+    assert store.group_links("Group 2") == _groups()[2]['links']
+
+    convert_to_json(PROFILE)
+    assert not (profile / "links.db").exists()
+    assert (profile / "links.db.bak").exists()
+    assert json.loads((profile / "links.json").read_text(encoding='utf-8')) == _groups()
+    assert open_link_store(PROFILE).load_all() == _groups()
+
+def test_export_keeps_storage_format(profile, tmp_path):
+    migrate_to_sqlite(PROFILE)
+    export_path = tmp_path / "export.json"
+    export_to_json(PROFILE, str(export_path))
+    assert json.loads(export_path.read_text(encoding='utf-8')) == _groups()
+    assert (profile / "links.db").exists()
+
+def test_connection_is_reused_until_closed(profile):
+    migrate_to_sqlite(PROFILE)
+    db_path = str(profile / "links.db")
+    store = open_link_store(PROFILE)
+    store.groups()
+    conn = store._connect()
+    store.group_links("Group 0")
+    assert store._connect() is conn
+    # フォルダ単位で閉じると、その中のDBへの接続はすべて閉じる
+    link_store.close_connections(str(profile))
+    assert db_path not in link_store._schema_ready
+    assert store._connect() is not conn
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+
+import pytest
+
+import profile_store
+from file_watcher import FileWatcher, file_signature
+from profile_store import (flush_pending_writes, get_all_profile_names, is_own_write, load_settings,
+                           merge_external_settings, save_settings)
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_store, 'SETTINGS_FILE', str(tmp_path / "settings.json"))
+    monkeypatch.setattr(profile_store, 'PROFILES_DIR', str(tmp_path / "profiles"))
+    for name in ("(default)", "仕事"):
+        os.makedirs(tmp_path / "profiles" / name)
+    return tmp_path
+
+def test_external_font_and_profile_change_survives(home):
+    settings_path = profile_store.SETTINGS_FILE
+    watcher = FileWatcher(lambda paths: None, ignore=is_own_write)
+    settings = load_settings()
+    assert settings['current_profile'] == "(default)"
+    flush_pending_writes()
+    watcher.watch([settings_path])
+
+    # アプリ自身の保存は外部の変更として扱わない
+    save_settings(dict(settings, size=12))
+    flush_pending_writes()
+    assert is_own_write(settings_path, file_signature(settings_path))
+    assert watcher._scan() == set()
+    settings = load_settings()
+
+    # 同期ソフトなどがフォントとプロファイルを同時に書き換える
+    external = dict(settings, font="Meiryo", current_profile="仕事")
+    (home / "settings.json").write_text(json.dumps(external, ensure_ascii=False), encoding='utf-8')
+    assert not is_own_write(settings_path, file_signature(settings_path))
+    assert watcher._scan() == {settings_path}
+
+    merged, new_profile = merge_external_settings(settings, load_settings(), get_all_profile_names())
+    assert new_profile == "仕事"
+    assert merged == external
+    # 反映した設定をあとで保存しても、外部の変更は残る
+    save_settings(merged)
+    flush_pending_writes()
+    on_disk = json.loads((home / "settings.json").read_text(encoding='utf-8'))
+    assert on_disk['font'] == "Meiryo"
+    assert on_disk['current_profile'] == "仕事"
+    assert on_disk['size'] == 12
+    assert watcher._scan() == set()
+
+def test_unknown_external_profile_keeps_current(home):
+    settings = dict(profile_store.DEFAULT_SETTINGS)
+    merged, new_profile = merge_external_settings(settings, dict(settings, current_profile="削除済み", size=14),
+                                                  get_all_profile_names())
+    assert new_profile is None
+    assert merged['current_profile'] == "(default)"
+    assert merged['size'] == 14
+
+def test_own_write_is_recorded_before_the_file_is_replaced(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    seen = []
+    replace = os.replace
+
+    def replace_and_check(src, dst):
+        replace(src, dst)
+        # 置き換えた直後(atomic_write_text が戻る前)に監視スレッドが確認した場合
+        seen.append(profile_store.is_own_write(dst, file_signature(dst)))
+
+    monkeypatch.setattr(profile_store.os, 'replace', replace_and_check)
+    profile_store.atomic_write_text(path, '{"size": 12}')
+    assert seen == [True]
+
+class _PausingLock:
+    """最初に paused_thread が解放した直後に、go がセットされるまで止まるロック"""
+
+    def __init__(self, paused_thread, taken, go):
+        self._lock = threading.Lock()
+        self.paused_thread, self.taken, self.go = paused_thread, taken, go
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        if threading.current_thread().name == self.paused_thread and not self.taken.is_set():
+            self.taken.set()
+            self.go.wait(5)
+
+def test_flush_never_writes_older_text_after_newer(tmp_path):
+    path = str(tmp_path / "links.json")
+    writer = profile_store.DebouncedWriter(delay=60)
+    taken, go = threading.Event(), threading.Event()
+    writer._lock = _PausingLock('timer-flush', taken, go)
+
+    writer.schedule(path, '"old"')
+    # タイマーの flush が古い内容を取り出した直後に、新しい内容の保存と個別の flush が割り込む
+    timer_flush = threading.Thread(target=writer.flush, name='timer-flush')
+    timer_flush.start()
+    assert taken.wait(5)
+    writer.schedule(path, '"new"')
+    explicit_flush = threading.Thread(target=writer.flush, args=(path,))
+    explicit_flush.start()
+    explicit_flush.join(0.2)
+    go.set()
+    timer_flush.join(5)
+    explicit_flush.join(5)
+
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == "new"
+
+def test_backup_is_only_refreshed_from_a_file_that_loaded(tmp_path):
+    path = str(tmp_path / "links.json")
+    backup = path + profile_store.BACKUP_SUFFIX
+    profile_store.atomic_write_text(path, '[{"group": "good"}]')
+    assert profile_store._load_json_with_recovery(path) == [{"group": "good"}]
+
+    profile_store.atomic_write_text(path, '[]')  # 不正な内容の保存
+    profile_store.atomic_write_text(path, '[{"group": "after"}]')
+    with open(backup, encoding='utf-8') as f:
+        assert json.load(f) == [{"group": "good"}]
+
+def test_corrupt_file_is_restored_from_backup(tmp_path):
+    path = str(tmp_path / "links.json")
+    profile_store.atomic_write_text(path, '[{"group": "good"}]')
+    profile_store._load_json_with_recovery(path)
+    profile_store.atomic_write_text(path, '[{"group": "newer"}]')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[{"group": ')  # 外部で途中まで書かれた
+
+    assert profile_store._load_json_with_recovery(path) == [{"group": "good"}]
+    assert os.path.exists(path + ".corrupt")
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == [{"group": "good"}]
+    # 戻したファイルは正常に読めたものとして、次の保存で .bak になる
+    assert profile_store.is_own_write(path, file_signature(path))
+    profile_store.atomic_write_text(path, '[{"group": "next"}]')
+    with open(path + profile_store.BACKUP_SUFFIX, encoding='utf-8') as f:
+        assert json.load(f) == [{"group": "good"}]
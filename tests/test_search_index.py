@@ -0,0 +1,48 @@
+import time
+
+from search_index import SearchIndex, SearchIndexBuilder
+
+TEXTS = {i: (f"Link {i}", f"C:\\Program Files\\App{i % 7}\\tool{i}.exe") for i in range(2000)}
+
+def _index():
+    index = SearchIndex()
+    for key, fields in TEXTS.items():
+        index.add(key, *fields)
+    return index
+
+def _expected(query):
+    q = query.lower()
+    return {key for key, fields in TEXTS.items() if any(q in f.lower() for f in fields)}
+
+def test_builder_matches_one_by_one_index():
+    builder = SearchIndexBuilder()
+    for key, fields in TEXTS.items():
+        builder.add(key, *fields)
+    steps = 0
+    built = None
+    while built is None:
+        built = builder.finish(deadline=time.perf_counter())
+        steps += 1
+    assert steps > 1
+    index = _index()
+    for query in ("l", "app3", "tool19", "files\\app", "x"):
+        assert built.search(query) == index.search(query) == _expected(query)
+
+def test_search_with_deadline_resumes_until_done():
+    index = _index()
+    for query in ("program files\\app", "program files\\app4\\tool1", "link 1"):
+        calls = 0
+        result = None
+        while result is None:
+            result = index.search(query, deadline=time.perf_counter())
+            calls += 1
+        assert result == _expected(query)
+    assert calls > 1
+
+def test_edit_during_paused_search_restarts_it():
+    index = _index()
+    assert index.search("program files\\app", deadline=time.perf_counter()) is None
+    index.update(5, "renamed", "D:\\elsewhere.exe")
+    result = index.search("program files\\app")
+    assert 5 not in result
+    assert len(result) == len(TEXTS) - 1
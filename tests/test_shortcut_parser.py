@@ -0,0 +1,69 @@
+import struct
+
+import pytest
+
+from shortcut_parser import (LNK_CLSID, LNK_HEADER_SIZE, HAS_LINK_INFO, HAS_RELATIVE_PATH, HAS_ARGUMENTS,
+                             IS_UNICODE, HAS_EXP_STRING, VOLUME_ID_AND_LOCAL_BASE_PATH,
+                             ENVIRONMENT_VARIABLE_DATA_BLOCK, ShortcutError, parse_lnk, parse_lnk_bytes)
+
+def _header(flags):
+    header = bytearray(LNK_HEADER_SIZE)
+    struct.pack_into('<I', header, 0, LNK_HEADER_SIZE)
+    header[4:20] = LNK_CLSID
+    struct.pack_into('<I', header, 20, flags)
+    return bytes(header)
+
+def _link_info(local_base_path):
+    volume_id = struct.pack('<4I', 0x10, 3, 0, 0x10)
+    base = local_base_path.encode('cp1252') + b'\0'
+    header_size = 0x1C
+    volume_offset = header_size
+    base_offset = volume_offset + len(volume_id)
+    suffix_offset = base_offset + len(base)
+    body = volume_id + base + b'\0'
+    size = header_size + len(body)
+    return struct.pack('<7I', size, header_size, VOLUME_ID_AND_LOCAL_BASE_PATH,
+                       volume_offset, base_offset, 0, suffix_offset) + body
+
+def _string(text):
+    return struct.pack('<H', len(text)) + text.encode('utf-16-le')
+
+def _env_block(target):
+    ansi = target.encode('cp1252').ljust(260, b'\0')
+    wide = target.encode('utf-16-le').ljust(520, b'\0')
+    return struct.pack('<II', 0x314, ENVIRONMENT_VARIABLE_DATA_BLOCK) + ansi + wide + struct.pack('<I', 0)
+
+def test_link_info_local_path():
+    data = _header(HAS_LINK_INFO | HAS_ARGUMENTS | IS_UNICODE) + _link_info(r"C:\Tools\app.exe") + _string("--fast")
+    info = parse_lnk_bytes(data)
+    assert info['target'] == r"C:\Tools\app.exe"
+    assert info['arguments'] == "--fast"
+
+def test_relative_path_is_resolved_against_shortcut_folder(tmp_path):
+    shortcut = tmp_path / "app.lnk"
+    shortcut.write_bytes(_header(HAS_RELATIVE_PATH | IS_UNICODE) + _string(r"..\bin\app.exe"))
+    info = parse_lnk(str(shortcut))
+    assert info['relative_path'] == r"..\bin\app.exe"
+    assert info['target'].replace('\\', '/').endswith(tmp_path.parent.name + "/bin/app.exe")
+
+def test_environment_variable_block_only(monkeypatch):
+    monkeypatch.setenv("QL_TEST_ROOT", r"D:\Apps")
+    info = parse_lnk_bytes(_header(HAS_EXP_STRING | IS_UNICODE) + _env_block(r"%QL_TEST_ROOT%\tool.exe"))
+    assert info['target'] == r"D:\Apps\tool.exe"
+
+def test_environment_variable_block_ansi_only(monkeypatch):
+    monkeypatch.setenv("QL_TEST_ROOT", r"D:\Apps")
+    block = bytearray(_env_block(r"%QL_TEST_ROOT%\tool.exe"))
+    block[8 + 260:8 + 260 + 520] = bytes(520)  # Unicode 側が空
+    info = parse_lnk_bytes(_header(HAS_EXP_STRING) + bytes(block))
+    assert info['target'] == r"D:\Apps\tool.exe"
+
+def test_environment_variable_block_overrides_link_info(monkeypatch):
+    monkeypatch.setenv("QL_TEST_ROOT", r"D:\Apps")
+    data = _header(HAS_LINK_INFO | HAS_EXP_STRING | IS_UNICODE) + _link_info(r"C:\Old\tool.exe") \
+        + _env_block(r"%QL_TEST_ROOT%\tool.exe")
+    assert parse_lnk_bytes(data)['target'] == r"D:\Apps\tool.exe"
+
+def test_not_a_shell_link():
+    with pytest.raises(ShortcutError):
+        parse_lnk_bytes(b"[InternetShortcut]\r\nURL=https://example.com/\r\n")
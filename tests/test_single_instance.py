@@ -0,0 +1,36 @@
+import sys
+
+import pytest
+
+import single_instance
+from single_instance import InstanceServer, send_command
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="UNIXドメインソケットで試験する")
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(single_instance, 'IPC_ADDRESS', str(tmp_path / "ql.sock"))
+    received = []
+
+    def handler(message):
+        received.append(message)
+        if message['command'] == 'stats':
+            return {'ok': True, 'launch_latency': {'total': {'count': 0}}}
+        return {'ok': True}
+
+    server = InstanceServer(handler)
+    assert server.start()
+    yield server, received
+    server.stop()
+
+def test_stats_command_is_forwarded_to_handler(server):
+    _, received = server
+    reply = send_command({'command': 'stats'})
+    assert reply['ok']
+    assert 'launch_latency' in reply
+    assert received == [{'command': 'stats'}]
+
+def test_unknown_command_is_rejected(server):
+    _, received = server
+    assert send_command({'command': 'format_disk'}) == {'ok': False, 'error': 'unknown command'}
+    assert received == []
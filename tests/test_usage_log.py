@@ -0,0 +1,69 @@
+import json
+
+import profile_store
+from profile_store import atomic_write_text
+from usage_log import UsageLog
+
+def test_compaction_rewrites_log_without_json_backup(tmp_path, monkeypatch):
+    checked = []
+    read_json = profile_store._read_json
+    monkeypatch.setattr(profile_store, '_read_json', lambda path: checked.append(path) or read_json(path))
+
+    path = tmp_path / "usage.log"
+    log = UsageLog(str(path))
+    for i in range(5):
+        log.record("仕事", "C:\\Tools\\app.exe", when=1000.0 + i)
+    log.record("仕事", "https://example.com/", when=1010.0)
+    log.compact()
+
+    assert checked == []
+    assert not (tmp_path / "usage.log.bak").exists()
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert {r['l']: r['n'] for r in records} == {"C:\\Tools\\app.exe": 5, "https://example.com/": 1}
+    assert UsageLog(str(path)).top("仕事", now=1010.0)[0] == "C:\\Tools\\app.exe"
+
+def test_json_files_still_get_backup(tmp_path):
+    path = tmp_path / "settings.json"
+    atomic_write_text(str(path), json.dumps({'size': 11}))
+    assert profile_store._load_json_with_recovery(str(path)) == {'size': 11}
+    atomic_write_text(str(path), json.dumps({'size': 12}))
+    assert json.loads((tmp_path / "settings.json.bak").read_text(encoding='utf-8')) == {'size': 11}
+
+def test_lines_appended_by_another_process_are_read(tmp_path):
+    path = str(tmp_path / "usage.log")
+    app = UsageLog(path)
+    app.record("仕事", "C:\\Tools\\app.exe", when=1000.0)
+    assert app.top("仕事", now=1000.0) == ["C:\\Tools\\app.exe"]
+
+    # コマンドラインモードが別のプロセスで起動を記録する
+    cli = UsageLog(path)
+    for i in range(3):
+        cli.record("仕事", "https://example.com/", when=1001.0 + i)
+    assert app.top("仕事", now=1010.0) == ["https://example.com/", "C:\\Tools\\app.exe"]
+
+    # 自分の追記と他のプロセスの追記が混ざっても、二重に数えない
+    app.record("仕事", "C:\\Tools\\app.exe", when=1011.0)
+    assert app._stats[("仕事", "C:\\Tools\\app.exe")][2] == 2
+    assert app._stats[("仕事", "https://example.com/")][2] == 3
+
+def test_log_compacted_by_another_process_is_reread(tmp_path):
+    path = str(tmp_path / "usage.log")
+    app = UsageLog(path)
+    for i in range(3):
+        app.record("仕事", "C:\\Tools\\app.exe", when=1000.0 + i)
+    cli = UsageLog(path)
+    cli.record("仕事", "https://example.com/", when=1005.0)
+    cli.compact()
+    app.record("仕事", "C:\\Tools\\app.exe", when=1006.0)
+    assert app._stats[("仕事", "C:\\Tools\\app.exe")][2] == 4
+    assert app._stats[("仕事", "https://example.com/")][2] == 1
+    assert app._lines == 3
+
+def test_truncated_last_line_does_not_swallow_next_record(tmp_path):
+    path = tmp_path / "usage.log"
+    path.write_text('{"t": 1000.0, "p": "仕事", "l": "C:\\\\Tools\\\\app.exe"}\n{"t": 1001.0, "p": "仕',
+                    encoding='utf-8')
+    log = UsageLog(str(path))
+    log.record("仕事", "https://example.com/", when=1002.0)
+    assert set(log.scores("仕事", now=1002.0)) == {"C:\\Tools\\app.exe", "https://example.com/"}
+    assert set(UsageLog(str(path)).scores("仕事", now=1002.0)) == {"C:\\Tools\\app.exe", "https://example.com/"}
@@ -0,0 +1,196 @@
+"""
+usage_log.py - リンクの起動履歴と frecency(頻度×新しさ)スコア。
+
+起動のたびに usage.log へ1行(JSON)追記するだけなので、起動を待たせない。
+スコアは「前回のスコアを経過時間で減衰させて 1 を足す」形で逐次更新し、全履歴を再計算しない。
+行数が増えたら、リンクごとのスコア1行にまとめ直す(コンパクション)。
+
+集計はファイルを正とし、コマンドラインモードなど他のプロセスが追記した行は、
+ファイルのシグネチャが変わったときに前回読んだ位置から読み足す（まとめ直されていれば全体を読み直す）。
+
+リンクは (プロファイル名, パス) で識別する。links.json のリンクには永続的なIDがないため、
+編集画面で名前や並び順を変えても履歴は引き継がれる。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+from file_watcher import file_signature
+from profile_store import BASE_DIR, atomic_write_text
+
+USAGE_LOG_FILE = os.path.join(BASE_DIR, "usage.log")
+HALF_LIFE = 14 * 24 * 3600  # スコアが半分になるまでの時間(秒)
+COMPACT_MIN_LINES = 1000    # この行数を超え、かつリンク数の2倍を超えたらまとめ直す
+
+class UsageLog:
+    """
+    起動履歴の追記とスコアの集計を行う。
+    _stats: {(プロファイル名, パス): [スコア, 最終起動時刻, 起動回数]}
+    スコアは最終起動時刻の時点の値で保持し、参照時に現在時刻まで減衰させる。
+    """
+
+    def __init__(self, path=USAGE_LOG_FILE, half_life=HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self._stats = {}
+        self._lines = 0
+        self._loaded = False
+        self._signature = None      # 最後に読んだときのファイルのシグネチャ
+        self._offset = 0            # 読み終えた位置(バイト)
+        self._partial_tail = False  # 改行で終わっていない行が末尾にある（書き込み途中で終了したなど）
+        self._lock = threading.Lock()
+
+    def _decay(self, score, since, now):
+        return score * 0.5 ** (max(now - since, 0) / self.half_life)
+
+    def _apply(self, record):
+        key = (record['p'], record['l'])
+        t = record['t']
+        if 's' in record:
+            # コンパクション済みの行(スコアをそのまま持っている)
+            self._stats[key] = [record['s'], t, record.get('n', 1)]
+            return
+        stat = self._stats.get(key)
+        if stat is None:
+            self._stats[key] = [1.0, t, 1]
+        else:
+            stat[0] = self._decay(stat[0], stat[1], t) + 1.0
+            stat[1] = max(stat[1], t)
+            stat[2] += 1
+
+    def _read_file(self):
+        """ファイル全体を読み直す"""
+        self._stats = {}
+        self._lines = 0
+        self._offset = 0
+        self._read_new_lines()
+
+    def _read_new_lines(self):
+        """前回読み終えた位置より後ろの行を取り込む。改行で終わっていない末尾の行は次回に回す"""
+        signature = file_signature(self.path)
+        data = b''
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Failed to read usage log: {e}")
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._lines += 1
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                pass  # 書き込み途中で終了した行などは読み飛ばす
+        self._offset += end
+        self._partial_tail = end < len(data)
+        self._signature = signature
+        self._loaded = True
+
+    def _sync(self):
+        """前回読んでからファイルが変わっていれば取り込む（追記だけなら読み足し、置き換えられていれば読み直す）"""
+        signature = file_signature(self.path)
+        if self._loaded and signature == self._signature:
+            return
+        old = self._signature
+        if (not self._loaded or old is None or signature is None
+                or signature[2] != old[2] or signature[1] < self._offset):
+            self._read_file()
+        else:
+            self._read_new_lines()
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if self._partial_tail:
+            line = "\n" + line  # 途中で切れた行とつながらないようにする
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            logging.warning(f"Failed to write usage log: {e}")
+
+    def record(self, profile_name, link_path, when=None):
+        """リンクの起動を記録する"""
+        if not link_path:
+            return
+        record = {'t': time.time() if when is None else when, 'p': profile_name, 'l': link_path}
+        with self._lock:
+            self._sync()
+            self._append(record)
+            self._sync()  # 自分の行も、その間に他のプロセスが追記した行もファイルから取り込む
+            if self._lines > max(COMPACT_MIN_LINES, 2 * len(self._stats)):
+                self._compact()
+
+    def _compact(self):
+        # 他のプロセス(コマンドラインモード)が追記した行も取り込むため、ファイルから読み直してから書く
+        self._read_file()
+        self._write_stats()
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def scores(self, profile_name, now=None):
+        """{パス: 現在のスコア} を返す"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._sync()
+            return {l: self._decay(score, t, now)
+                    for (p, l), (score, t, count) in self._stats.items() if p == profile_name}
+
+    def top(self, profile_name, limit=10, now=None):
+        """スコアの高い順にパスを最大 limit 件返す"""
+        scores = self.scores(profile_name, now)
+        return sorted(scores, key=scores.__getitem__, reverse=True)[:limit]
+
+    def rename_profile(self, old_name, new_name):
+        """プロファイル名の変更に合わせて履歴を付け替える"""
+        with self._lock:
+            self._read_file()
+            for (p, l) in [key for key in self._stats if key[0] == old_name]:
+                self._stats[(new_name, l)] = self._stats.pop((p, l))
+            self._write_stats()
+
+    def forget_profile(self, profile_name):
+        """削除したプロファイルの履歴を消す"""
+        with self._lock:
+            self._read_file()
+            for key in [key for key in self._stats if key[0] == profile_name]:
+                del self._stats[key]
+            self._write_stats()
+
+    def _write_stats(self):
+        """現在のスコアをリンクごとに1行ずつ書き出し、ファイルを置き換える"""
+        lines = [json.dumps({'t': t, 'p': p, 'l': l, 's': score, 'n': count}, ensure_ascii=False)
+                 for (p, l), (score, t, count) in self._stats.items()]
+        try:
+            # 1行ずつの JSON で、ファイル全体は JSON ではないので .bak の確認はしない
+            atomic_write_text(self.path, "".join(line + "\n" for line in lines), backup=False)
+        except OSError as e:
+            logging.warning(f"Failed to rewrite usage log: {e}")
+            return
+        # 置き換えた直後に他のプロセスが追記することもあるので、次の参照時に読み直す
+        self._signature = None
+
+_log = UsageLog()
+
+def record_launch(profile_name, link_path):
+    _log.record(profile_name, link_path)
+
+def frecency_scores(profile_name):
+    """{パス: スコア}。起動したことのないリンクは含まれない"""
+    return _log.scores(profile_name)
+
+def top_links(profile_name, limit=10):
+    return _log.top(profile_name, limit)
+
+def rename_profile_usage(old_name, new_name):
+    _log.rename_profile(old_name, new_name)
+
+def forget_profile_usage(profile_name):
+    _log.forget_profile(profile_name)